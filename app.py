@@ -1,4 +1,4 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, send_file, Response, g
 import pandas as pd
 import plotly
 import plotly.express as px
@@ -6,21 +6,165 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import json
 import numpy as np
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from scipy import stats
+from werkzeug.datastructures import MultiDict
 from src.visualization import CovidEconomyVisualizer, create_all_visualizations
+from src.rendering import ChartRenderer, IMAGE_FORMATS
+from src.pyramid import AGGREGATES, FREQUENCIES, select_level, level_column, pyramid_metrics
+from src.summary_stats import box_summary
+from src.chart_cache import ChartCache
+from src.join import aligned_join
+from src.live import LiveBroker, build_update, format_sse
+from src.query_backend import from_env as query_backend_from_env
+from src.regions import RegionNotFound, parse_regions
+from src.memprofile import MemoryProfiler, footprints
+from src import anomaly
+from src.forecasting import BASELINE, FORECAST_TARGETS, HORIZON, ForecastService, available_models
 
 app = Flask(__name__)
 
-# Initialize visualizer
+# Đo bộ nhớ theo route (tùy chọn, MEMPROFILE=1); bật trước khi load dữ liệu để tính cả phần khởi động
+memory_profiler = MemoryProfiler.from_env()
+
+# Initialize visualizer: ưu tiên snapshot (python -m src.snapshot), thiếu hoặc cũ thì đọc CSV
 visualizer = CovidEconomyVisualizer()
-visualizer.load_data()
+if not visualizer.load_snapshot():
+    visualizer.load_data()
+
+# Dùng chung DataFrame của visualizer (giữ tên biến để backward compatibility)
+economy_df = visualizer.economy_data
+covid_df = visualizer.covid_data
+
+# Render ảnh tĩnh phía server (cache trên đĩa)
+renderer = ChartRenderer(visualizer)
+
+# Cache figure theo phiên bản dữ liệu; cache miss trùng nhau chỉ tính một lần (single-flight)
+chart_cache = ChartCache()
+
+# Live update: ingest tăng dần → delta qua SSE cho các client đang nghe
+live_broker = LiveBroker()
+ingest_lock = threading.Lock()
+STREAM_KEEPALIVE = 15
+
+# Kho truy vấn nhúng (tùy chọn, QUERY_BACKEND=sqlite|duckdb): lọc/tổng hợp/tương quan chạy bằng SQL
+query_backend = query_backend_from_env()
+
+# Dự báo: fit nền trong process pool khi dữ liệu đổi phiên bản, request chỉ đọc cache
+forecast_service = ForecastService.from_env()
+
+# Số bin tối đa của histogram tính phía server (mode=summary)
+MAX_SUMMARY_BINS = 200
+# Trần max_points khi zoom; lớn hơn số ngày dữ liệu thì cũng chỉ trả về mức 'day'
+MAX_ZOOM_POINTS = 100_000
+
+LEVEL_LABELS = {'week': 'tuần', 'month': 'tháng', 'quarter': 'quý'}
+
+class InvalidParameter(ValueError):
+    """Tham số request không hợp lệ (trả về 400)"""
+
+def _choice(params, name, default, choices):
+    """Giá trị tham số (thiếu hoặc rỗng → default) nếu nằm trong choices, ngược lại InvalidParameter"""
+    value = params.get(name) or default
+    if value != default and value not in choices:
+        raise InvalidParameter(f'Invalid {name}: {value!r} (expected one of {list(choices)})')
+    return value
+
+def _bounded_int(params, name, default, lo, hi):
+    """Tham số nguyên trong [lo, hi]; thiếu thì default, sai kiểu hoặc ngoài khoảng thì InvalidParameter"""
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidParameter(f'Invalid {name}: {value!r} (expected an integer)') from None
+    if not lo <= value <= hi:
+        raise InvalidParameter(f'Invalid {name}: {value} (expected {lo}..{hi})')
+    return value
+
+def _zoom_window(kind, start_date, end_date, max_points, region=None):
+    """Chọn mức tổng hợp phù hợp với khoảng thời gian và số điểm tối đa"""
+    return select_level(visualizer.get_pyramid(kind, region), start_date, end_date, max_points)
+
+def _is_national(kind, region):
+    """Không chọn vùng (hoặc chỉ có một vùng): dùng được pyramid/kho truy vấn/figure toàn quốc"""
+    return visualizer.get_region_index(kind).covers_all(region)
+
+@app.before_request
+def _memprofile_begin():
+    if memory_profiler is not None:
+        g.memprofile_state = (memory_profiler, memory_profiler.begin())
+
+@app.after_request
+def _memprofile_end(response):
+    # Response dạng stream (SSE, batch) chỉ được tính tới lúc trả header
+    state = g.pop('memprofile_state', None)
+    if state is not None:
+        profiler, start = state
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        profiler.end(route, start)
+    return response
+
+def _refresh_forecasts():
+    """Gửi fit dự báo cho phiên bản dữ liệu hiện tại (không làm gì nếu đã gửi)"""
+    forecast_service.refresh(visualizer.data_version,
+                             {'economy': visualizer.economy_data, 'covid': visualizer.covid_data})
+
+def _anomaly_slice(kind, metric, start_date=None, end_date=None):
+    """(bảng anomaly, giá trị gốc) trong khoảng ngày; None nếu chỉ số không được theo dõi"""
+    anomalies = visualizer.get_anomalies(kind)
+    if f'{metric}_anomaly' not in anomalies.columns:
+        return None
+    base = visualizer.covid_data if kind == 'covid' else visualizer.economy_data
+    lo, hi = anomaly.window(anomalies, start_date, end_date)
+    return anomalies.iloc[lo:hi], base[metric].iloc[lo:hi]
+
+def _add_anomaly_overlay(fig, kind, metric, start_date=None, end_date=None):
+    """Thêm dải ±z·std, điểm bất thường và điểm đổi mức lên biểu đồ theo ngày"""
+    window = _anomaly_slice(kind, metric, start_date, end_date)
+    if window is None:
+        return
+    frame, values = window
+    found = anomaly.markers(frame, metric, values)
+    
+    fig.add_trace(go.Scatter(
+        x=frame['date'], y=frame[f'{metric}_upper'],
+        mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=frame['date'], y=frame[f'{metric}_lower'],
+        mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(102, 126, 234, 0.15)',
+        name=f'±{anomaly.Z_THRESHOLD:g}σ ({anomaly.WINDOW} ngày)', hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=[point['date'] for point in found['anomalies']],
+        y=[point['value'] for point in found['anomalies']],
+        mode='markers', name='Bất thường',
+        marker=dict(color='#e74c3c', size=9, symbol='x')
+    ))
+    fig.add_trace(go.Scatter(
+        x=[point['date'] for point in found['changepoints']],
+        y=[point['value'] for point in found['changepoints']],
+        mode='markers', name='Đổi mức',
+        marker=dict(color='#f39c12', size=11, symbol='diamond')
+    ))
+
+@app.errorhandler(TimeoutError)
+def handle_timeout(e):
+    """Hết thời gian chờ kết quả đang được request khác tính"""
+    return jsonify({'error': str(e)}), 504
 
-# Load data (giữ lại để backward compatibility)
-economy_df = pd.read_csv('data/processed/economy_data_processed.csv')
-economy_df['date'] = pd.to_datetime(economy_df['date'])
+@app.errorhandler(InvalidParameter)
+def handle_invalid_parameter(e):
+    """Tham số request không hợp lệ"""
+    return jsonify({'error': str(e)}), 400
 
-covid_df = pd.read_csv('data/processed/covid_data_processed.csv')
-covid_df['date'] = pd.to_datetime(covid_df['date'])
+@app.errorhandler(RegionNotFound)
+def handle_region_not_found(e):
+    """Vùng không có trong dữ liệu"""
+    return jsonify({'error': f'Unknown region: {e.args[0]}'}), 404
 
 @app.route('/')
 def index():
@@ -47,25 +191,57 @@ def dashboard():
     }
     return render_template('dashboard.html', stats=stats)
 
-@app.route('/api/economy/timeseries')
-def economy_timeseries():
-    """API: Biểu đồ thời gian chỉ số kinh tế"""
-    metric = request.args.get('metric', 'unemployment_rate')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    # Filter dữ liệu
-    df = economy_df.copy()
-    if start_date:
-        df = df[df['date'] >= start_date]
-    if end_date:
-        df = df[df['date'] <= end_date]
+def build_economy_timeseries(params):
+    """Biểu đồ thời gian chỉ số kinh tế"""
+    # Chỉ số phải có trong pyramid để mọi mức (day/week/month/quarter) đều vẽ được
+    metric = _choice(params, 'metric', 'unemployment_rate', pyramid_metrics(visualizer.economy_data))
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    max_points = _bounded_int(params, 'max_points', None, 1, MAX_ZOOM_POINTS)
+    agg = _choice(params, 'agg', 'mean', AGGREGATES)
+    # Cùng tập freq cho pyramid và kho truy vấn: kết quả không phụ thuộc QUERY_BACKEND
+    freq = _choice(params, 'freq', None, FREQUENCIES)
+    region = params.get('region')
+    national = _is_national('economy', region)
+    
+    level = 'day'
+    if freq and query_backend is not None and national:
+        # Tổng hợp theo kỳ bằng GROUP BY trong kho truy vấn
+        level = freq
+        df = query_backend.aggregate('economy', metric, freq, agg, start_date, end_date)
+        y = df[metric]
+    elif freq:
+        # Không có kho truy vấn: lấy đúng mức tương ứng trong pyramid
+        level, df = select_level({freq: visualizer.get_pyramid('economy', region)[freq]}, start_date, end_date)
+        y = df[level_column(level, metric, agg)]
+    elif max_points:
+        # Zoom: lấy từ pyramid tổng hợp thay vì resample mỗi request
+        level, df = _zoom_window('economy', start_date, end_date, max_points, region)
+        y = df[level_column(level, metric, agg)]
+    elif query_backend is not None and national:
+        # Chỉ đọc cột và khoảng ngày cần thiết
+        df = query_backend.select('economy', [metric], start_date, end_date)
+        y = df[metric]
+    else:
+        # Filter dữ liệu (khối của vùng được chọn, không lọc mask trên toàn bộ dữ liệu)
+        df = visualizer.get_region('economy', region).copy()
+        if start_date:
+            df = df[df['date'] >= start_date]
+        if end_date:
+            df = df[df['date'] <= end_date]
+        y = df[metric]
+    
+    title = f'{metric.replace("_", " ").title()} theo thời gian'
+    if level != 'day':
+        title += f' (theo {LEVEL_LABELS[level]}, {agg})'
+    if not national:
+        title += f' - {region}'
     
     # Tạo biểu đồ
     fig = go.Figure()
     fig.add_trace(go.Scatter(
         x=df['date'],
-        y=df[metric],
+        y=y,
         mode='lines+markers',
         fill='tozeroy',
         name=metric.replace('_', ' ').title(),
@@ -73,8 +249,11 @@ def economy_timeseries():
         marker=dict(size=4)
     ))
     
+    if params.get('anomalies') == 'true' and level == 'day' and national:
+        _add_anomaly_overlay(fig, 'economy', metric, start_date, end_date)
+    
     fig.update_layout(
-        title=f'{metric.replace("_", " ").title()} theo thời gian',
+        title=title,
         xaxis_title='Thời gian',
         yaxis_title=metric.replace('_', ' ').title(),
         hovermode='x unified',
@@ -82,13 +261,77 @@ def economy_timeseries():
         height=400
     )
     
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/economy/distribution')
-def economy_distribution():
-    """API: Phân phối dữ liệu kinh tế"""
-    metric = request.args.get('metric', 'unemployment_rate')
-    chart_type = request.args.get('type', 'histogram')
+@app.route('/api/economy/timeseries')
+def economy_timeseries():
+    """API: Biểu đồ thời gian chỉ số kinh tế"""
+    return jsonify(get_chart('economy_timeseries', request.args))
+
+def build_distribution_summary(metric, chart_type, nbins=20):
+    """Phân phối tính sẵn phía server: payload O(số bin) thay vì O(số dòng)"""
+    sketch = visualizer.get_sketch(metric)
+    label = metric.replace("_", " ").title()
+    fig = go.Figure()
+    
+    if chart_type == 'histogram':
+        edges, counts = sketch.histogram(nbins)
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            name=label,
+            marker=dict(color='#667eea')
+        ))
+        fig.update_layout(title=f'Histogram - {label}', xaxis_title=metric,
+                          yaxis_title='count', bargap=0)
+    elif chart_type == 'box':
+        summary = box_summary(sketch)
+        fig.add_trace(go.Box(
+            q1=[summary['q1']], median=[summary['median']], q3=[summary['q3']],
+            mean=[summary['mean']], lowerfence=[summary['lowerfence']],
+            upperfence=[summary['upperfence']], x=[label], name=label,
+            marker=dict(color='#764ba2')
+        ))
+        if summary['outliers']:
+            fig.add_trace(go.Scatter(
+                x=[label] * len(summary['outliers']), y=summary['outliers'],
+                mode='markers', name='Ngoại lai', marker=dict(color='#764ba2', size=4)
+            ))
+        fig.update_layout(title=f'Boxplot - {label}', yaxis_title=metric, showlegend=False)
+    elif chart_type == 'violin':
+        grid, density = sketch.kde()
+        scale = 0.4 / density.max() if density.max() > 0 else 0
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([density * scale, -density[::-1] * scale]),
+            y=np.concatenate([grid, grid[::-1]]),
+            fill='toself', mode='lines', name=label,
+            line=dict(color='#f093fb'), hoverinfo='y'
+        ))
+        summary = box_summary(sketch)
+        fig.add_trace(go.Box(
+            q1=[summary['q1']], median=[summary['median']], q3=[summary['q3']],
+            lowerfence=[summary['lowerfence']], upperfence=[summary['upperfence']],
+            x=[0], width=0.08, name='Box', marker=dict(color='#f093fb')
+        ))
+        fig.update_layout(title=f'Violin Plot - {label}', yaxis_title=metric, showlegend=False,
+                          xaxis=dict(showticklabels=False, zeroline=False))
+    else:
+        raise ValueError(f'Unsupported distribution type: {chart_type}')
+    
+    fig.update_layout(template='plotly_white', height=400)
+    return json.loads(fig.to_json())
+
+def build_economy_distribution(params):
+    """Phân phối dữ liệu kinh tế"""
+    metric = params.get('metric', 'unemployment_rate')
+    chart_type = _choice(params, 'type', 'histogram', ('histogram', 'box', 'violin'))
+    
+    if params.get('mode') == 'summary':
+        if metric not in economy_df.columns or not pd.api.types.is_numeric_dtype(economy_df[metric]):
+            raise InvalidParameter(f'Invalid metric: {metric!r} (summary mode needs a numeric column)')
+        bins = _bounded_int(params, 'bins', 20, 1, MAX_SUMMARY_BINS)
+        return build_distribution_summary(metric, chart_type, bins)
     
     df = economy_df.copy()
     
@@ -106,29 +349,47 @@ def economy_distribution():
                        color_discrete_sequence=['#f093fb'])
     
     fig.update_layout(template='plotly_white', height=400)
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/economy/scatter')
-def economy_scatter():
-    """API: Scatter plot - Kinh tế vs COVID"""
-    x_metric = request.args.get('x', 'unemployment_rate')
-    y_metric = request.args.get('y', 'cases')
+@app.route('/api/economy/distribution')
+def economy_distribution():
+    """API: Phân phối dữ liệu kinh tế"""
+    return jsonify(get_chart('economy_distribution', request.args))
+
+def build_economy_scatter(params):
+    """Scatter plot - Kinh tế vs COVID"""
+    x_metric = params.get('x', 'unemployment_rate')
+    y_metric = params.get('y', 'cases')
     
     # Sử dụng visualizer nếu là COVID vs Unemployment
     if x_metric == 'unemployment_rate' and y_metric == 'cases':
         chart_data = visualizer.create_covid_vs_unemployment_scatter()
         if chart_data:
-            return jsonify(json.loads(chart_data))
+            return json.loads(chart_data)
     elif x_metric == 'gdp_growth' and y_metric == 'cases':
         chart_data = visualizer.create_covid_vs_gdp_scatter()
         if chart_data:
-            return jsonify(json.loads(chart_data))
-    
-    # Fallback: tạo scatter plot thông thường
-    merged = pd.merge(economy_df, covid_df, on='date', how='inner')
-    
-    # Tính correlation
-    correlation = merged[[x_metric, y_metric]].corr().iloc[0, 1]
+            return json.loads(chart_data)
+    
+    # Fallback: tạo scatter plot thông thường (chỉ cột số; cùng kiểm tra cho cả hai nhánh)
+    for metric in (x_metric, y_metric):
+        frame = economy_df if metric in economy_df.columns else covid_df
+        if metric not in frame.columns or not pd.api.types.is_numeric_dtype(frame[metric]):
+            raise InvalidParameter(f'Unknown metric: {metric}')
+    
+    if query_backend is not None:
+        # Join và tương quan chạy trong kho truy vấn, chỉ lấy hai cột cần vẽ
+        try:
+            merged = query_backend.pair(x_metric, y_metric)
+            correlation = query_backend.correlation(x_metric, y_metric)
+        except ValueError as e:
+            # Cột không có trong kho truy vấn (table_for): lỗi tham số, không phải lỗi server
+            raise InvalidParameter(str(e)) from None
+    else:
+        merged = aligned_join(economy_df, covid_df, on='date')
+        
+        # Tính correlation
+        correlation = merged[[x_metric, y_metric]].corr().iloc[0, 1]
     
     fig = px.scatter(merged, x=x_metric, y=y_metric,
                     trendline="ols",
@@ -137,15 +398,19 @@ def economy_scatter():
                     hover_data=['date'])
     
     fig.update_layout(template='plotly_white', height=500)
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/economy/heatmap')
-def economy_heatmap():
-    """API: Heatmap tương quan kinh tế"""
+@app.route('/api/economy/scatter')
+def economy_scatter():
+    """API: Scatter plot - Kinh tế vs COVID"""
+    return jsonify(get_chart('economy_scatter', request.args))
+
+def build_economy_heatmap(params):
+    """Heatmap tương quan kinh tế"""
     # Sử dụng visualizer
     chart_data = visualizer.create_correlation_matrix()
     if chart_data:
-        return jsonify(json.loads(chart_data))
+        return json.loads(chart_data)
     
     # Fallback
     numeric_cols = ['unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales']
@@ -169,13 +434,18 @@ def economy_heatmap():
         height=500
     )
     
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/economy/comparison')
-def economy_comparison():
-    """API: So sánh đa chỉ số"""
+@app.route('/api/economy/heatmap')
+def economy_heatmap():
+    """API: Heatmap tương quan kinh tế"""
+    return jsonify(get_chart('economy_heatmap', request.args))
+
+def build_economy_comparison(params):
+    """So sánh đa chỉ số"""
+    region = params.get('region')
     # Chuẩn hóa dữ liệu về scale 0-100
-    df = economy_df.copy()
+    df = visualizer.get_region('economy', region).copy()
     metrics = ['unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales']
     
     fig = go.Figure()
@@ -191,8 +461,12 @@ def economy_comparison():
             name=metric.replace('_', ' ').title()
         ))
     
+    title = 'So sánh các Chỉ số Kinh tế (Normalized)'
+    if not _is_national('economy', region):
+        title += f' - {region}'
+    
     fig.update_layout(
-        title='So sánh các Chỉ số Kinh tế (Normalized)',
+        title=title,
         xaxis_title='Thời gian',
         yaxis_title='Giá trị (0-100)',
         hovermode='x unified',
@@ -200,43 +474,72 @@ def economy_comparison():
         height=500
     )
     
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/covid/timeseries')
-def covid_timeseries():
-    """API: COVID-19 time series"""
-    # Sử dụng visualizer
-    chart_data = visualizer.create_covid_cases_timeline()
-    if chart_data:
-        return jsonify(json.loads(chart_data))
+@app.route('/api/economy/comparison')
+def economy_comparison():
+    """API: So sánh đa chỉ số"""
+    return jsonify(get_chart('economy_comparison', request.args))
+
+def build_covid_timeseries(params):
+    """COVID-19 time series.
+
+    Có start_date/end_date/max_points thì chỉ trả về khoảng ngày được chọn (tổng hợp theo
+    pyramid khi vượt max_points); không có thì dùng figure toàn bộ dữ liệu của visualizer.
+    """
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    max_points = _bounded_int(params, 'max_points', None, 1, MAX_ZOOM_POINTS)
+    agg = _choice(params, 'agg', 'mean', AGGREGATES)
+    metric = _choice(params, 'metric', 'cases', pyramid_metrics(visualizer.covid_data))
+    region = params.get('region')
+    national = _is_national('covid', region)
+    show_anomalies = params.get('anomalies') == 'true'
+    
+    # Sử dụng visualizer khi không zoom
+    if national and not (max_points or start_date or end_date or show_anomalies):
+        chart_data = visualizer.create_covid_cases_timeline()
+        if chart_data:
+            return json.loads(chart_data)
     
-    # Fallback
-    metric = request.args.get('metric', 'cases')
-    show_ma = request.args.get('show_ma', 'true') == 'true'
+    # Fallback / zoom
+    show_ma = params.get('show_ma', 'true') == 'true'
+    
+    level, df = _zoom_window('covid', start_date, end_date, max_points, region)
     
     fig = go.Figure()
     
     # Đường chính
     fig.add_trace(go.Scatter(
-        x=covid_df['date'],
-        y=covid_df[metric],
+        x=df['date'],
+        y=df[level_column(level, metric, agg)],
         mode='lines',
         name=metric.capitalize(),
         line=dict(color='#ff6b6b', width=2)
     ))
     
     # Moving average
-    if show_ma and f'{metric}_ma7' in covid_df.columns:
+    ma_column = level_column(level, f'{metric}_ma7', agg)
+    if show_ma and ma_column in df.columns:
         fig.add_trace(go.Scatter(
-            x=covid_df['date'],
-            y=covid_df[f'{metric}_ma7'],
+            x=df['date'],
+            y=df[ma_column],
             mode='lines',
             name='7-day MA',
             line=dict(color='#4ecdc4', width=2, dash='dash')
         ))
     
+    if show_anomalies and level == 'day' and national:
+        _add_anomaly_overlay(fig, 'covid', metric, start_date, end_date)
+    
+    title = f'COVID-19 {metric.capitalize()} theo thời gian'
+    if level != 'day':
+        title += f' (theo {LEVEL_LABELS[level]}, {agg})'
+    if not national:
+        title += f' - {region}'
+    
     fig.update_layout(
-        title=f'COVID-19 {metric.capitalize()} theo thời gian',
+        title=title,
         xaxis_title='Ngày',
         yaxis_title=metric.capitalize(),
         hovermode='x unified',
@@ -244,13 +547,17 @@ def covid_timeseries():
         height=400
     )
     
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/covid/treemap')
-def covid_treemap():
-    """API: Treemap"""
-    covid_df['month_str'] = pd.to_datetime(covid_df['date']).dt.strftime('%Y-%m')
-    monthly = covid_df.groupby('month_str').agg({
+@app.route('/api/covid/timeseries')
+def covid_timeseries():
+    """API: COVID-19 time series"""
+    return jsonify(get_chart('covid_timeseries', request.args))
+
+def build_covid_treemap(params):
+    """Treemap"""
+    month_str = covid_df['date'].dt.strftime('%Y-%m').rename('month_str')
+    monthly = covid_df.groupby(month_str).agg({
         'cases': 'last',
         'deaths': 'last',
         'recovered': 'last'
@@ -266,11 +573,15 @@ def covid_treemap():
                     color_continuous_scale='Reds')
     
     fig.update_layout(height=500)
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/economy/sunburst')
-def economy_sunburst():
-    """API: Sunburst chart - Phân loại kinh tế"""
+@app.route('/api/covid/treemap')
+def covid_treemap():
+    """API: Treemap"""
+    return jsonify(get_chart('covid_treemap', request.args))
+
+def build_economy_sunburst(params):
+    """Sunburst chart - Phân loại kinh tế"""
     df = economy_df.copy()
     df['month_str'] = df['date'].dt.strftime('%Y-%m')
     df['quarter'] = df['date'].dt.to_period('Q').astype(str)
@@ -290,18 +601,22 @@ def economy_sunburst():
                      color_continuous_scale='RdYlGn_r')
     
     fig.update_layout(height=500)
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
 
-@app.route('/api/impact/analysis')
-def impact_analysis():
-    """API: Phân tích tác động COVID lên Kinh tế"""
+@app.route('/api/economy/sunburst')
+def economy_sunburst():
+    """API: Sunburst chart - Phân loại kinh tế"""
+    return jsonify(get_chart('economy_sunburst', request.args))
+
+def build_impact_analysis(params):
+    """Phân tích tác động COVID lên Kinh tế"""
     # Sử dụng visualizer
     chart_data = visualizer.create_combined_timeline()
     if chart_data:
-        return jsonify(json.loads(chart_data))
+        return json.loads(chart_data)
     
     # Fallback
-    merged = pd.merge(economy_df, covid_df[['date', 'cases', 'deaths']], on='date', how='inner')
+    merged = aligned_join(economy_df, covid_df[['date', 'cases', 'deaths']], on='date')
     
     # Tạo subplot
     fig = make_subplots(
@@ -337,13 +652,267 @@ def impact_analysis():
         showlegend=False
     )
     
-    return jsonify(json.loads(fig.to_json()))
+    return json.loads(fig.to_json())
+
+@app.route('/api/impact/analysis')
+def impact_analysis():
+    """API: Phân tích tác động COVID lên Kinh tế"""
+    return jsonify(get_chart('impact_analysis', request.args))
+
+def build_region_comparison(params):
+    """So sánh một chỉ số giữa nhiều vùng (mỗi vùng một trace)"""
+    kind = _choice(params, 'kind', 'economy', ('economy', 'covid'))
+    index = visualizer.get_region_index(kind)
+    numeric = [col for col in index.frame.columns if pd.api.types.is_numeric_dtype(index.frame[col])]
+    metric = _choice(params, 'metric', 'cases' if kind == 'covid' else 'unemployment_rate', numeric)
+    regions = parse_regions(params.get('regions')) or index.regions
+    
+    fig = go.Figure()
+    for region, block in index.select(regions).items():
+        fig.add_trace(go.Scatter(
+            x=block['date'],
+            y=block[metric],
+            mode='lines',
+            name=region
+        ))
+    
+    fig.update_layout(
+        title=f'{metric.replace("_", " ").title()} theo vùng',
+        xaxis_title='Thời gian',
+        yaxis_title=metric.replace('_', ' ').title(),
+        hovermode='x unified',
+        template='plotly_white',
+        height=500
+    )
+    
+    return json.loads(fig.to_json())
+
+@app.route('/api/anomalies')
+def anomalies():
+    """API: Điểm bất thường và đổi mức của một chỉ số (?kind=economy&metric=...&start_date=&end_date=)"""
+    kind = request.args.get('kind', 'economy')
+    if kind not in anomaly.METRICS:
+        return jsonify({'error': f'Unknown dataset: {kind}'}), 404
+    metric = request.args.get('metric', anomaly.METRICS[kind][0])
+    if not _is_national(kind, request.args.get('region')):
+        return jsonify({'error': 'Anomalies are only computed for national data'}), 400
+    window = _anomaly_slice(kind, metric, request.args.get('start_date'), request.args.get('end_date'))
+    if window is None:
+        return jsonify({'error': f'Unsupported metric: {metric}'}), 400
+    frame, values = window
+    
+    key = ChartCache.make_key(visualizer.data_version, 'anomalies', request.args)
+    result = chart_cache.get_or_compute(key, lambda: anomaly.markers(frame, metric, values))
+    return jsonify({
+        'kind': kind,
+        'metric': metric,
+        'window': anomaly.WINDOW,
+        'threshold': anomaly.Z_THRESHOLD,
+        **result,
+    })
+
+@app.route('/api/forecast')
+def forecast():
+    """API: Dự báo một chỉ số (?kind=economy&metric=unemployment_rate&model=ets&horizon=30).
+
+    Model đang fit nền → 202 kèm dự báo baseline để client hiển thị tạm và hỏi lại sau.
+    horizon phải trong 1..HORIZON ngày, ngoài khoảng → 400.
+    """
+    kind = request.args.get('kind', 'economy')
+    metric = request.args.get('metric', 'unemployment_rate')
+    model = request.args.get('model', BASELINE)
+    horizon = _bounded_int(request.args, 'horizon', None, 1, HORIZON)
+    if (kind, metric) not in FORECAST_TARGETS:
+        return jsonify({'error': f'Unsupported forecast target: {kind}:{metric}',
+                        'targets': [f'{k}:{m}' for k, m in FORECAST_TARGETS]}), 400
+    if model not in available_models():
+        return jsonify({'error': f'Unknown model: {model}', 'models': available_models()}), 400
+    
+    _refresh_forecasts()
+    status, result = forecast_service.get(kind, metric, model)
+    if status == 'failed':
+        return jsonify({'status': status, 'error': result}), 500
+    if status != 'ready':
+        _, fallback = forecast_service.get(kind, metric, BASELINE)
+        return jsonify({'status': 'pending', 'version': visualizer.data_version,
+                        'fallback': _truncate_forecast(fallback, horizon)}), 202
+    return jsonify({'status': status, **_truncate_forecast(result, horizon)})
+
+def _truncate_forecast(result, horizon):
+    """Cắt dự báo còn horizon ngày đầu; horizon None → giữ nguyên HORIZON ngày"""
+    if result is None or horizon is None:
+        return result
+    return {key: value[:horizon] if key in ('dates', 'mean', 'lower', 'upper') else value
+            for key, value in result.items()}
+
+@app.route('/api/forecast/timings')
+def forecast_timings():
+    """API: Trạng thái và thời gian fit của các model dự báo (phiên bản dữ liệu hiện tại)"""
+    _refresh_forecasts()
+    return jsonify(forecast_service.timings())
+
+@app.route('/api/regions')
+def list_regions():
+    """API: Các vùng có trong dữ liệu và khoảng dòng của từng vùng"""
+    return jsonify({kind: visualizer.get_region_index(kind).describe() for kind in ('economy', 'covid')})
+
+@app.route('/api/regions/compare')
+def region_comparison():
+    """API: So sánh một chỉ số giữa các vùng (?kind=economy&metric=...&regions=a,b)"""
+    kind = request.args.get('kind', 'economy')
+    if kind not in ('economy', 'covid'):
+        return jsonify({'error': f'Unknown dataset: {kind}'}), 404
+    return jsonify(get_chart('region_comparison', request.args))
+
+# Chart có thể gọi qua /api/batch
+CHART_BUILDERS = {
+    'economy_timeseries': build_economy_timeseries,
+    'economy_distribution': build_economy_distribution,
+    'economy_scatter': build_economy_scatter,
+    'economy_heatmap': build_economy_heatmap,
+    'economy_comparison': build_economy_comparison,
+    'economy_sunburst': build_economy_sunburst,
+    'covid_timeseries': build_covid_timeseries,
+    'covid_treemap': build_covid_treemap,
+    'impact_analysis': build_impact_analysis,
+    'region_comparison': build_region_comparison,
+}
+
+MAX_BATCH_SIZE = 32
+batch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='batch')
+
+def get_chart(chart, params):
+    """Lấy figure của chart từ cache, tính (một lần) nếu chưa có"""
+    key = ChartCache.make_key(visualizer.data_version, chart, params)
+    return chart_cache.get_or_compute(key, lambda: CHART_BUILDERS[chart](params))
+
+def _build_chart(spec):
+    """Tạo một chart trong batch, lỗi được trả về theo từng chart"""
+    result = {'id': spec.get('id', spec['chart']), 'chart': spec['chart']}
+    if spec['chart'] not in CHART_BUILDERS:
+        result['error'] = f"Unknown chart: {spec['chart']}"
+        return result
+    try:
+        result['figure'] = get_chart(spec['chart'], MultiDict(spec.get('params') or {}))
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+@app.route('/api/batch', methods=['POST'])
+def batch_charts():
+    """API: Tạo nhiều chart trong một request, trả về NDJSON theo thứ tự hoàn thành.
+
+    Body: {"charts": [{"id": "economy-timeseries", "chart": "economy_timeseries", "params": {...}}]}
+    """
+    payload = request.get_json(silent=True) or {}
+    specs = payload.get('charts')
+    if not isinstance(specs, list) or not specs:
+        return jsonify({'error': 'charts must be a non-empty list'}), 400
+    if len(specs) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} charts per batch'}), 400
+    # Spec sai cấu trúc làm hỏng cả batch; tên chart lạ chỉ là lỗi của chart đó
+    malformed = [spec for spec in specs if not isinstance(spec, dict) or not isinstance(spec.get('chart'), str)]
+    if malformed:
+        return jsonify({'error': f'Each chart needs a "chart" name: {malformed}'}), 400
+    
+    # Gửi tất cả trước khi stream để các chart được tính song song
+    futures = [batch_pool.submit(_build_chart, spec) for spec in specs]
+    
+    def generate():
+        for future in as_completed(futures):
+            yield json.dumps(future.result(), cls=plotly.utils.PlotlyJSONEncoder) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/ingest/<kind>', methods=['POST'])
+def ingest(kind):
+    """API: Nối dữ liệu thô mới (các ngày sau ngày cuối) và phát delta cho client đang nghe.
+
+    Body: {"rows": [{"date": "2024-01-01", "cases": ..., ...}]}
+    """
+    global economy_df, covid_df
+    from src.data_processing import extend_features
+    if kind not in ('economy', 'covid'):
+        return jsonify({'error': f'Unknown dataset: {kind}'}), 404
+    rows = (request.get_json(silent=True) or {}).get('rows')
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'error': 'rows must be a non-empty list'}), 400
+
+    with ingest_lock:
+        history = visualizer.covid_data if kind == 'covid' else visualizer.economy_data
+        try:
+            new_rows = pd.DataFrame(rows).sort_values('date')
+            processed = extend_features(kind, history, new_rows)
+        except (KeyError, ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid rows: {e}'}), 400
+
+        corr_before = visualizer.get_correlation()
+        try:
+            combined = visualizer.append(kind, processed)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        economy_df = visualizer.economy_data
+        covid_df = visualizer.covid_data
+        if query_backend is not None:
+            query_backend.ingest(kind, combined, visualizer.data_version)
+
+        appended = combined.iloc[-len(processed):]
+        live_broker.publish(build_update(visualizer.data_version, kind, appended,
+                                         corr_before, visualizer.get_correlation()))
+
+    _refresh_forecasts()
+    return jsonify({'version': visualizer.data_version, 'rows': len(processed),
+                    'subscribers': len(live_broker)})
+
+@app.route('/api/stream')
+def stream():
+    """API: Server-Sent Events với các điểm mới của series đã đăng ký.
+
+    ?series=economy:unemployment_rate,covid:cases,correlation
+    """
+    series = [s for s in request.args.get('series', '').split(',') if s]
+    subscription = live_broker.subscribe(series)
+
+    def generate():
+        try:
+            yield format_sse('hello', {'version': visualizer.data_version})
+            while True:
+                item = subscription.get(timeout=STREAM_KEEPALIVE)
+                if item is None:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(*item)
+        finally:
+            live_broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/admin/memory', methods=['GET', 'POST'])
+def admin_memory():
+    """API: Bộ nhớ theo route và kích thước kho dữ liệu/cache (cần MEMPROFILE=1).
+
+    POST ghi snapshot tracemalloc ra cache/memprofile/ (so sánh bằng python -m src.memprofile diff).
+    """
+    if memory_profiler is None:
+        return jsonify({'error': 'Memory profiling is disabled (set MEMPROFILE=1)'}), 404
+    if request.method == 'POST':
+        return jsonify({'snapshot': memory_profiler.dump()})
+    if request.args.get('reset') == 'true':
+        memory_profiler.reset()
+    return jsonify({
+        'traced': memory_profiler.traced(),
+        'routes': memory_profiler.report(top=request.args.get('top', 10, type=int)),
+        'footprints': footprints(visualizer, chart_cache),
+        'chart_cache': chart_cache.stats(),
+    })
 
 @app.route('/api/visualizations/all')
 def get_all_visualizations():
     """API: Lấy tất cả visualizations từ visualizer"""
     try:
-        viz_data = create_all_visualizations()
+        key = ChartCache.make_key(visualizer.data_version, 'visualizations_all')
+        viz_data = chart_cache.get_or_compute(key, lambda: create_all_visualizations(visualizer))
         if viz_data:
             # Convert statistics to JSON serializable format
             response = {
@@ -362,6 +931,24 @@ def get_all_visualizations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/render/<chart>.<fmt>')
+def render_chart(chart, fmt):
+    """API: Ảnh tĩnh (png/svg) của biểu đồ, dùng cho báo cáo và client yếu"""
+    try:
+        path = renderer.render(
+            chart, fmt,
+            width=request.args.get('width'),
+            height=request.args.get('height')
+        )
+    except KeyError:
+        return jsonify({'error': f'Unknown chart: {chart}'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    return send_file(path, mimetype=IMAGE_FORMATS[fmt], max_age=3600)
+
 @app.route('/report')
 def report():
     """Trang báo cáo storytelling"""
@@ -369,7 +956,7 @@ def report():
     stats_from_viz = visualizer.get_statistics()
     
     # Merge data để tính correlation (fallback)
-    merged = pd.merge(economy_df, covid_df[['date', 'cases', 'deaths']], on='date', how='inner')
+    merged = aligned_join(economy_df, covid_df[['date', 'cases', 'deaths']], on='date')
     
     insights = {
         'avg_unemployment': stats_from_viz.get('avg_unemployment', round(economy_df['unemployment_rate'].mean(), 2)),
@@ -387,9 +974,12 @@ def report():
 
 @app.route('/api/stats')
 def get_stats():
-    """API: Lấy thống kê tổng quan"""
+    """API: Lấy thống kê tổng quan (?region=... cho một vùng)"""
+    region = request.args.get('region')
+    economy_df = visualizer.get_region('economy', region)
+    covid_df = visualizer.get_region('covid', region)
     # Sử dụng visualizer
-    viz_stats = visualizer.get_statistics()
+    viz_stats = visualizer.get_statistics(region)
     
     stats = {
         'economy': {
@@ -397,7 +987,7 @@ def get_stats():
             'avg_unemployment': viz_stats.get('avg_unemployment', round(economy_df['unemployment_rate'].mean(), 2)),
             'max_unemployment': viz_stats.get('max_unemployment', round(economy_df['unemployment_rate'].max(), 2)),
             'avg_gdp_growth': viz_stats.get('avg_gdp_growth', round(economy_df['gdp_growth'].mean(), 2)),
-            'avg_stock_index': round(economy_df['stock_index'].mean(), 2) if 'stock_index' in economy_df.columns else 0
+            'avg_stock_index': round(float(economy_df['stock_index'].mean()), 2) if 'stock_index' in economy_df.columns else 0
         },
         'covid': {
             'total_cases': viz_stats.get('total_cases', int(covid_df['cases'].iloc[-1])),
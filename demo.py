@@ -1,64 +1,149 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 from src.visualization import CovidEconomyVisualizer
 
-def generate_markdown_report():
-    """Generate markdown report với data thực"""
-    
-    # Load visualizer
-    visualizer = CovidEconomyVisualizer()
-    visualizer.load_data()
-    stats = visualizer.get_statistics()
-    
-    # Load data
-    economy_df = pd.read_csv('data/processed/economy_data_processed.csv')
-    covid_df = pd.read_csv('data/processed/covid_data_processed.csv')
-    economy_df['date'] = pd.to_datetime(economy_df['date'])
-    covid_df['date'] = pd.to_datetime(covid_df['date'])
-    
-    merged = pd.merge(economy_df, covid_df[['date', 'cases', 'deaths']], on='date', how='inner')
-    
-    # Calculate insights
+TEMPLATE_PATH = 'READ_PROFILE.md'
+
+# Placeholder cố định trong template → key của insights
+FIXED_PLACEHOLDERS = {
+    '-X%': lambda i: f"{i['min_gdp_growth']}%",
+    '+Y%': lambda i: f"+{i['max_gdp_growth']}%",
+    '(Q2/2020)': lambda i: f"({i['min_gdp_date']})",
+    '(Q3/2021)': lambda i: f"({i['max_gdp_date']})",
+}
+
+def compute_insights(visualizer, start_date=None, end_date=None, region=None):
+    """Tính insights cho báo cáo từ kho dữ liệu và thống kê của visualizer"""
+    economy_df = visualizer.get_region('economy', region, start_date, end_date)
+    covid_df = visualizer.get_region('covid', region, start_date, end_date)
+
+    if economy_df.empty or covid_df.empty:
+        raise ValueError('Không có dữ liệu trong khoảng đã chọn')
+
+    stats = visualizer.get_statistics(region, start_date, end_date)
     gdp_data = economy_df['gdp_growth']
-    unemployment_data = economy_df['unemployment_rate']
-    
-    min_gdp_idx = gdp_data.idxmin()
-    max_gdp_idx = gdp_data.idxmax()
-    
-    insights = {
+
+    return {
         'total_covid_cases': f"{int(covid_df['cases'].iloc[-1]):,}",
-        'avg_unemployment': round(unemployment_data.mean(), 2),
-        'max_unemployment': round(unemployment_data.max(), 2),
-        'min_unemployment': round(unemployment_data.min(), 2),
-        'avg_gdp_growth': round(gdp_data.mean(), 2),
-        'min_gdp_growth': round(gdp_data.min(), 2),
-        'max_gdp_growth': round(gdp_data.max(), 2),
-        'min_gdp_date': economy_df.loc[min_gdp_idx, 'date'].strftime('%m/%Y'),
-        'max_gdp_date': economy_df.loc[max_gdp_idx, 'date'].strftime('%m/%Y'),
-        'correlation_covid_unemployment': round(merged[['cases', 'unemployment_rate']].corr().iloc[0, 1], 3),
-        'correlation_covid_gdp': round(merged[['cases', 'gdp_growth']].corr().iloc[0, 1], 3),
+        'avg_unemployment': round(stats['avg_unemployment'], 2),
+        'max_unemployment': round(stats['max_unemployment'], 2),
+        'min_unemployment': round(stats['min_unemployment'], 2),
+        'avg_gdp_growth': round(stats['avg_gdp_growth'], 2),
+        'min_gdp_growth': round(stats['min_gdp_growth'], 2),
+        'max_gdp_growth': round(stats['max_gdp_growth'], 2),
+        'min_gdp_date': economy_df.loc[gdp_data.idxmin(), 'date'].strftime('%m/%Y'),
+        'max_gdp_date': economy_df.loc[gdp_data.idxmax(), 'date'].strftime('%m/%Y'),
+        'correlation_covid_unemployment': round(stats['corr_cases_unemployment'], 3),
+        'correlation_covid_gdp': round(stats['corr_cases_gdp'], 3),
         'total_covid_deaths': f"{int(covid_df['deaths'].iloc[-1]):,}",
         'total_covid_recovered': f"{int(covid_df['recovered'].iloc[-1]):,}" if 'recovered' in covid_df.columns else "0",
     }
-    
-    # Read template
-    with open('READ_PROFILE.md', 'r', encoding='utf-8') as f:
+
+def fill_template(template, insights):
+    """Thay toàn bộ placeholder trong một lần quét"""
+    replacements = {f'{{insights.{key}}}': str(value) for key, value in insights.items()}
+    for placeholder, fmt in FIXED_PLACEHOLDERS.items():
+        replacements[placeholder] = fmt(insights)
+
+    pattern = re.compile('|'.join(re.escape(p) for p in sorted(replacements, key=len, reverse=True)))
+    return pattern.sub(lambda m: replacements[m.group(0)], template)
+
+def _inputs_hash(visualizer, template, params):
+    digest = hashlib.sha256()
+    digest.update(str(visualizer.data_version).encode('utf-8'))
+    digest.update(template.encode('utf-8'))
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def generate_markdown_report(output='REPORT_FINAL.md', start_date=None, end_date=None,
+                             region=None, visualizer=None, force=False, verbose=True):
+    """Generate markdown report với data thực.
+
+    Bỏ qua nếu hash đầu vào (dữ liệu, template, tham số) không đổi so với lần trước.
+    """
+    if visualizer is None:
+        visualizer = CovidEconomyVisualizer()
+        visualizer.load_data()
+
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
         template = f.read()
-    
-    for key, value in insights.items():
-        template = template.replace(f'{{insights.{key}}}', str(value))
-    
-    template = template.replace('-X%', f"{insights['min_gdp_growth']}%")
-    template = template.replace('+Y%', f"+{insights['max_gdp_growth']}%")
-    template = template.replace('(Q2/2020)', f"({insights['min_gdp_date']})")
-    template = template.replace('(Q3/2021)', f"({insights['max_gdp_date']})")
-    
-    with open('REPORT_FINAL.md', 'w', encoding='utf-8') as f:
-        f.write(template)
-    
-    print("✅ Report generated successfully: REPORT_FINAL.md")
-    print("\nInsights:")
-    for key, value in insights.items():
-        print(f"  {key}: {value}")
+
+    params = {'start_date': start_date, 'end_date': end_date, 'region': region}
+    inputs_hash = _inputs_hash(visualizer, template, params)
+    hash_path = f'{output}.hash'
+
+    if not force and os.path.exists(output) and os.path.exists(hash_path):
+        with open(hash_path, 'r', encoding='utf-8') as f:
+            if f.read().strip() == inputs_hash:
+                if verbose:
+                    print(f"⏭️  {output} is up to date, skipped")
+                return output
+
+    insights = compute_insights(visualizer, start_date, end_date, region)
+    report = fill_template(template, insights)
+
+    out_dir = os.path.dirname(output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(report)
+    with open(hash_path, 'w', encoding='utf-8') as f:
+        f.write(inputs_hash)
+
+    if verbose:
+        print(f"✅ Report generated successfully: {output}")
+        print("\nInsights:")
+        for key, value in insights.items():
+            print(f"  {key}: {value}")
+
+    return output
+
+def generate_reports(jobs, visualizer=None, max_workers=None, force=False):
+    """Sinh nhiều báo cáo song song (theo vùng / khoảng thời gian) trên cùng một bộ dữ liệu.
+
+    jobs: list dict gồm output và tùy chọn start_date, end_date, region.
+    """
+    if visualizer is None:
+        visualizer = CovidEconomyVisualizer()
+        visualizer.load_data()
+
+    def run(job):
+        return generate_markdown_report(visualizer=visualizer, force=force, verbose=False, **job)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        outputs = list(pool.map(run, jobs))
+
+    print(f"✅ Generated {len(outputs)} reports")
+    return outputs
+
+def yearly_jobs(visualizer, out_dir='reports'):
+    """Mỗi năm trong dữ liệu một báo cáo"""
+    years = sorted(visualizer.economy_data['date'].dt.year.unique())
+    return [
+        {
+            'output': os.path.join(out_dir, f'REPORT_{year}.md'),
+            'start_date': f'{year}-01-01',
+            'end_date': f'{year}-12-31',
+        }
+        for year in years
+    ]
 
 if __name__ == "__main__":
-    generate_markdown_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Sinh báo cáo markdown')
+    parser.add_argument('--start-date')
+    parser.add_argument('--end-date')
+    parser.add_argument('--by-year', action='store_true', help='Sinh một báo cáo cho mỗi năm')
+    parser.add_argument('--force', action='store_true', help='Sinh lại kể cả khi đầu vào không đổi')
+    args = parser.parse_args()
+
+    if args.by_year:
+        viz = CovidEconomyVisualizer()
+        viz.load_data()
+        generate_reports(yearly_jobs(viz), visualizer=viz, force=args.force)
+    else:
+        generate_markdown_report(start_date=args.start_date, end_date=args.end_date, force=args.force)
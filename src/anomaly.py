@@ -0,0 +1,312 @@
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):  # chạy trực tiếp: python src/anomaly.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.data_schema import data_version, load_processed
+
+ANOMALY_DIR = 'data/processed/anomaly'
+
+# Cửa sổ tham chiếu (ngày), khối gần nhất để phát hiện đổi mức, và ngưỡng z
+WINDOW = 30
+SHORT_WINDOW = 7
+Z_THRESHOLD = 3.0
+CHANGEPOINT_Z = 5.0
+
+# Chỉ số theo ngày (số ca lũy kế không có ý nghĩa với z-score nên dùng số ca mới)
+METRICS = {
+    'economy': ['unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales'],
+    'covid': ['daily_cases', 'daily_deaths', 'daily_recovered'],
+}
+SUFFIXES = ['mean', 'std', 'z', 'upper', 'lower', 'anomaly', 'changepoint']
+
+# Cửa sổ phẳng (vd. tỷ lệ thất nghiệp chạm trần 8%): std dưới mức này coi như 0
+FLAT_TOLERANCE = 1e-6
+
+def _zscore(dev, std, scale):
+    """dev / std; cửa sổ phẳng → 0 nếu không lệch, ±inf nếu lệch (NaN khi cửa sổ chưa đủ)"""
+    dev, std = np.asarray(dev, dtype=np.float64), np.asarray(std, dtype=np.float64)
+    tol = FLAT_TOLERANCE * np.maximum(np.abs(scale), 1.0)
+    flat = std <= tol
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(flat, np.where(np.abs(dev) <= tol, 0.0, np.copysign(np.inf, dev)), dev / std)
+    return np.where(np.isnan(std), np.nan, z)
+
+def _zscore_scalar(dev, std, scale):
+    """_zscore cho một điểm (dùng trong OnlineDetector)"""
+    if math.isnan(std):
+        return math.nan
+    tol = FLAT_TOLERANCE * max(abs(scale), 1.0)
+    if std <= tol:
+        return 0.0 if abs(dev) <= tol else math.copysign(math.inf, dev)
+    return dev / std
+
+def anomaly_metrics(df, kind):
+    """Các chỉ số của kind có trong df và không có NaN"""
+    return [col for col in METRICS[kind] if col in df.columns and not df[col].isna().any()]
+
+# ---------------------------------------------------------------------------
+# Batch: một lượt vector hóa trên toàn bộ chuỗi
+# ---------------------------------------------------------------------------
+
+def _window_sums(prefix, end, length):
+    """Tổng của cửa sổ [end - length, end) từ prefix sum; NaN khi cửa sổ chưa đủ dòng"""
+    start = end - length
+    valid = start >= 0
+    out = np.full(len(end), np.nan)
+    out[valid] = prefix[end[valid]] - prefix[start[valid]]
+    return out
+
+def rolling_bands(values, window=WINDOW, short=SHORT_WINDOW, threshold=Z_THRESHOLD,
+                  changepoint_z=CHANGEPOINT_Z):
+    """Dải z-score, điểm bất thường và điểm đổi mức của một chuỗi (không có NaN).
+
+    Tại ngày t: mean/std của `window` ngày trước t (không gồm t), z = (x_t - mean) / std,
+    bất thường khi |z| > threshold. Đổi mức khi trung bình `short` ngày gần nhất lệch khỏi
+    `window` ngày trước đó quá changepoint_z sai số chuẩn; chỉ đánh dấu ngày đầu tiên vượt ngưỡng.
+    Mọi giá trị chỉ dùng dữ liệu quá khứ nên khớp với OnlineDetector cập nhật từng điểm.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    # trừ trung bình trước khi cộng dồn để tổng bình phương không mất chính xác
+    centered = x - (x.mean() if n else 0.0)
+    prefix = np.concatenate([[0.0], np.cumsum(centered)])
+    prefix_sq = np.concatenate([[0.0], np.cumsum(centered * centered)])
+    t = np.arange(n)
+
+    def stats(end, length):
+        total = _window_sums(prefix, end, length)
+        total_sq = _window_sums(prefix_sq, end, length)
+        mean = total / length
+        var = np.maximum(total_sq - total * mean, 0.0) / (length - 1)
+        return mean, np.sqrt(var)
+
+    offset = x.mean() if n else 0.0
+    mean, std = stats(t, window)
+    z = _zscore(centered - mean, std, mean + offset)
+
+    base_mean, base_std = stats(t - short + 1, window)
+    recent = _window_sums(prefix, t + 1, short) / short
+    score = _zscore(recent - base_mean, base_std / math.sqrt(short), base_mean + offset)
+    shifted = np.abs(score) > changepoint_z
+    changepoint = shifted & ~np.concatenate([[False], shifted[:-1]])
+
+    return {
+        'mean': mean + offset,
+        'std': std,
+        'z': z,
+        'upper': mean + offset + threshold * std,
+        'lower': mean + offset - threshold * std,
+        'anomaly': np.abs(z) > threshold,
+        'changepoint': changepoint,
+    }
+
+def detect(df, kind, metrics=None, **params):
+    """DataFrame (date + '<metric>_<mean|std|z|upper|lower|anomaly|changepoint>') cho các chỉ số"""
+    metrics = metrics or anomaly_metrics(df, kind)
+    columns = {'date': df['date'].to_numpy()}
+    for metric in metrics:
+        bands = rolling_bands(df[metric].to_numpy(), **params)
+        for suffix in SUFFIXES:
+            columns[f'{metric}_{suffix}'] = bands[suffix]
+    return pd.DataFrame(columns)
+
+# ---------------------------------------------------------------------------
+# Incremental: cập nhật O(1) mỗi điểm (Welford trên cửa sổ trượt)
+# ---------------------------------------------------------------------------
+
+class RollingWelford:
+    """Mean/phương sai của `window` giá trị gần nhất, cập nhật O(1) khi thêm/đẩy ra"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+            return
+        old = self.values.popleft()
+        self.values.append(x)
+        old_mean = self.mean
+        self.mean += (x - old) / self.window
+        self.m2 = max(self.m2 + (x - old) * (x - self.mean + old - old_mean), 0.0)
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.window - 1)) if self.full else math.nan
+
+class OnlineDetector:
+    """Phiên bản từng điểm của rolling_bands cho một chỉ số (dùng khi ingest dữ liệu mới)"""
+
+    def __init__(self, window=WINDOW, short=SHORT_WINDOW, threshold=Z_THRESHOLD,
+                 changepoint_z=CHANGEPOINT_Z):
+        self.short = short
+        self.threshold = threshold
+        self.changepoint_z = changepoint_z
+        self.history = RollingWelford(window)
+        self.baseline = RollingWelford(window)
+        self.recent = deque()
+        self.recent_sum = 0.0
+        self.shifted = False
+
+    @classmethod
+    def from_history(cls, values, **params):
+        """Khởi tạo từ phần cuối của chuỗi đã có (chỉ cần window + short điểm cuối)"""
+        detector = cls(**params)
+        for x in np.asarray(values, dtype=np.float64)[-(detector.history.window + detector.short):]:
+            detector.update(x)
+        return detector
+
+    def update(self, x):
+        x = float(x)
+        mean = self.history.mean if self.history.full else math.nan
+        std = self.history.std
+        z = _zscore_scalar(x - mean, std, mean)
+
+        self.recent.append(x)
+        self.recent_sum += x
+        if len(self.recent) > self.short:
+            old = self.recent.popleft()
+            self.recent_sum -= old
+            self.baseline.push(old)
+        score = math.nan
+        if len(self.recent) == self.short and self.baseline.full:
+            score = _zscore_scalar(self.recent_sum / self.short - self.baseline.mean,
+                                   self.baseline.std / math.sqrt(self.short), self.baseline.mean)
+        shifted = abs(score) > self.changepoint_z
+        changepoint = shifted and not self.shifted
+        self.shifted = shifted
+
+        self.history.push(x)
+        return {
+            'mean': mean,
+            'std': std,
+            'z': z,
+            'upper': mean + self.threshold * std,
+            'lower': mean - self.threshold * std,
+            'anomaly': abs(z) > self.threshold,
+            'changepoint': changepoint,
+        }
+
+def frame_metrics(frame):
+    """Các chỉ số có trong bảng anomaly"""
+    return [col[:-len('_anomaly')] for col in frame.columns if col.endswith('_anomaly')]
+
+def detectors_from_history(df, metrics, **params):
+    return {metric: OnlineDetector.from_history(df[metric].to_numpy(), **params) for metric in metrics}
+
+def extend(detectors, rows):
+    """Các dòng anomaly cho rows mới, cập nhật detectors tại chỗ (không tính lại lịch sử)"""
+    columns = {'date': rows['date'].to_numpy()}
+    for metric, detector in detectors.items():
+        results = [detector.update(x) for x in rows[metric].to_numpy()]
+        for suffix in SUFFIXES:
+            columns[f'{metric}_{suffix}'] = np.array([result[suffix] for result in results],
+                                                     dtype=bool if suffix in ('anomaly', 'changepoint') else np.float64)
+    return pd.DataFrame(columns)
+
+# ---------------------------------------------------------------------------
+# Lưu/đọc đầu ra của stage
+# ---------------------------------------------------------------------------
+
+def window(anomalies, start_date=None, end_date=None):
+    """Vị trí dòng [lo, hi) trong khoảng ngày (bảng anomaly đã sắp xếp theo ngày)"""
+    dates = anomalies['date']
+    lo = int(dates.searchsorted(pd.Timestamp(start_date))) if start_date else 0
+    hi = int(dates.searchsorted(pd.Timestamp(end_date), side='right')) if end_date else len(anomalies)
+    return lo, hi
+
+def markers(anomalies, metric, values):
+    """Điểm bất thường (ngày, giá trị, z) và điểm đổi mức của một chỉ số.
+
+    values cùng thứ tự dòng với anomalies; z vô hạn (cửa sổ phẳng) trả về None.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    dates = anomalies['date'].dt.strftime('%Y-%m-%d').to_numpy()
+    z = anomalies[f'{metric}_z'].to_numpy()
+    return {
+        'anomalies': [
+            {'date': dates[i], 'value': float(values[i]), 'z': float(z[i]) if np.isfinite(z[i]) else None}
+            for i in np.flatnonzero(anomalies[f'{metric}_anomaly'].to_numpy())
+        ],
+        'changepoints': [
+            {'date': dates[i], 'value': float(values[i])}
+            for i in np.flatnonzero(anomalies[f'{metric}_changepoint'].to_numpy())
+        ],
+    }
+
+def save_anomalies(frame, kind, source_version, params=None, out_dir=ANOMALY_DIR):
+    """Ghi bảng anomaly ra CSV kèm manifest (phiên bản dữ liệu nguồn, tham số)"""
+    os.makedirs(out_dir, exist_ok=True)
+    frame.to_csv(os.path.join(out_dir, f'{kind}_anomalies.csv'), index=False)
+    manifest = {
+        'kind': kind,
+        'source_version': source_version,
+        'params': params or default_params(),
+        'rows': len(frame),
+    }
+    with open(os.path.join(out_dir, f'{kind}_manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def load_anomalies(kind, source_version, out_dir=ANOMALY_DIR):
+    """Đọc bảng anomaly đã lưu; None nếu thiếu hoặc không khớp phiên bản/tham số"""
+    manifest_path = os.path.join(out_dir, f'{kind}_manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('source_version') != source_version or manifest.get('params') != default_params():
+        return None
+    try:
+        frame = pd.read_csv(os.path.join(out_dir, f'{kind}_anomalies.csv'), parse_dates=['date'])
+    except FileNotFoundError:
+        return None
+    flags = [col for col in frame.columns if col.endswith(('_anomaly', '_changepoint'))]
+    return frame.astype({col: bool for col in flags})
+
+def default_params():
+    return {'window': WINDOW, 'short': SHORT_WINDOW, 'threshold': Z_THRESHOLD, 'changepoint_z': CHANGEPOINT_Z}
+
+def process_anomalies(kind, metrics=None, **params):
+    """Stage pipeline: tính anomaly cho dữ liệu đã xử lý và ghi ra ANOMALY_DIR"""
+    df = load_processed(kind)
+    save_anomalies(detect(df, kind, metrics, **params), kind, data_version([kind]),
+                   params={**default_params(), **params})
+
+def benchmark():
+    """Thời gian batch (cả chuỗi) và online (mỗi điểm); khớp batch/online kiểm tra trong tests/test_anomaly.py"""
+    for kind in METRICS:
+        df = load_processed(kind)
+        metrics = anomaly_metrics(df, kind)
+        start = time.perf_counter()
+        batch = detect(df, kind, metrics)
+        t_batch = time.perf_counter() - start
+
+        start = time.perf_counter()
+        extend({metric: OnlineDetector() for metric in metrics}, df)
+        t_online = time.perf_counter() - start
+
+        print(f"{kind}: batch {t_batch * 1000:.1f} ms, online {t_online / len(df) * 1e6:.1f} µs/điểm")
+        for metric in metrics:
+            print(f"  {metric}: {int(batch[f'{metric}_anomaly'].sum())} bất thường, "
+                  f"{int(batch[f'{metric}_changepoint'].sum())} đổi mức")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Gộp các lời gọi trùng khóa đang chạy đồng thời thành một lần tính.
+
+    Thread đầu tiên tính kết quả; các thread khác cùng khóa chờ và nhận chung kết quả
+    (hoặc chung exception). Quá timeout thì thread chờ nhận TimeoutError.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(f'Timed out waiting for {key!r}')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+class ChartCache:
+    """LRU cache kết quả chart theo (phiên bản dữ liệu, chart, tham số chuẩn hóa), có single-flight"""
+
+    def __init__(self, max_entries=256, timeout=30):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.computations = 0
+
+    @staticmethod
+    def make_key(data_version, chart, params=None):
+        """Chuẩn hóa tham số (bỏ giá trị rỗng, sắp xếp) để request tương đương dùng chung khóa"""
+        items = params.items() if params is not None else ()
+        normalized = tuple(sorted((str(k), str(v)) for k, v in items if v not in (None, '')))
+        return (data_version, chart, normalized)
+
+    def get_or_compute(self, key, fn):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        def compute():
+            # Thread dẫn đầu kiểm tra lại: có thể lượt trước vừa ghi xong cache
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key]
+            result = fn()
+            with self._lock:
+                self.computations += 1
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return result
+
+        return self._flight.do(key, compute, timeout=self.timeout)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def values(self):
+        """Danh sách kết quả đang cache (dùng để đo bộ nhớ)"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'computations': self.computations,
+            }
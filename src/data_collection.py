@@ -4,14 +4,14 @@ from datetime import datetime, timedelta
 import requests
 import os
 
-def collect_economy_data():
+def collect_economy_data(seed=42):
     """Thu thập dữ liệu kinh tế giả lập"""
     
     start_date = datetime(2020, 1, 1)
     end_date = datetime(2023, 12, 31)
     dates = pd.date_range(start=start_date, end=end_date, freq='D')
     
-    np.random.seed(42)
+    np.random.seed(seed)
     
     base_unemployment = 2.5
     unemployment_rates = []
@@ -85,14 +85,14 @@ def collect_economy_data():
     
     return economy_df
 
-def collect_covid_data():
+def collect_covid_data(seed=42):
     """Thu thập dữ liệu COVID-19 giả lập"""
     
     start_date = datetime(2020, 1, 1)
     end_date = datetime(2023, 12, 31)
     dates = pd.date_range(start=start_date, end=end_date, freq='D')
     
-    np.random.seed(42)
+    np.random.seed(seed)
     
     cases_list = []
     deaths_list = []
@@ -1,13 +1,36 @@
 import pandas as pd
 import numpy as np
+import argparse
+import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def process_economy_data():
-    """Xử lý dữ liệu kinh tế"""
-    
-    print("\n🔧 Đang xử lý dữ liệu kinh tế...")
-    
-    df = pd.read_csv('data/raw/economy_data.csv')
+if __package__ in (None, ''):  # chạy trực tiếp: python src/data_processing.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import kernels
+from src.data_schema import data_version
+from src.pyramid import build_pyramid, save_pyramid
+
+RAW_PATHS = {
+    'economy': 'data/raw/economy_data.csv',
+    'covid': 'data/raw/covid_data.csv',
+}
+
+# Cửa sổ rolling dài nhất (ma30) cần 29 dòng phía trước → halo cho partition theo thời gian
+MAX_WINDOW = 30
+PARTITION_HALO = MAX_WINDOW - 1
+
+ECONOMY_INPUTS = ['unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales']
+COVID_INPUTS = ['cases', 'deaths', 'recovered']
+
+def add_economy_features(df, use_kernels=True, backend=None):
+    """Tính các cột dẫn xuất cho dữ liệu kinh tế (không đọc/ghi file).
+
+    Mặc định dùng kernel gộp trong src/kernels.py; bản pandas được giữ làm chuẩn đối chiếu
+    và dùng khi đầu vào có NaN.
+    """
     df['date'] = pd.to_datetime(df['date'])
     
     df['year'] = df['date'].dt.year
@@ -18,6 +41,9 @@ def process_economy_data():
     df['month_name'] = df['date'].dt.month_name()
     df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
     
+    if use_kernels and kernels.supports(df, ECONOMY_INPUTS):
+        return _add_economy_features_kernel(df, backend)
+    
     df['unemployment_ma7'] = df['unemployment_rate'].rolling(window=7, min_periods=1).mean()
     df['unemployment_ma30'] = df['unemployment_rate'].rolling(window=30, min_periods=1).mean()
     
@@ -35,6 +61,14 @@ def process_economy_data():
     df['stock_change'] = df['stock_index'].pct_change() * 100  # % change
     df['retail_change'] = df['retail_sales'].pct_change() * 100
     
+    _economy_status(df)
+    
+    df = df.ffill().bfill()
+    
+    return df
+
+def _economy_status(df):
+    """Phân loại tình trạng thất nghiệp / GDP / chứng khoán (dùng chung cho bản pandas và kernel)"""
     df['economic_status'] = pd.cut(df['unemployment_rate'], 
                                     bins=[0, 3, 5, 100],
                                     labels=['Tốt', 'Trung bình', 'Xấu'])
@@ -46,12 +80,28 @@ def process_economy_data():
     df['stock_status'] = pd.cut(df['stock_index'],
                                 bins=[0, 900, 1200, 2000],
                                 labels=['Thấp', 'Trung bình', 'Cao'])
+
+def _add_economy_features_kernel(df, backend=None):
+    mas, changes = kernels.economy_features(*(df[col].to_numpy() for col in ECONOMY_INPUTS),
+                                            backend=backend)
+    df = df.assign(**mas, **changes)
+    _economy_status(df)
+    # Chỉ cột phân loại có thể còn NaN (giá trị ngoài bins)
+    for col in ['economic_status', 'gdp_status', 'stock_status']:
+        df[col] = df[col].ffill().bfill()
+    return df
+
+def process_economy_data():
+    """Xử lý dữ liệu kinh tế"""
     
-    df = df.ffill().bfill()
+    print("\n🔧 Đang xử lý dữ liệu kinh tế...")
+    
+    df = add_economy_features(pd.read_csv(RAW_PATHS['economy']))
     
     os.makedirs('data/processed', exist_ok=True)
     
     df.to_csv('data/processed/economy_data_processed.csv', index=False)
+    save_pyramid(build_pyramid(df), 'economy', data_version(['economy']))
     print(f"Đã xử lý {len(df)} bản ghi kinh tế → data/processed/economy_data_processed.csv")
     
     print("\n Thống kê dữ liệu kinh tế:")
@@ -59,12 +109,8 @@ def process_economy_data():
     
     return df
 
-def process_covid_data():
-    """Xử lý dữ liệu COVID-19"""
-    
-    print("\n🔧 Đang xử lý dữ liệu COVID-19...")
-    
-    df = pd.read_csv('data/raw/covid_data.csv')
+def add_covid_features(df, use_kernels=True, backend=None):
+    """Tính các cột dẫn xuất cho dữ liệu COVID-19 (không đọc/ghi file)"""
     df['date'] = pd.to_datetime(df['date'])
     
     df['year'] = df['date'].dt.year
@@ -73,6 +119,9 @@ def process_covid_data():
     df['day_of_week'] = df['date'].dt.dayofweek
     df['week_of_year'] = df['date'].dt.isocalendar().week
     
+    if use_kernels and kernels.supports(df, COVID_INPUTS):
+        return _add_covid_features_kernel(df, backend)
+    
     df['daily_cases'] = df['cases'].diff().fillna(df['cases'])
     df['daily_deaths'] = df['deaths'].diff().fillna(df['deaths'])
     df['daily_recovered'] = df['recovered'].diff().fillna(df['recovered'])
@@ -104,7 +153,31 @@ def process_covid_data():
         if col != 'date':  
             df[col] = df[col].ffill().bfill()
     
+    return df
+
+def _add_covid_features_kernel(df, backend=None):
+    features = kernels.covid_features(*(df[col].to_numpy() for col in COVID_INPUTS), backend=backend)
+    # Giữ đúng thứ tự cột của bản pandas
+    features = {
+        **{col: features[col] for col in kernels.COVID_COLUMNS if col != 'growth_rate'},
+        'active_cases': df['cases'] - df['deaths'] - df['recovered'],
+        'growth_rate': features['growth_rate'],
+    }
+    df = df.assign(**features)
+    df['severity'] = pd.cut(df['daily_cases'],
+                           bins=[0, 1000, 5000, 100000],
+                           labels=['Thấp', 'Trung bình', 'Cao']).ffill().bfill()
+    return df
+
+def process_covid_data():
+    """Xử lý dữ liệu COVID-19"""
+    
+    print("\n🔧 Đang xử lý dữ liệu COVID-19...")
+    
+    df = add_covid_features(pd.read_csv(RAW_PATHS['covid']))
+    
     df.to_csv('data/processed/covid_data_processed.csv', index=False)
+    save_pyramid(build_pyramid(df), 'covid', data_version(['covid']))
     print(f" Đã xử lý {len(df)} bản ghi COVID → data/processed/covid_data_processed.csv")
     
     print("\n Thống kê dữ liệu COVID-19:")
@@ -112,7 +185,188 @@ def process_covid_data():
     
     return df
 
+FEATURE_BUILDERS = {
+    'economy': add_economy_features,
+    'covid': add_covid_features,
+}
+
+def _process_partition(kind, key, frame, halo, out_path):
+    """Xử lý một partition trong process con, bỏ phần halo rồi ghi ra file"""
+    start = time.perf_counter()
+    df = FEATURE_BUILDERS[kind](frame.reset_index(drop=True))
+    df = df.iloc[halo:]
+    df.to_csv(out_path, index=False)
+    return {
+        'key': str(key),
+        'path': out_path,
+        'rows': len(df),
+        'halo': halo,
+        'start_date': df['date'].min().strftime('%Y-%m-%d'),
+        'end_date': df['date'].max().strftime('%Y-%m-%d'),
+        'seconds': round(time.perf_counter() - start, 4),
+    }
+
+def extend_features(kind, history, new_rows):
+    """Tính cột dẫn xuất cho các dòng mới (ingest tăng dần).
+
+    Giống partition theo thời gian: mượn PARTITION_HALO dòng cuối của history làm ngữ cảnh
+    cho rolling window / diff, rồi chỉ trả về các dòng mới.
+    """
+    inputs = ['date'] + (ECONOMY_INPUTS if kind == 'economy' else COVID_INPUTS)
+    context = history[inputs].iloc[-PARTITION_HALO:]
+    fresh = new_rows[inputs].copy()
+    fresh['date'] = pd.to_datetime(fresh['date'])
+    frame = pd.concat([context, fresh], ignore_index=True)
+    for col in inputs[1:]:
+        frame[col] = frame[col].astype(np.float64) if kind == 'economy' else frame[col].astype(np.int64)
+    df = FEATURE_BUILDERS[kind](frame)
+    return df.iloc[len(context):].reset_index(drop=True)
+
+def split_partitions(df, partition_by='year'):
+    """Chia DataFrame thô thành các partition kèm halo.
+
+    - 'region': các vùng độc lập, không cần halo.
+    - 'year' / 'month': các đoạn thời gian liên tiếp, mỗi đoạn mượn PARTITION_HALO
+      dòng cuối của đoạn trước để rolling window / diff ở mép partition đúng như xử lý tuần tự.
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+
+    if partition_by == 'region':
+        if 'region' not in df.columns:
+            raise ValueError('Dữ liệu không có cột region')
+        return [
+            (region, group.sort_values('date'), 0)
+            for region, group in df.groupby('region', sort=True)
+        ]
+
+    df = df.sort_values('date').reset_index(drop=True)
+    if partition_by == 'year':
+        keys = df['date'].dt.year
+    elif partition_by == 'month':
+        keys = df['date'].dt.strftime('%Y-%m')
+    else:
+        raise ValueError(f'partition_by không hợp lệ: {partition_by}')
+
+    partitions = []
+    for key, index in df.groupby(keys, sort=True).indices.items():
+        lo, hi = index.min(), index.max() + 1
+        halo_lo = max(0, lo - PARTITION_HALO)
+        partitions.append((key, df.iloc[halo_lo:hi], int(lo - halo_lo)))
+    return partitions
+
+def process_partitioned(kind, partition_by='year', max_workers=None, out_dir='data/processed/partitions',
+                        raw=None, verbose=True):
+    """Xử lý song song theo partition trên process pool, ghi file từng partition và manifest.
+
+    raw: DataFrame thô (mặc định đọc RAW_PATHS[kind]).
+    """
+    if verbose:
+        print(f"\n🔧 Đang xử lý {kind} theo partition ({partition_by})...")
+    start = time.perf_counter()
+
+    if raw is None:
+        raw = pd.read_csv(RAW_PATHS[kind])
+    partitions = split_partitions(raw, partition_by)
+
+    target_dir = os.path.join(out_dir, kind, partition_by)
+    os.makedirs(target_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_process_partition, kind, key, frame, halo,
+                        os.path.join(target_dir, f'{kind}_{key}.csv'))
+            for key, frame, halo in partitions
+        ]
+        results = [future.result() for future in futures]
+
+    manifest = {
+        'kind': kind,
+        'partition_by': partition_by,
+        'halo': PARTITION_HALO,
+        'rows': sum(r['rows'] for r in results),
+        'seconds': round(time.perf_counter() - start, 4),
+        'partitions': results,
+    }
+    manifest_path = os.path.join(target_dir, 'manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    if verbose:
+        print(f"Đã xử lý {manifest['rows']} bản ghi trong {len(results)} partition → {manifest_path}")
+    return manifest
+
+def load_partitions(manifest_path):
+    """Ghép các partition trong manifest thành một DataFrame"""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    frames = [pd.read_csv(p['path'], parse_dates=['date']) for p in manifest['partitions']]
+    return pd.concat(frames, ignore_index=True)
+
+def scaled_raw(kind, scale):
+    """Dữ liệu thô nhân bản `scale` lần trên trục ngày liên tục (dùng để đo thời gian)"""
+    raw = pd.read_csv(RAW_PATHS[kind])
+    big = pd.concat([raw] * scale, ignore_index=True)
+    big['date'] = pd.date_range('1900-01-01', periods=len(big), freq='D')
+    if kind == 'covid':
+        # giữ tính lũy kế khi nhân bản
+        for col in COVID_INPUTS:
+            big[col] = np.cumsum(np.diff(big[col].to_numpy(), prepend=0).clip(min=0))
+    return big
+
+def benchmark(scale=50, workers=(1, 2, 4), partition_by='year', repeat=3):
+    """Thời gian xử lý tuần tự và theo partition với số worker khác nhau, kèm speedup so với 1 worker.
+
+    Mỗi cấu hình lấy thời gian nhỏ nhất của `repeat` lần (gồm cả khởi tạo process pool và ghi file).
+    """
+    import tempfile
+
+    print(f"CPU: {os.cpu_count()}")
+    for kind in RAW_PATHS:
+        big = scaled_raw(kind, scale)
+        with tempfile.TemporaryDirectory() as out_dir:
+            def serial():
+                df = FEATURE_BUILDERS[kind](big.copy())
+                df.to_csv(os.path.join(out_dir, f'{kind}.csv'), index=False)
+
+            def timed(fn):
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fn()
+                    best = min(best, time.perf_counter() - start)
+                return best
+
+            n_partitions = len(split_partitions(big, partition_by))
+            print(f"{kind} ({len(big):,} dòng, {n_partitions} partition theo {partition_by}) "
+                  f"tuần tự: {timed(serial) * 1000:.0f} ms")
+            base = None
+            for n in workers:
+                t = timed(lambda: process_partitioned(kind, partition_by, max_workers=n, out_dir=out_dir,
+                                                      raw=big, verbose=False))
+                base = base or t
+                print(f"  {n} worker: {t * 1000:.0f} ms (speedup x{base / t:.2f}, "
+                      f"hiệu suất {base / t / n:.0%})")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Xử lý dữ liệu thô')
+    parser.add_argument('--partition-by', choices=['year', 'month', 'region'],
+                        help='Xử lý song song theo partition thay vì tuần tự')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Đo speedup theo số worker (1/2/4) trên dữ liệu nhân bản')
+    parser.add_argument('--scale', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.scale, partition_by=args.partition_by or 'year')
+        raise SystemExit(0)
+
+    if args.partition_by:
+        for kind in RAW_PATHS:
+            process_partitioned(kind, args.partition_by, max_workers=args.workers)
+        raise SystemExit(0)
+
     print(" Bắt đầu xử lý dữ liệu...\n")
     
     economy_df = process_economy_data()
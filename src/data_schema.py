@@ -0,0 +1,113 @@
+import hashlib
+
+import pandas as pd
+
+# Thứ tự category cố định để pd.cut / groupby cho kết quả ổn định
+ECONOMIC_STATUS = pd.CategoricalDtype(['Tốt', 'Trung bình', 'Xấu'], ordered=True)
+GDP_STATUS = pd.CategoricalDtype(['Suy thoái', 'Chậm', 'Tăng trưởng'], ordered=True)
+LEVEL_STATUS = pd.CategoricalDtype(['Thấp', 'Trung bình', 'Cao'], ordered=True)
+DAY_NAMES = pd.CategoricalDtype(
+    ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+    ordered=True
+)
+MONTH_NAMES = pd.CategoricalDtype(
+    ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+     'August', 'September', 'October', 'November', 'December'],
+    ordered=True
+)
+
+CALENDAR_DTYPES = {
+    'year': 'int16',
+    'month': 'int16',
+    'quarter': 'int16',
+    'day_of_week': 'int16',
+}
+
+# Schema cho các bộ dữ liệu đã xử lý.
+# recovered / active_cases vượt quá giới hạn int32 nên giữ int64.
+PROCESSED_SCHEMAS = {
+    'economy': {
+        'path': 'data/processed/economy_data_processed.csv',
+        'dtypes': {
+            'unemployment_rate': 'float32',
+            'gdp_growth': 'float32',
+            'stock_index': 'float32',
+            'retail_sales': 'float32',
+            **CALENDAR_DTYPES,
+            'day_name': DAY_NAMES,
+            'month_name': MONTH_NAMES,
+            'is_weekend': 'int16',
+            'unemployment_ma7': 'float32',
+            'unemployment_ma30': 'float32',
+            'gdp_ma7': 'float32',
+            'gdp_ma30': 'float32',
+            'stock_ma7': 'float32',
+            'stock_ma30': 'float32',
+            'retail_ma7': 'float32',
+            'retail_ma30': 'float32',
+            'unemployment_change': 'float32',
+            'gdp_change': 'float32',
+            'stock_change': 'float32',
+            'retail_change': 'float32',
+            'economic_status': ECONOMIC_STATUS,
+            'gdp_status': GDP_STATUS,
+            'stock_status': LEVEL_STATUS,
+        }
+    },
+    'covid': {
+        'path': 'data/processed/covid_data_processed.csv',
+        'dtypes': {
+            'cases': 'int32',
+            'deaths': 'int32',
+            'recovered': 'int64',
+            **CALENDAR_DTYPES,
+            'week_of_year': 'int16',
+            'daily_cases': 'float32',
+            'daily_deaths': 'float32',
+            'daily_recovered': 'float32',
+            'cases_ma7': 'float32',
+            'cases_ma14': 'float32',
+            'deaths_ma7': 'float32',
+            'recovered_ma7': 'float32',
+            'mortality_rate': 'float32',
+            'recovery_rate': 'float32',
+            'active_cases': 'int64',
+            'growth_rate': 'float32',
+            'severity': LEVEL_STATUS,
+        }
+    }
+}
+
+def load_processed(name, path=None):
+    """Đọc file CSV đã xử lý với dtype tối ưu theo schema"""
+    schema = PROCESSED_SCHEMAS[name]
+    df = pd.read_csv(path or schema['path'], parse_dates=['date'])
+    return apply_schema(df, name)
+
+def apply_schema(df, name):
+    """Ép kiểu các cột có trong schema (bỏ qua cột không tồn tại)"""
+    dtypes = PROCESSED_SCHEMAS[name]['dtypes']
+    present = {col: dtype for col, dtype in dtypes.items() if col in df.columns}
+    if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'])
+    return df.astype(present)
+
+def data_version(names=None):
+    """Hash nội dung các file đã xử lý, dùng làm phiên bản dữ liệu cho cache"""
+    digest = hashlib.sha256()
+    for name in sorted(names or PROCESSED_SCHEMAS):
+        with open(PROCESSED_SCHEMAS[name]['path'], 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def memory_usage(df):
+    """Dung lượng bộ nhớ thực tế của DataFrame (bytes)"""
+    return int(df.memory_usage(deep=True).sum())
+
+if __name__ == "__main__":
+    for name, schema in PROCESSED_SCHEMAS.items():
+        raw = pd.read_csv(schema['path'])
+        optimized = load_processed(name)
+        before = memory_usage(raw)
+        after = memory_usage(optimized)
+        print(f"{name}: {before:,} → {after:,} bytes (x{before / after:.1f})")
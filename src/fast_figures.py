@@ -0,0 +1,150 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import plotly
+
+try:
+    # Plotly >= 6 mã hóa mảng số thành base64 typed array trong to_dict(). Hàm private nên
+    # requirements.txt giới hạn plotly < 8 (đã kiểm tra với 7.x)
+    from _plotly_utils.utils import convert_to_base64
+except ImportError:
+    # Plotly 5: to_dict() giữ nguyên mảng numpy, encoder JSON xuất thành list
+    convert_to_base64 = None
+
+# Dữ liệu giữ chỗ khi dựng khung figure; bị thay bằng mảng thật ở fill()
+PLACEHOLDER = np.zeros(1)
+
+class _Placeholders:
+    """Mapping trả PLACEHOLDER cho mọi tên cột, dùng khi dựng khung.
+
+    Tên gắn vào layout (tiêu đề...) là chuỗi nên nhận chuỗi rỗng thay vì mảng.
+    """
+
+    def __init__(self, texts=()):
+        self.texts = set(texts)
+
+    def __getitem__(self, name):
+        return '' if name in self.texts else PLACEHOLDER
+
+class FigureTemplate:
+    """Khung figure đã qua validate của Plotly một lần, điền mảng dữ liệu trực tiếp bằng dict.
+
+    build(arrays) là code go.Figure gốc, đọc dữ liệu qua arrays[tên]. Khung được dựng một lần
+    với dữ liệu giữ chỗ; fill() chỉ sao chép nông khung và gắn mảng đã mã hóa vào các khóa
+    khai báo trong bindings, nên JSON ra giống hệt build(arrays).to_dict() mà không chạy
+    validate/deepcopy trên dữ liệu.
+    """
+
+    def __init__(self, build, traces=(), layout=None):
+        self.build = build
+        self.traces = list(traces)
+        self.layout = layout or {}
+        self._skeleton = None
+
+    @property
+    def skeleton(self):
+        if self._skeleton is None:
+            skeleton = self.build(_Placeholders(self.layout.values())).to_dict()
+            if len(skeleton['data']) != len(self.traces):
+                raise ValueError(f"Template có {len(skeleton['data'])} trace, "
+                                 f"bindings cho {len(self.traces)}")
+            self._skeleton = skeleton
+        return self._skeleton
+
+    def fill(self, arrays):
+        skeleton = self.skeleton
+        return {
+            'data': [
+                _assign(base, {path: arrays[name] for path, name in fields.items()})
+                for base, fields in zip(skeleton['data'], self.traces)
+            ],
+            'layout': _assign(skeleton['layout'], {path: arrays[name] for path, name in self.layout.items()}),
+        }
+
+    def figure(self, arrays, fast=True):
+        """Figure dạng dict; fast=False chạy lại go.Figure đầy đủ (dùng để đối chiếu)"""
+        return self.fill(arrays) if fast else self.build(arrays).to_dict()
+
+def _assign(base, fields):
+    """Sao chép nông theo đường dẫn được gán, phần còn lại dùng chung với khung"""
+    out = dict(base)
+    for path, value in fields.items():
+        keys = path.split('.')
+        node = out
+        for key in keys[:-1]:
+            node[key] = dict(node[key])
+            node = node[key]
+        node[keys[-1]] = _encode(value)
+    return out
+
+def _encode(value):
+    """Mảng → numpy (và base64 typed array cho kiểu số) giống validator + to_dict của Plotly"""
+    if not isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+        return value
+    holder = {'value': np.asarray(value)}
+    if convert_to_base64 is not None:
+        convert_to_base64(holder)
+    return holder['value']
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def figure_template(key, build, traces=(), layout=None):
+    """Template dùng chung theo key (tên chart và các giá trị không phải mảng dùng trong build).
+
+    Key chỉ nên chứa giá trị có tập hữu hạn (cờ, tên cột); giá trị phụ thuộc dữ liệu như
+    chuỗi tiêu đề phải gắn qua bindings của layout, nếu không _templates phình theo dữ liệu.
+    """
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.setdefault(key, FigureTemplate(build, traces, layout))
+    return template
+
+def to_json(figure):
+    """Giống json.dumps(fig, cls=PlotlyJSONEncoder)"""
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+def benchmark(repeat=20):
+    """So sánh thời gian và bộ nhớ cấp phát của bản go.Figure và bản template cho từng chart"""
+    import time
+    import tracemalloc
+    from src.visualization import CovidEconomyVisualizer, FIGURE_METHODS
+
+    viz = CovidEconomyVisualizer()
+    viz.load_data()
+
+    def measure(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
+
+    for name in FIGURE_METHODS:
+        method = getattr(CovidEconomyVisualizer, name).__wrapped__
+
+        def slow():
+            viz.use_fast_figures = False
+            return method(viz)
+
+        def fast():
+            viz.use_fast_figures = True
+            return method(viz)
+
+        if slow() != fast():
+            raise AssertionError(f'{name}: JSON khác nhau')
+        t_slow, m_slow = measure(slow)
+        t_fast, m_fast = measure(fast)
+        print(f"{name}: {t_slow:.1f} → {t_fast:.1f} ms (x{t_slow / t_fast:.1f}), "
+              f"peak {m_slow / 1e6:.2f} → {m_fast / 1e6:.2f} MB")
+
+if __name__ == "__main__":
+    benchmark()
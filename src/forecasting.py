@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):  # chạy trực tiếp: python src/forecasting.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import statsmodels  # noqa: F401
+    STATSMODELS_AVAILABLE = True
+except ImportError:  # statsmodels là tùy chọn, chỉ còn model baseline
+    STATSMODELS_AVAILABLE = False
+
+FORECAST_DIR = 'cache/forecasts'
+
+# (kind, chỉ số) được dự báo; số ca COVID dùng số ca mới theo ngày
+FORECAST_TARGETS = [
+    ('economy', 'unemployment_rate'),
+    ('economy', 'gdp_growth'),
+    ('covid', 'daily_cases'),
+]
+HORIZON = 90           # số ngày dự báo
+TRAIN_WINDOW = 365     # chỉ fit trên năm gần nhất để thời gian fit ổn định
+BASELINE_WINDOW = 28
+ALPHA = 0.05           # khoảng dự báo 95%
+
+BASELINE = 'baseline'
+STATSMODELS_MODELS = ['ets', 'arima']
+MODELS = [BASELINE] + STATSMODELS_MODELS
+
+def available_models():
+    return MODELS if STATSMODELS_AVAILABLE else [BASELINE]
+
+def training_series(df, metric, window=TRAIN_WINDOW):
+    """Chuỗi theo ngày (tần suất 'D', nội suy ngày thiếu) của `window` ngày cuối"""
+    series = pd.Series(df[metric].to_numpy(dtype=np.float64), index=pd.DatetimeIndex(df['date']))
+    series = series.iloc[-window:].asfreq('D')
+    if series.isna().any():
+        series = series.interpolate(limit_direction='both')
+    return series
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+def baseline_forecast(values, horizon=HORIZON, window=BASELINE_WINDOW, alpha=ALPHA):
+    """Dự báo bằng trung bình `window` ngày cuối, khoảng dự báo từ sai số thực nghiệm.
+
+    Sai số ở từng bước h được đo trên mọi gốc trong lịch sử cùng lúc (mảng gốc × h), rồi lấy
+    quantile theo h, nên không cần giả định phân phối và chỉ là vài phép toán mảng.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n < window + 2:
+        raise ValueError(f'Cần ít nhất {window + 2} điểm, có {n}')
+    prefix = np.concatenate([[0.0], np.cumsum(y)])
+    means = (prefix[window:] - prefix[:-window]) / window   # means[i]: trung bình y[i:i + window]
+    level = means[-1]
+
+    origins = np.arange(window - 1, n - 1)
+    targets = origins[:, None] + np.arange(1, horizon + 1)[None, :]
+    errors = np.where(targets < n, y[np.minimum(targets, n - 1)] - means[origins - window + 1][:, None], np.nan)
+    # sắp xếp một lần theo cột (NaN về cuối) rồi nội suy quantile như np.quantile
+    errors.sort(axis=0)
+    counts = (targets < n).sum(axis=0)
+    lower = level + _column_quantile(errors, counts, alpha / 2)
+    upper = level + _column_quantile(errors, counts, 1 - alpha / 2)
+    return {
+        'mean': np.full(horizon, level),
+        'lower': lower,
+        'upper': upper,
+        'params': {'window': window, 'level': float(level)},
+    }
+
+def _column_quantile(sorted_values, counts, q):
+    """Quantile (nội suy tuyến tính) của từng cột đã sắp xếp, cột j chỉ có counts[j] giá trị đầu hợp lệ.
+
+    Bước h không còn gốc nào trong lịch sử thì dùng quantile của bước xa nhất đo được.
+    """
+    cols = np.arange(sorted_values.shape[1])
+    pos = q * (np.maximum(counts, 1) - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    out = sorted_values[lo, cols] + (pos - lo) * (sorted_values[hi, cols] - sorted_values[lo, cols])
+    return pd.Series(np.where(counts > 0, out, np.nan)).ffill().to_numpy()
+
+def _load_statsmodels():
+    """Import statsmodels (vài giây ở lần đầu trong mỗi worker, không tính vào thời gian fit)"""
+    from statsmodels.tsa.arima.model import ARIMA
+    from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+    return ETSModel, ARIMA
+
+def _ets_forecast(series, horizon, alpha):
+    ETSModel, _ = _load_statsmodels()
+    fit = ETSModel(series, error='add', trend='add', damped_trend=True).fit(disp=False)
+    frame = fit.get_prediction(start=len(series), end=len(series) + horizon - 1).summary_frame(alpha=alpha)
+    return {
+        'mean': frame['mean'].to_numpy(),
+        'lower': frame['pi_lower'].to_numpy(),
+        'upper': frame['pi_upper'].to_numpy(),
+        'params': dict(zip(fit.param_names, map(float, fit.params))),
+    }
+
+def _arima_forecast(series, horizon, alpha):
+    _, ARIMA = _load_statsmodels()
+    fit = ARIMA(series, order=(1, 1, 1)).fit()
+    frame = fit.get_forecast(horizon).summary_frame(alpha=alpha)
+    return {
+        'mean': frame['mean'].to_numpy(),
+        'lower': frame['mean_ci_lower'].to_numpy(),
+        'upper': frame['mean_ci_upper'].to_numpy(),
+        'params': dict(zip(fit.param_names, map(float, fit.params))),
+    }
+
+def fit_forecast(kind, metric, model, series, version=None, horizon=HORIZON, alpha=ALPHA):
+    """Fit một model và dự báo `horizon` ngày; kết quả là dict JSON được (chạy trong process pool)"""
+    if model in STATSMODELS_MODELS:
+        _load_statsmodels()
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        # ConvergenceWarning/ValueWarning của statsmodels không ảnh hưởng kết quả trả về
+        warnings.simplefilter('ignore')
+        if model == BASELINE:
+            result = baseline_forecast(series.to_numpy(), horizon, alpha=alpha)
+        elif model == 'ets':
+            result = _ets_forecast(series, horizon, alpha)
+        elif model == 'arima':
+            result = _arima_forecast(series, horizon, alpha)
+        else:
+            raise ValueError(f'Unknown model: {model}')
+    elapsed = time.perf_counter() - start
+
+    dates = pd.date_range(series.index[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    return {
+        'version': version,
+        'kind': kind,
+        'metric': metric,
+        'model': model,
+        'dates': dates.strftime('%Y-%m-%d').tolist(),
+        'mean': [float(v) for v in result['mean']],
+        'lower': [float(v) for v in result['lower']],
+        'upper': [float(v) for v in result['upper']],
+        'params': result['params'],
+        'train': {
+            'start': series.index[0].strftime('%Y-%m-%d'),
+            'end': series.index[-1].strftime('%Y-%m-%d'),
+            'rows': len(series),
+        },
+        'fit_seconds': round(elapsed, 4),
+    }
+
+# ---------------------------------------------------------------------------
+# Cache theo phiên bản dữ liệu + fit nền
+# ---------------------------------------------------------------------------
+
+class ForecastService:
+    """Fit model dự báo trong process pool khi dữ liệu đổi phiên bản, phục vụ request từ cache.
+
+    refresh() không chặn: baseline tính ngay (vài ms), ETS/ARIMA gửi vào pool. Kết quả được giữ
+    trong bộ nhớ và ghi ra FORECAST_DIR/<version>/ để lần khởi động sau không phải fit lại.
+    Pool chỉ được tạo khi cần (tránh tạo process lúc import app, vd. trong reloader của Flask).
+    """
+
+    def __init__(self, max_workers=2, cache_dir=FORECAST_DIR):
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._version = None
+        self._results = {}
+        self._pending = {}
+        self._errors = {}
+        self._pool = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(max_workers=int(os.environ.get('FORECAST_WORKERS', 2)))
+
+    def _path(self, version, kind, metric, model):
+        return os.path.join(self.cache_dir, version, f'{kind}_{metric}_{model}.json')
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def refresh(self, version, frames):
+        """Bảo đảm có dự báo cho phiên bản dữ liệu; frames: {'economy': df, 'covid': df}"""
+        with self._lock:
+            if version == self._version:
+                return
+
+        # Kết quả đã lưu và baseline tính xong trước khi công bố phiên bản mới, để request
+        # đồng thời không thấy phiên bản mới khi chưa có baseline làm fallback
+        results, fitted, jobs = {}, [], []
+        for kind, metric in FORECAST_TARGETS:
+            frame = frames.get(kind)
+            if frame is None or metric not in frame.columns:
+                continue
+            series = training_series(frame, metric)
+            for model in available_models():
+                key = (kind, metric, model)
+                cached = self._load(version, key)
+                if cached is not None:
+                    results[key] = cached
+                elif model == BASELINE:
+                    results[key] = fit_forecast(kind, metric, model, series, version)
+                    fitted.append(key)
+                else:
+                    jobs.append((key, series))
+
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            # kết quả của phiên bản cũ không còn dùng; future cũ chạy xong sẽ bị bỏ qua
+            self._results, self._errors = results, {}
+            self._pending = {key: self._executor().submit(fit_forecast, *key, series, version)
+                             for key, series in jobs}
+            pending = dict(self._pending)
+
+        for key in fitted:
+            self._save(version, key, results[key])
+        # callback chạy ngay nếu future đã xong nên phải gắn ngoài lock
+        for key, future in pending.items():
+            future.add_done_callback(lambda f, key=key: self._done(version, key, f))
+
+    def _done(self, version, key, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            with self._lock:
+                if version == self._version:
+                    self._pending.pop(key, None)
+                    self._errors[key] = str(e)
+            return
+        self._store(version, key, result)
+
+    def _store(self, version, key, result):
+        with self._lock:
+            if version != self._version:
+                return
+            self._pending.pop(key, None)
+            self._results[key] = result
+        self._save(version, key, result)
+
+    def _save(self, version, key, result):
+        path = self._path(version, *key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+    def _load(self, version, key):
+        try:
+            with open(self._path(version, *key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get(self, kind, metric, model):
+        """(trạng thái, kết quả/lỗi) của phiên bản hiện tại: ready, pending, failed hoặc missing"""
+        key = (kind, metric, model)
+        with self._lock:
+            if key in self._results:
+                return 'ready', self._results[key]
+            if key in self._pending:
+                return 'pending', None
+            if key in self._errors:
+                return 'failed', self._errors[key]
+        return 'missing', None
+
+    def timings(self):
+        """Thời gian fit của từng model ở phiên bản hiện tại"""
+        with self._lock:
+            rows = [
+                {'kind': kind, 'metric': metric, 'model': model, 'status': 'ready',
+                 'fit_seconds': result['fit_seconds']}
+                for (kind, metric, model), result in self._results.items()
+            ]
+            rows += [{'kind': kind, 'metric': metric, 'model': model, 'status': 'pending'}
+                     for kind, metric, model in self._pending]
+            rows += [{'kind': kind, 'metric': metric, 'model': model, 'status': 'failed', 'error': error}
+                     for (kind, metric, model), error in self._errors.items()]
+            return {'version': self._version, 'models': rows}
+
+    def wait(self, timeout=None):
+        """Chờ các model đang fit (dùng trong CLI)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                pending = list(self._pending.values())
+            if not pending:
+                return True
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if remaining == 0:
+                return False
+            pending[0].exception(timeout=remaining)
+            time.sleep(0.01)  # chờ callback ghi kết quả
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+if __name__ == "__main__":
+    from src.data_schema import data_version, load_processed
+
+    parser = argparse.ArgumentParser(description='Fit model dự báo cho dữ liệu đã xử lý')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--refit', action='store_true', help='Xóa dự báo đã lưu của phiên bản hiện tại và fit lại')
+    args = parser.parse_args()
+
+    version = data_version()
+    if args.refit:
+        shutil.rmtree(os.path.join(FORECAST_DIR, version), ignore_errors=True)
+    service = ForecastService(max_workers=args.workers)
+    start = time.perf_counter()
+    service.refresh(version, {kind: load_processed(kind) for kind in ('economy', 'covid')})
+    service.wait()
+    elapsed = time.perf_counter() - start
+    for row in service.timings()['models']:
+        status, result = service.get(row['kind'], row['metric'], row['model'])
+        detail = (f"{row['fit_seconds'] * 1000:8.1f} ms  ngày +{HORIZON}: {result['mean'][-1]:.2f} "
+                  f"[{result['lower'][-1]:.2f}, {result['upper'][-1]:.2f}]") if status == 'ready' else status
+        print(f"{row['kind']}:{row['metric']:<18} {row['model']:<8} {detail}")
+    print(f"Tổng {elapsed:.2f} s")
+    service.shutdown()
@@ -0,0 +1,140 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+def _keys(df, on):
+    return df[on].to_numpy()
+
+def is_sorted_unique(keys):
+    """Khóa tăng nghiêm ngặt (đã sắp xếp, không trùng)"""
+    return len(keys) < 2 or bool((keys[1:] > keys[:-1]).all())
+
+def is_sorted(keys):
+    """Khóa không giảm (cho phép trùng); NaT/NaN làm phép so sánh sai nên cũng bị loại"""
+    return len(keys) < 2 or bool((keys[1:] >= keys[:-1]).all())
+
+def _overlap_slices(left_keys, right_keys):
+    """Khoảng chung của hai dãy khóa đều bước (vd. daily); None nếu không đều hoặc lệch pha"""
+    if not len(left_keys) or not len(right_keys):
+        return slice(0, 0), slice(0, 0)
+    steps = np.concatenate([np.diff(left_keys), np.diff(right_keys)])
+    if len(steps) and not (steps == steps[0]).all():
+        return None
+    lo = max(left_keys[0], right_keys[0])
+    hi = min(left_keys[-1], right_keys[-1])
+    if lo > hi:
+        return slice(0, 0), slice(0, 0)
+    l0 = int(np.searchsorted(left_keys, lo))
+    r0 = int(np.searchsorted(right_keys, lo))
+    if left_keys[l0] != right_keys[r0]:
+        return None
+    l1 = int(np.searchsorted(left_keys, hi, side='right'))
+    r1 = int(np.searchsorted(right_keys, hi, side='right'))
+    if l1 - l0 != r1 - r0:
+        return None
+    return slice(l0, l1), slice(r0, r1)
+
+def _combine(left, right, on, suffixes):
+    """Ghép cột như pd.merge: cột trái (kèm khóa) rồi cột phải, cột trùng tên thêm hậu tố"""
+    right = right.drop(columns=on)
+    overlap = left.columns.intersection(right.columns).difference([on])
+    if len(overlap):
+        left = left.rename(columns={col: f'{col}{suffixes[0]}' for col in overlap})
+        right = right.rename(columns={col: f'{col}{suffixes[1]}' for col in overlap})
+    return pd.concat([left.reset_index(drop=True), right.reset_index(drop=True)], axis=1)
+
+def aligned_join(left, right, on='date', suffixes=('_x', '_y')):
+    """Inner join theo khóa đã sắp xếp, kết quả giống pd.merge(how='inner').
+
+    Khóa đều bước (chuỗi ngày liên tục) → cắt theo offset, không hash, không sao chép từng dòng.
+    Khóa sắp xếp nhưng có khoảng trống → giao bằng intersect1d. Còn lại dùng pd.merge.
+    """
+    left_keys, right_keys = _keys(left, on), _keys(right, on)
+    if not (is_sorted_unique(left_keys) and is_sorted_unique(right_keys)):
+        return pd.merge(left, right, on=on, how='inner', suffixes=suffixes)
+
+    slices = _overlap_slices(left_keys, right_keys)
+    if slices is not None:
+        left_part, right_part = left.iloc[slices[0]], right.iloc[slices[1]]
+    else:
+        _, left_idx, right_idx = np.intersect1d(left_keys, right_keys, assume_unique=True,
+                                                return_indices=True)
+        left_part, right_part = left.take(left_idx), right.take(right_idx)
+    return _combine(left_part, right_part, on, suffixes)
+
+def asof_join(left, right, on='date', direction='backward', tolerance=None, suffixes=('_x', '_y')):
+    """Ghép mỗi dòng trái với dòng phải gần nhất theo khóa (giống pd.merge_asof).
+
+    Dùng để ghép chuỗi ngày (COVID) với chỉ số theo tháng/quý: direction='backward' lấy
+    giá trị của kỳ gần nhất đã công bố. Hai khóa phải đã sắp xếp tăng dần.
+    """
+    left_keys, right_keys = _keys(left, on), _keys(right, on)
+    # searchsorted chỉ đúng trên khóa đã sắp xếp; báo lỗi như pd.merge_asof thay vì trả kết quả sai
+    if not is_sorted(left_keys):
+        raise ValueError('left keys must be sorted')
+    if not is_sorted(right_keys):
+        raise ValueError('right keys must be sorted')
+    if direction == 'backward':
+        # Cả hai khóa đã sắp xếp: đếm số khóa phải ≤ từng khóa trái (O(n + m log n))
+        pos = np.searchsorted(left_keys, right_keys, side='left')
+        idx = np.cumsum(np.bincount(pos, minlength=len(left_keys) + 1)[:len(left_keys)]) - 1
+    elif direction == 'forward':
+        idx = np.searchsorted(right_keys, left_keys, side='left')
+        idx[idx >= len(right_keys)] = -1
+    else:
+        raise ValueError(f'Unsupported direction: {direction}')
+
+    if tolerance is not None and len(right_keys):
+        gap = np.abs(left_keys - right_keys[np.clip(idx, 0, None)])
+        idx[gap > np.asarray(tolerance).astype(gap.dtype)] = -1
+
+    if (idx >= 0).all():
+        # Gom từng cột bằng take trên mảng, tránh DataFrame.take
+        matched = pd.DataFrame({col: right[col].array.take(idx) for col in right.columns}, copy=False)
+    else:
+        # Nhãn -1 không có trong RangeIndex nên reindex trả NaN cho dòng không khớp
+        matched = right.reset_index(drop=True).reindex(idx)
+    return _combine(left, matched, on, suffixes)
+
+def benchmark(scale=500, repeat=10):
+    """So sánh với pd.merge / pd.merge_asof trên dữ liệu nhân bản scale lần"""
+    from src.data_schema import load_processed
+
+    economy = load_processed('economy')
+    covid = load_processed('covid')
+    big_economy = pd.concat([economy] * scale, ignore_index=True)
+    big_economy['date'] = pd.date_range('1000-01-01', periods=len(big_economy), freq='D', unit='s')
+    # COVID bắt đầu từ giữa chuỗi kinh tế để phần giao chỉ là một đoạn
+    big_covid = pd.concat([covid] * scale, ignore_index=True)
+    big_covid['date'] = pd.date_range(big_economy['date'].iloc[len(big_economy) // 2],
+                                      periods=len(big_covid), freq='D', unit='s')
+    monthly = big_economy.set_index('date')[['unemployment_rate', 'gdp_growth']].resample('MS').mean().reset_index()
+
+    def timed(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        return result, (time.perf_counter() - start) / repeat * 1000
+
+    cases = [
+        ('inner join daily',
+         lambda: pd.merge(big_economy, big_covid, on='date', how='inner'),
+         lambda: aligned_join(big_economy, big_covid)),
+        ('inner join daily (2 cột)',
+         lambda: pd.merge(big_economy, big_covid[['date', 'cases', 'deaths']], on='date', how='inner'),
+         lambda: aligned_join(big_economy, big_covid[['date', 'cases', 'deaths']])),
+        ('as-of daily ← monthly',
+         lambda: pd.merge_asof(big_covid, monthly, on='date'),
+         lambda: asof_join(big_covid, monthly)),
+    ]
+    print(f"{len(big_economy):,} dòng kinh tế, {len(big_covid):,} dòng COVID, {len(monthly):,} tháng")
+    for label, baseline, fast in cases:
+        expected, t_base = timed(baseline)
+        actual, t_fast = timed(fast)
+        pd.testing.assert_frame_equal(expected, actual)
+        print(f"{label}: pandas {t_base:.1f} ms, aligned {t_fast:.1f} ms (x{t_base / t_fast:.1f})")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,269 @@
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba là tùy chọn, fallback sang NumPy thuần
+    NUMBA_AVAILABLE = False
+
+ECONOMY_WINDOWS = (7, 30)
+
+# Thứ tự cột đầu ra, khớp với thứ tự cột của bản pandas
+COVID_COLUMNS = [
+    'daily_cases', 'daily_deaths', 'daily_recovered',
+    'cases_ma7', 'cases_ma14', 'deaths_ma7', 'recovered_ma7',
+    'mortality_rate', 'recovery_rate', 'growth_rate',
+]
+ECONOMY_MA_COLUMNS = [
+    'unemployment_ma7', 'unemployment_ma30',
+    'gdp_ma7', 'gdp_ma30',
+    'stock_ma7', 'stock_ma30',
+    'retail_ma7', 'retail_ma30',
+]
+ECONOMY_CHANGE_COLUMNS = ['unemployment_change', 'gdp_change', 'stock_change', 'retail_change']
+
+def supports(df, columns):
+    """Kernel giả định đầu vào không có NaN; nếu có thì dùng bản pandas"""
+    return all(col in df.columns and not df[col].isna().any() for col in columns)
+
+def _as_float(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+# ---------------------------------------------------------------------------
+# NumPy
+# ---------------------------------------------------------------------------
+
+def rolling_mean(x, window):
+    """Rolling mean với min_periods=1 (x không có NaN)"""
+    csum = np.cumsum(x)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    counts = np.minimum(np.arange(1, len(x) + 1), window)
+    return out / counts
+
+def first_diff(x):
+    """diff() với giá trị đầu giữ nguyên (tương đương diff().fillna(x))"""
+    out = np.empty_like(x)
+    out[:1] = x[:1]
+    out[1:] = x[1:] - x[:-1]
+    return out
+
+def pct_change(x):
+    """pct_change() * 100, phần tử đầu là NaN"""
+    out = np.full_like(x, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = (x[1:] / x[:-1] - 1) * 100
+    return out
+
+def ratio_percent(num, den):
+    """num / den * 100, inf → 0, NaN (0/0) được ffill rồi bfill rồi 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = num / den * 100
+    out[np.isinf(out)] = 0
+    return ffill_bfill(out, fill_value=0)
+
+def ffill_bfill(x, fill_value=None):
+    """ffill().bfill() (và fillna(fill_value)) trên mảng 1 chiều"""
+    mask = np.isnan(x)
+    if not mask.any():
+        return x
+    idx = np.where(mask, 0, np.arange(len(x)))
+    np.maximum.accumulate(idx, out=idx)
+    out = x[idx]
+    # bfill phần NaN ở đầu mảng
+    still = np.isnan(out)
+    if still.any() and not still.all():
+        first_valid = np.argmax(~still)
+        out[:first_valid] = out[first_valid]
+    if fill_value is not None:
+        out[np.isnan(out)] = fill_value
+    return out
+
+def _covid_numpy(cases, deaths, recovered):
+    daily_cases = first_diff(cases)
+    daily_deaths = first_diff(deaths)
+    daily_recovered = first_diff(recovered)
+
+    growth = pct_change(daily_cases)
+    growth[~np.isfinite(growth)] = 0
+
+    return [
+        daily_cases, daily_deaths, daily_recovered,
+        rolling_mean(daily_cases, 7), rolling_mean(daily_cases, 14),
+        rolling_mean(daily_deaths, 7), rolling_mean(daily_recovered, 7),
+        ratio_percent(deaths, cases), ratio_percent(recovered, cases),
+        growth,
+    ]
+
+def _economy_numpy(unemployment, gdp, stock, retail):
+    mas = []
+    for series in (unemployment, gdp, stock, retail):
+        for window in ECONOMY_WINDOWS:
+            mas.append(rolling_mean(series, window))
+
+    changes = []
+    for series, kind in ((unemployment, 'diff'), (gdp, 'diff'), (stock, 'pct'), (retail, 'pct')):
+        if kind == 'diff':
+            change = np.full_like(series, np.nan)
+            change[1:] = series[1:] - series[:-1]
+        else:
+            change = pct_change(series)
+        changes.append(change)
+
+    return mas, changes
+
+# ---------------------------------------------------------------------------
+# Numba: một vòng lặp duy nhất, giữ tổng trượt cho mọi cửa sổ
+# ---------------------------------------------------------------------------
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _covid_fused(cases, deaths, recovered, out):
+        n = cases.shape[0]
+        s_c7 = 0.0
+        s_c14 = 0.0
+        s_d7 = 0.0
+        s_r7 = 0.0
+        for i in range(n):
+            if i == 0:
+                dc = cases[0]
+                dd = deaths[0]
+                dr = recovered[0]
+            else:
+                dc = cases[i] - cases[i - 1]
+                dd = deaths[i] - deaths[i - 1]
+                dr = recovered[i] - recovered[i - 1]
+            out[0, i] = dc
+            out[1, i] = dd
+            out[2, i] = dr
+
+            s_c7 += dc
+            s_c14 += dc
+            s_d7 += dd
+            s_r7 += dr
+            if i >= 7:
+                s_c7 -= out[0, i - 7]
+                s_d7 -= out[1, i - 7]
+                s_r7 -= out[2, i - 7]
+            if i >= 14:
+                s_c14 -= out[0, i - 14]
+            out[3, i] = s_c7 / min(i + 1, 7)
+            out[4, i] = s_c14 / min(i + 1, 14)
+            out[5, i] = s_d7 / min(i + 1, 7)
+            out[6, i] = s_r7 / min(i + 1, 7)
+
+            if cases[i] != 0:
+                out[7, i] = deaths[i] / cases[i] * 100
+                out[8, i] = recovered[i] / cases[i] * 100
+            else:
+                # x/0 → inf → 0; 0/0 → NaN, được ffill/bfill ở bước sau
+                out[7, i] = 0.0 if deaths[i] != 0 else np.nan
+                out[8, i] = 0.0 if recovered[i] != 0 else np.nan
+
+            if i == 0 or out[0, i - 1] == 0:
+                out[9, i] = 0.0
+            else:
+                out[9, i] = (dc / out[0, i - 1] - 1) * 100
+
+    @njit(cache=True)
+    def _economy_fused(values, windows, out_ma, out_change, pct_flags):
+        n_series = values.shape[0]
+        n = values.shape[1]
+        n_windows = windows.shape[0]
+        sums = np.zeros((n_series, n_windows))
+        for i in range(n):
+            for s in range(n_series):
+                v = values[s, i]
+                for w in range(n_windows):
+                    window = windows[w]
+                    sums[s, w] += v
+                    if i >= window:
+                        sums[s, w] -= values[s, i - window]
+                    out_ma[s * n_windows + w, i] = sums[s, w] / min(i + 1, window)
+                if i > 0:
+                    prev = values[s, i - 1]
+                    if pct_flags[s]:
+                        out_change[s, i] = (v / prev - 1) * 100 if prev != 0 else np.inf * np.sign(v)
+                    else:
+                        out_change[s, i] = v - prev
+
+def covid_features(cases, deaths, recovered, backend=None):
+    """Tính toàn bộ cột dẫn xuất COVID trong một lượt. Trả về dict theo COVID_COLUMNS"""
+    cases, deaths, recovered = _as_float(cases), _as_float(deaths), _as_float(recovered)
+    backend = backend or ('numba' if NUMBA_AVAILABLE else 'numpy')
+
+    if backend == 'numba':
+        out = np.empty((len(COVID_COLUMNS), len(cases)))
+        _covid_fused(cases, deaths, recovered, out)
+        columns = list(out)
+        columns[7] = ffill_bfill(columns[7], fill_value=0)
+        columns[8] = ffill_bfill(columns[8], fill_value=0)
+    else:
+        columns = _covid_numpy(cases, deaths, recovered)
+
+    return dict(zip(COVID_COLUMNS, columns))
+
+def economy_features(unemployment, gdp, stock, retail, backend=None):
+    """Tính rolling mean và biến động cho 4 chỉ số kinh tế. Trả về dict theo thứ tự cột"""
+    series = [_as_float(s) for s in (unemployment, gdp, stock, retail)]
+    backend = backend or ('numba' if NUMBA_AVAILABLE else 'numpy')
+
+    if backend == 'numba':
+        values = np.ascontiguousarray(np.vstack(series))
+        n = values.shape[1]
+        out_ma = np.empty((len(ECONOMY_MA_COLUMNS), n))
+        out_change = np.full((len(ECONOMY_CHANGE_COLUMNS), n), np.nan)
+        _economy_fused(values, np.array(ECONOMY_WINDOWS, dtype=np.int64), out_ma, out_change,
+                       np.array([False, False, True, True]))
+        mas, changes = list(out_ma), list(out_change)
+    else:
+        mas, changes = _economy_numpy(*series)
+
+    # tương đương df.ffill().bfill() của bản pandas (NaN đầu tiên của diff / pct_change)
+    changes = [ffill_bfill(change) for change in changes]
+
+    return dict(zip(ECONOMY_MA_COLUMNS, mas)), dict(zip(ECONOMY_CHANGE_COLUMNS, changes))
+
+def benchmark(repeat=20, scale=100):
+    """Đo thời gian bản pandas và kernel trên dữ liệu nhân bản `scale` lần"""
+    import pandas as pd
+    from src.data_processing import RAW_PATHS, add_covid_features, add_economy_features
+
+    backends = ['numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+    for kind, builder in (('covid', add_covid_features), ('economy', add_economy_features)):
+        raw = pd.read_csv(RAW_PATHS[kind])
+        big = pd.concat([raw] * scale, ignore_index=True)
+        big['date'] = pd.date_range('1900-01-01', periods=len(big), freq='D')
+        if kind == 'covid':
+            # giữ tính lũy kế khi nhân bản
+            for col in ('cases', 'deaths', 'recovered'):
+                big[col] = np.cumsum(np.diff(big[col].to_numpy(), prepend=0).clip(min=0))
+
+        def timed(**kwargs):
+            builder(big.copy(), **kwargs)  # warm-up (JIT)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                builder(big.copy(), **kwargs)
+            return (time.perf_counter() - start) / repeat
+
+        inputs = [big[col].to_numpy() for col in (
+            ('cases', 'deaths', 'recovered') if kind == 'covid'
+            else ('unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales'))]
+        kernel = covid_features if kind == 'covid' else economy_features
+
+        base = timed(use_kernels=False)
+        print(f"{kind} ({len(big):,} dòng) pandas: {base * 1000:.1f} ms")
+        for backend in backends:
+            t = timed(use_kernels=True, backend=backend)
+            kernel(*inputs, backend=backend)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                kernel(*inputs, backend=backend)
+            k = (time.perf_counter() - start) / repeat
+            print(f"{kind} ({len(big):,} dòng) {backend}: {t * 1000:.1f} ms (x{base / t:.1f}), "
+                  f"riêng kernel {k * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    benchmark()
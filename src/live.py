@@ -0,0 +1,104 @@
+import json
+import queue
+import threading
+
+import numpy as np
+
+class Subscription:
+    """Một client SSE: tập series đăng ký và hàng đợi sự kiện có giới hạn"""
+
+    def __init__(self, series, maxsize=64):
+        self.series = set(series)
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class LiveBroker:
+    """Phát delta dữ liệu mới cho các client đang nghe /api/stream.
+
+    Mỗi client chỉ nhận các series đã đăng ký ('economy:<cột>', 'covid:<cột>', 'correlation').
+    Client đọc chậm làm đầy hàng đợi thì nhận sự kiện 'resync' để tải lại toàn bộ figure.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, series):
+        subscription = Subscription(series)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, update):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            event = filter_update(update, subscription.series)
+            if event is None:
+                continue
+            try:
+                subscription.queue.put_nowait(('update', event))
+            except queue.Full:
+                _drain(subscription.queue)
+                subscription.queue.put_nowait(('resync', {'version': update['version']}))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+def _drain(q):
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+
+def _to_list(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='D').tolist()
+    return values.tolist()
+
+def build_update(version, kind, rows, corr_before=None, corr_after=None, tol=1e-12):
+    """Delta của một lần ingest: các điểm mới theo cột và các ô tương quan thay đổi"""
+    dates = _to_list(rows['date'].to_numpy())
+    series = {
+        f'{kind}:{col}': {'x': dates, 'y': _to_list(rows[col].to_numpy(dtype=np.float64))}
+        for col in rows.select_dtypes(include='number').columns
+    }
+    update = {'version': version, 'series': series}
+
+    if corr_after is not None:
+        after = corr_after.to_numpy()
+        if corr_before is not None and corr_before.shape == corr_after.shape:
+            before = corr_before.to_numpy()
+            changed = ~(np.isclose(before, after, rtol=0, atol=tol) | (np.isnan(before) & np.isnan(after)))
+        else:
+            changed = np.ones(after.shape, dtype=bool)
+        update['correlation'] = [
+            [int(i), int(j), None if np.isnan(after[i, j]) else float(after[i, j])]
+            for i, j in zip(*np.nonzero(changed))
+        ]
+    return update
+
+def filter_update(update, series):
+    """Chỉ giữ các series client đăng ký; None nếu không có gì cho client này"""
+    event = {'version': update['version']}
+    selected = {key: value for key, value in update['series'].items() if key in series}
+    if selected:
+        event['series'] = selected
+    if 'correlation' in series and update.get('correlation'):
+        event['correlation'] = update['correlation']
+    return event if len(event) > 1 else None
+
+def format_sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):  # chạy trực tiếp: python src/memprofile.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MEMPROFILE_DIR = 'cache/memprofile'
+
+# Các route được benchmark đo (python -m src.memprofile bench)
+BENCH_URLS = [
+    '/api/stats',
+    '/api/economy/timeseries',
+    '/api/economy/timeseries?max_points=60',
+    '/api/economy/distribution',
+    '/api/economy/scatter',
+    '/api/economy/heatmap',
+    '/api/economy/comparison',
+    '/api/economy/sunburst',
+    '/api/covid/timeseries',
+    '/api/covid/timeseries?start_date=2021-01-01&end_date=2021-12-31',
+    '/api/covid/treemap',
+    '/api/impact/analysis',
+    '/api/visualizations/all',
+]
+
+class MemoryProfiler:
+    """Theo dõi cấp phát bộ nhớ theo route bằng tracemalloc (bật qua MEMPROFILE=1).
+
+    Mỗi request: peak cấp phát trong lúc xử lý (so với lúc bắt đầu) và phần còn giữ lại sau
+    khi xong. Mỗi route giữ snapshot sau request đầu tiên và snapshot gần nhất (lấy mẫu mỗi
+    snapshot_every request) để xem dòng code nào làm bộ nhớ tăng.
+    Peak của tracemalloc là của cả process nên khi nhiều request chạy song song chỉ là gần đúng.
+    """
+
+    def __init__(self, frames=1, snapshot_every=50):
+        self.frames = frames
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._routes = {}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @classmethod
+    def from_env(cls):
+        """Profiler nếu MEMPROFILE=1 (MEMPROFILE_FRAMES: số frame traceback), ngược lại None"""
+        if os.environ.get('MEMPROFILE') not in ('1', 'true', 'yes'):
+            return None
+        return cls(frames=int(os.environ.get('MEMPROFILE_FRAMES', 1)))
+
+    def begin(self):
+        """Gọi đầu request; trả về trạng thái truyền lại cho end()"""
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0], time.perf_counter()
+
+    def end(self, route, state):
+        current, peak = tracemalloc.get_traced_memory()
+        start_bytes, start_time = state
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                'requests': 0, 'total_peak': 0, 'max_peak': 0, 'net': 0, 'seconds': 0.0,
+                'first_snapshot': None, 'last_snapshot': None,
+            })
+            stats['requests'] += 1
+            stats['total_peak'] += peak - start_bytes
+            stats['max_peak'] = max(stats['max_peak'], peak - start_bytes)
+            stats['net'] += current - start_bytes
+            stats['seconds'] += time.perf_counter() - start_time
+            take = stats['requests'] == 1 or stats['requests'] % self.snapshot_every == 0
+        if take:
+            snapshot = _filtered(tracemalloc.take_snapshot())
+            with self._lock:
+                stats['first_snapshot'] = stats['first_snapshot'] or snapshot
+                stats['last_snapshot'] = snapshot
+
+    def report(self, top=10):
+        """Thống kê theo route (byte), kèm top dòng code tăng bộ nhớ giữa hai snapshot"""
+        with self._lock:
+            routes = {route: dict(stats) for route, stats in self._routes.items()}
+        result = {}
+        for route, stats in routes.items():
+            first, last = stats.pop('first_snapshot'), stats.pop('last_snapshot')
+            stats['avg_peak'] = stats['total_peak'] // stats['requests']
+            stats['avg_ms'] = round(stats.pop('seconds') / stats['requests'] * 1000, 2)
+            del stats['total_peak']
+            stats['growth'] = [] if first is None or first is last else [
+                {'where': str(stat.traceback), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                for stat in last.compare_to(first, 'lineno')[:top] if stat.size_diff
+            ]
+            result[route] = stats
+        return result
+
+    def traced(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return {'current': current, 'peak': peak}
+
+    def dump(self, path=None):
+        """Ghi snapshot hiện tại ra file để so sánh bằng `python -m src.memprofile diff`"""
+        path = path or os.path.join(MEMPROFILE_DIR, time.strftime('%Y%m%d-%H%M%S') + '.snap')
+        out_dir = os.path.dirname(path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        _filtered(tracemalloc.take_snapshot()).dump(path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+def _filtered(snapshot):
+    """Bỏ cấp phát của chính tracemalloc/import khỏi snapshot"""
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+
+# ---------------------------------------------------------------------------
+# Kích thước bộ nhớ của kho dữ liệu và cache
+# ---------------------------------------------------------------------------
+
+def deep_sizeof(obj, seen=None):
+    """Ước lượng byte của một đối tượng (DataFrame/mảng/dict/list/chuỗi lồng nhau)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+def footprints(visualizer, chart_cache=None):
+    """Byte của các DataFrame trong kho dữ liệu và của từng cache (DataFrame dùng chung chỉ tính một lần)"""
+    seen = set()
+    result = {
+        'economy_data': deep_sizeof(visualizer.economy_data, seen),
+        'covid_data': deep_sizeof(visualizer.covid_data, seen),
+        'merged_data': deep_sizeof(visualizer.merged_data, seen),
+        # mức 'day' là DataFrame gốc, đã tính ở trên
+        'pyramids': deep_sizeof(visualizer._pyramids, seen),
+        'region_pyramids': deep_sizeof(visualizer._region_pyramids, seen),
+        'regions': deep_sizeof({kind: index.frame for kind, index in visualizer._regions.items()}, seen),
+        'figures': deep_sizeof(visualizer._figures, seen),
+        'sketches': deep_sizeof(visualizer._sketches, seen),
+    }
+    if chart_cache is not None:
+        result['chart_cache'] = deep_sizeof(chart_cache.values(), seen)
+    result['total'] = sum(result.values())
+    return result
+
+# ---------------------------------------------------------------------------
+# CLI: so sánh snapshot, benchmark bộ nhớ theo route
+# ---------------------------------------------------------------------------
+
+def diff(old_path, new_path, top=20, key_type='lineno'):
+    """In các vị trí cấp phát tăng/giảm nhiều nhất giữa hai snapshot"""
+    old = tracemalloc.Snapshot.load(old_path)
+    new = tracemalloc.Snapshot.load(new_path)
+    stats = new.compare_to(old, key_type)
+    total = sum(stat.size_diff for stat in stats)
+    print(f"Tổng thay đổi: {total / 1024:+.1f} KiB")
+    for stat in stats[:top]:
+        print(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} khối  {stat.traceback}")
+    return stats
+
+def benchmark(repeat=20, cold=False, urls=BENCH_URLS):
+    """Gọi từng route qua test client của Flask với profiler bật; trả về thống kê theo URL.
+
+    cold=True xóa chart cache trước mỗi request để đo chính hàm dựng chart.
+    """
+    os.environ['MEMPROFILE'] = '1'
+    import app as webapp
+
+    client = webapp.app.test_client()
+    profiler = webapp.memory_profiler
+    results = {}
+    for url in urls:
+        peaks, nets = [], []
+        client.get(url)  # warmup: import, template, cache lần đầu
+        for _ in range(repeat):
+            if cold:
+                webapp.chart_cache.clear()
+            state = profiler.begin()
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url}: HTTP {response.status_code}')
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - state[0])
+            nets.append(current - state[0])
+        results[url] = {'peak': int(np.median(peaks)), 'net': int(sum(nets))}
+    results['footprints'] = footprints(webapp.visualizer, webapp.chart_cache)
+    return results
+
+def check_regressions(results, baseline, tolerance=0.2, max_growth=512 * 1024):
+    """Các URL có peak vượt baseline quá tolerance hoặc giữ lại quá max_growth byte"""
+    failures = []
+    for url, stats in results.items():
+        if url == 'footprints':
+            continue
+        if stats['net'] > max_growth:
+            failures.append(f"{url}: giữ lại {stats['net'] / 1024:.0f} KiB sau các lần gọi")
+        old = baseline.get(url)
+        if old and stats['peak'] > old['peak'] * (1 + tolerance):
+            failures.append(f"{url}: peak {old['peak'] / 1024:.0f} → {stats['peak'] / 1024:.0f} KiB")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Công cụ đo bộ nhớ cho web app')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    diff_parser = sub.add_parser('diff', help='So sánh hai snapshot tracemalloc')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('--top', type=int, default=20)
+    diff_parser.add_argument('--key', default='lineno', choices=['lineno', 'filename', 'traceback'])
+
+    bench_parser = sub.add_parser('bench', help='Đo peak/bộ nhớ giữ lại theo route')
+    bench_parser.add_argument('--repeat', type=int, default=20)
+    bench_parser.add_argument('--cold', action='store_true', help='Xóa chart cache trước mỗi request')
+    bench_parser.add_argument('--output', help='Ghi kết quả JSON (dùng làm baseline lần sau)')
+    bench_parser.add_argument('--baseline', help='File JSON của lần chạy trước để so sánh')
+    bench_parser.add_argument('--tolerance', type=float, default=0.2)
+    bench_parser.add_argument('--max-growth-kb', type=int, default=512)
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        diff(args.old, args.new, args.top, args.key)
+    else:
+        results = benchmark(args.repeat, args.cold)
+        print(f"{'Route':<66} {'Peak':>10} {'Giữ lại':>10}")
+        for url, stats in results.items():
+            if url != 'footprints':
+                print(f"{url:<66} {stats['peak'] / 1024:>8.0f} KiB {stats['net'] / 1024:>8.0f} KiB")
+        print("\nKích thước dữ liệu/cache:")
+        for name, size in results['footprints'].items():
+            print(f"  {name:<16} {size / 1e6:8.2f} MB")
+        if args.output:
+            out_dir = os.path.dirname(args.output)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        baseline = {}
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        failures = check_regressions(results, baseline, args.tolerance, args.max_growth_kb * 1024)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            raise SystemExit(1)
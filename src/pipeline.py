@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+if __package__ in (None, ''):  # chạy trực tiếp: python src/pipeline.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import anomaly, pyramid
+from src.data_processing import RAW_PATHS
+from src.data_schema import PROCESSED_SCHEMAS
+from src.snapshot import SNAPSHOT_PATH, SOURCE_FILES as SNAPSHOT_SOURCES
+
+STATE_PATH = 'cache/pipeline_state.json'
+
+class Stage:
+    """Một bước của pipeline: hàm chạy, file đầu vào/đầu ra khai báo và tham số.
+
+    Khóa của stage là hash của tham số và nội dung các file đầu vào (kể cả mã nguồn),
+    nên đầu ra của stage phía trước thay đổi thì stage phía sau tự chạy lại.
+    """
+
+    def __init__(self, name, fn, inputs=(), outputs=(), params=None, deps=()):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.deps = list(deps)
+
+    def key(self):
+        digest = hashlib.sha256()
+        digest.update(self.name.encode('utf-8'))
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode('utf-8'))
+        for path in self.inputs:
+            digest.update(path.encode('utf-8'))
+            digest.update(file_hash(path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def run(self):
+        self.fn(**self.params)
+
+def file_hash(path):
+    """sha256 nội dung file; FileNotFoundError nếu đầu vào chưa có"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# ---------------------------------------------------------------------------
+# Hàm của từng stage (cấp module để chạy được trong process pool)
+# ---------------------------------------------------------------------------
+
+def collect(kind, seed):
+    from src.data_collection import collect_covid_data, collect_economy_data
+    collector = collect_economy_data if kind == 'economy' else collect_covid_data
+    os.makedirs(os.path.dirname(RAW_PATHS[kind]), exist_ok=True)
+    collector(seed=seed).to_csv(RAW_PATHS[kind], index=False)
+
+def process(kind):
+    from src.data_processing import process_covid_data, process_economy_data
+    (process_economy_data if kind == 'economy' else process_covid_data)()
+
+def anomalies(kind, metrics, **params):
+    anomaly.process_anomalies(kind, metrics, **params)
+
+def snapshot():
+    from src.snapshot import build_snapshot
+    build_snapshot()
+
+def report(output):
+    import demo
+    demo.generate_markdown_report(output=output, force=True, verbose=False)
+
+def default_stages(seed=42, report_output='REPORT_FINAL.md'):
+    """collect → process (economy, covid song song) → anomaly, snapshot, report"""
+    processed = [PROCESSED_SCHEMAS[kind]['path'] for kind in ('economy', 'covid')]
+    stages = []
+    for kind in ('economy', 'covid'):
+        stages.append(Stage(
+            f'collect_{kind}', collect,
+            inputs=['src/data_collection.py'],
+            outputs=[RAW_PATHS[kind]],
+            params={'kind': kind, 'seed': seed},
+        ))
+        # Cửa sổ rolling, mức/hàm tổng hợp của pyramid là hằng số trong mã nguồn đầu vào
+        stages.append(Stage(
+            f'process_{kind}', process,
+            inputs=[RAW_PATHS[kind], 'src/data_processing.py', 'src/kernels.py', 'src/pyramid.py',
+                    'src/data_schema.py'],
+            outputs=[PROCESSED_SCHEMAS[kind]['path'],
+                     os.path.join(pyramid.PYRAMID_DIR, f'{kind}_manifest.json')],
+            params={'kind': kind},
+            deps=[f'collect_{kind}'],
+        ))
+        stages.append(Stage(
+            f'anomaly_{kind}', anomalies,
+            inputs=[PROCESSED_SCHEMAS[kind]['path'], 'src/anomaly.py'],
+            outputs=[os.path.join(anomaly.ANOMALY_DIR, f'{kind}_anomalies.csv'),
+                     os.path.join(anomaly.ANOMALY_DIR, f'{kind}_manifest.json')],
+            params={'kind': kind, 'metrics': anomaly.METRICS[kind], **anomaly.default_params()},
+            deps=[f'process_{kind}'],
+        ))
+    stages.append(Stage(
+        'snapshot', snapshot,
+        inputs=processed + SNAPSHOT_SOURCES,
+        outputs=[SNAPSHOT_PATH],
+        deps=['process_economy', 'process_covid'],
+    ))
+    import demo
+    # Template báo cáo do người dùng cung cấp, không nằm trong repo: thiếu thì bỏ stage report
+    if os.path.exists(demo.TEMPLATE_PATH):
+        stages.append(Stage(
+            'report', report,
+            inputs=processed + [demo.TEMPLATE_PATH, 'demo.py'],
+            outputs=[report_output],
+            params={'output': report_output},
+            deps=['process_economy', 'process_covid'],
+        ))
+    return stages
+
+class Pipeline:
+    """Chạy các stage theo thứ tự phụ thuộc, song song khi có thể, bỏ qua stage đã cập nhật"""
+
+    def __init__(self, stages, state_path=STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        out_dir = os.path.dirname(self.state_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def up_to_date(self, stage, key):
+        """Khóa khớp lần chạy trước và đầu ra còn nguyên (không bị sửa tay)"""
+        record = self.state.get(stage.name)
+        if not record or record.get('key') != key:
+            return False
+        try:
+            return all(file_hash(path) == record['outputs'].get(path) for path in stage.outputs)
+        except FileNotFoundError:
+            return False
+
+    def _select(self, targets):
+        """Các stage cần cho targets (kèm toàn bộ stage phụ thuộc)"""
+        selected = set()
+        pending = list(targets or self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f'Unknown stage: {name}')
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in selected]
+
+    def run(self, targets=None, force=False, max_workers=None):
+        """Chạy pipeline; trả về dict tên stage → (trạng thái, giây)"""
+        order = self._select(targets)
+        results = {}
+        running = {}
+        submitted = set()
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            while len(results) < len(order):
+                for name in order:
+                    if name in results or name in submitted:
+                        continue
+                    stage = self.stages[name]
+                    deps = [results.get(dep) for dep in stage.deps]
+                    if any(dep is None for dep in deps):
+                        continue
+                    if any(dep[0] in ('failed', 'blocked') for dep in deps):
+                        results[name] = ('blocked', 0.0)
+                        continue
+                    try:
+                        key = stage.key()
+                    except FileNotFoundError as e:
+                        results[name] = ('failed', 0.0)
+                        print(f"❌ {name}: thiếu đầu vào {e.filename}")
+                        continue
+                    if not force and self.up_to_date(stage, key):
+                        results[name] = ('skipped', 0.0)
+                        continue
+                    running[pool.submit(_timed_run, stage)] = (name, key)
+                    submitted.add(name)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        elapsed = future.result()
+                        self.state[name] = {
+                            'key': key,
+                            'outputs': {path: file_hash(path) for path in stage.outputs},
+                            'seconds': round(elapsed, 3),
+                        }
+                        self._save_state()
+                        results[name] = ('ran', elapsed)
+                    except Exception as e:
+                        results[name] = ('failed', 0.0)
+                        print(f"❌ {name}: {e}")
+
+        return {name: results[name] for name in order}
+
+def _timed_run(stage):
+    start = time.perf_counter()
+    stage.run()
+    return time.perf_counter() - start
+
+def print_summary(results):
+    icons = {'ran': '✅', 'skipped': '⏭️ ', 'failed': '❌', 'blocked': '⛔'}
+    print("\nStage               Trạng thái   Thời gian")
+    for name, (status, seconds) in results.items():
+        print(f"{icons[status]} {name:<17} {status:<12} {seconds:.2f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Chạy pipeline thu thập → xử lý → snapshot/báo cáo')
+    parser.add_argument('stages', nargs='*', help='Stage đích (mặc định: tất cả)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='Chạy lại kể cả stage đã cập nhật')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    results = Pipeline(default_stages(seed=args.seed)).run(args.stages, args.force, args.workers)
+    print_summary(results)
+    if any(status in ('failed', 'blocked') for status, _ in results.values()):
+        raise SystemExit(1)
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pandas as pd
+
+# Các mức tổng hợp từ mịn đến thô. 'day' là dữ liệu gốc, không tổng hợp lại.
+LEVELS = [
+    ('day', None),
+    ('week', 'W-SUN'),
+    ('month', 'MS'),
+    ('quarter', 'QS'),
+]
+AGGREGATES = ['mean', 'min', 'max', 'last']
+# Giá trị freq hợp lệ của API; kho truy vấn (src/query_backend.py) hỗ trợ cùng các mức này
+FREQUENCIES = [level for level, _ in LEVELS]
+
+# Cột lịch không có ý nghĩa khi tổng hợp
+CALENDAR_COLUMNS = {'year', 'month', 'quarter', 'day_of_week', 'week_of_year', 'is_weekend'}
+
+PYRAMID_DIR = 'data/processed/pyramid'
+
+def pyramid_metrics(df):
+    """Các cột số cần tổng hợp (bỏ cột lịch)"""
+    numeric = df.select_dtypes(include='number').columns
+    return [col for col in numeric if col not in CALENDAR_COLUMNS]
+
+def build_pyramid(df, metrics=None):
+    """Tạo các mức tổng hợp tuần/tháng/quý (mean, min, max, last) cho từng metric.
+
+    Mỗi mức là DataFrame có cột date (đầu kỳ) và các cột '<metric>_<agg>'.
+    Mức 'day' chính là DataFrame gốc (không sao chép), đọc qua level_column().
+    """
+    metrics = metrics or pyramid_metrics(df)
+    pyramid = {'day': df}
+
+    indexed = df[['date'] + metrics].set_index('date').sort_index()
+    for level, rule in LEVELS[1:]:
+        grouped = indexed.resample(rule, label='left', closed='left').agg(AGGREGATES)
+        grouped.columns = [f'{metric}_{agg}' for metric, agg in grouped.columns]
+        pyramid[level] = grouped.dropna(how='all').reset_index()
+    return pyramid
+
+def level_column(level, metric, agg='mean'):
+    """Tên cột của metric ở một mức tổng hợp"""
+    return metric if level == 'day' else f'{metric}_{agg}'
+
+def save_pyramid(pyramid, kind, source_version, out_dir=PYRAMID_DIR):
+    """Ghi các mức tổng hợp ra CSV kèm manifest (phiên bản dữ liệu nguồn)"""
+    os.makedirs(out_dir, exist_ok=True)
+    levels = {level: frame for level, frame in pyramid.items() if level != 'day'}
+    for level, frame in levels.items():
+        frame.to_csv(os.path.join(out_dir, f'{kind}_{level}.csv'), index=False)
+    manifest = {
+        'kind': kind,
+        'source_version': source_version,
+        'levels': {level: len(frame) for level, frame in levels.items()},
+    }
+    with open(os.path.join(out_dir, f'{kind}_manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def load_pyramid(kind, base, source_version, out_dir=PYRAMID_DIR):
+    """Đọc pyramid đã lưu (mức 'day' là base); None nếu thiếu hoặc không khớp phiên bản"""
+    manifest_path = os.path.join(out_dir, f'{kind}_manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('source_version') != source_version:
+        return None
+    pyramid = {'day': base}
+    try:
+        for level in manifest['levels']:
+            pyramid[level] = pd.read_csv(os.path.join(out_dir, f'{kind}_{level}.csv'),
+                                         parse_dates=['date'])
+    except FileNotFoundError:
+        return None
+    return pyramid
+
+def select_level(pyramid, start_date=None, end_date=None, max_points=None):
+    """Chọn mức mịn nhất có số điểm trong khoảng ≤ max_points.
+
+    Dùng searchsorted trên cột date đã sắp xếp nên chi phí chỉ phụ thuộc số điểm trả về.
+    Kỳ chứa start_date được giữ lại. Trả về (tên mức, DataFrame đã cắt theo khoảng).
+    """
+    chosen = None
+    for level, _ in LEVELS:
+        if level not in pyramid:
+            continue
+        frame = pyramid[level]
+        dates = frame['date']
+        lo = max(int(dates.searchsorted(pd.Timestamp(start_date), side='right')) - 1, 0) if start_date else 0
+        hi = int(dates.searchsorted(pd.Timestamp(end_date), side='right')) if end_date else len(frame)
+        chosen = (level, frame.iloc[lo:hi])
+        if max_points is None or hi - lo <= max_points:
+            break
+    return chosen
@@ -0,0 +1,327 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:  # duckdb là tùy chọn, mặc định dùng sqlite3 có sẵn
+    DUCKDB_AVAILABLE = False
+
+from src.data_schema import PROCESSED_SCHEMAS, data_version, load_processed
+
+DB_PATHS = {
+    'sqlite': 'cache/analytics.sqlite',
+    'duckdb': 'cache/analytics.duckdb',
+}
+
+AGGREGATES = ('avg', 'min', 'max', 'sum', 'count', 'last')
+
+# Biểu thức nhóm theo kỳ (ngày đầu kỳ) cho từng engine.
+# Tuần bắt đầu từ Chủ nhật, giống mức 'week' (W-SUN) của src/pyramid.py.
+BUCKETS = {
+    'sqlite': {
+        'day': "date",
+        'week': "date(date, '-' || strftime('%w', date) || ' days')",
+        'month': "strftime('%Y-%m-01', date)",
+        'quarter': "printf('%s-%02d-01', strftime('%Y', date), "
+                   "((CAST(strftime('%m', date) AS INTEGER) - 1) / 3) * 3 + 1)",
+        'year': "strftime('%Y-01-01', date)",
+    },
+    'duckdb': {
+        'day': "date",
+        'week': "CAST(date - CAST(dayofweek(date) AS INTEGER) AS DATE)",
+        'month': "CAST(date_trunc('month', date) AS DATE)",
+        'quarter': "CAST(date_trunc('quarter', date) AS DATE)",
+        'year': "CAST(date_trunc('year', date) AS DATE)",
+    },
+}
+# Tham số ngày trong biểu thức SQL (duckdb cần kiểu DATE để dùng được với date_trunc)
+DATE_PARAMS = {
+    'sqlite': "?",
+    'duckdb': "CAST(? AS DATE)",
+}
+
+class QueryBackend:
+    """Kho dữ liệu đã xử lý trong file nhúng (sqlite3 hoặc duckdb), có index theo (region, date).
+
+    Lọc, tổng hợp và tương quan chạy bằng SQL nên chỉ các cột/khoảng được yêu cầu
+    được đưa vào bộ nhớ Python.
+    """
+
+    def __init__(self, engine='sqlite', path=None):
+        if engine not in BUCKETS:
+            raise ValueError(f'Unsupported engine: {engine}')
+        if engine == 'duckdb' and not DUCKDB_AVAILABLE:
+            raise ImportError('duckdb chưa được cài đặt (pip install duckdb)')
+        self.engine = engine
+        self.path = path or DB_PATHS[engine]
+        if self.path != ':memory:' and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._columns = {}
+        self._root = self._connect() if engine == 'duckdb' or self.path == ':memory:' else None
+
+    def _connect(self):
+        if self.engine == 'duckdb':
+            return duckdb.connect(self.path)
+        return sqlite3.connect(self.path, check_same_thread=self.path != ':memory:')
+
+    @property
+    def connection(self):
+        """Mỗi thread một connection (duckdb: cursor của connection gốc)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.engine == 'duckdb':
+                conn = self._root.cursor()
+            elif self._root is not None:
+                conn = self._root
+            else:
+                conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params=()):
+        if self.engine == 'duckdb':
+            return self.connection.execute(sql, list(params)).df()
+        if self._root is not None:
+            # sqlite ':memory:' dùng chung một connection giữa các thread
+            with self._lock:
+                return pd.read_sql_query(sql, self.connection, params=list(params))
+        return pd.read_sql_query(sql, self.connection, params=list(params))
+
+    # ------------------------------------------------------------------
+    # Nạp dữ liệu
+    # ------------------------------------------------------------------
+
+    def ingest(self, name, df, version=None):
+        """Ghi (thay thế) bảng name từ DataFrame và tạo index theo (region, date)"""
+        frame = df.copy()
+        frame['date'] = frame['date'].dt.strftime('%Y-%m-%d')
+        for col in frame.select_dtypes(include='category').columns:
+            frame[col] = frame[col].astype(str)
+
+        conn = self.connection
+        if self.engine == 'duckdb':
+            conn.register('incoming', frame)
+            conn.execute(f'CREATE OR REPLACE TABLE {name} AS '
+                         f'SELECT * REPLACE (CAST(date AS DATE) AS date) FROM incoming ORDER BY date')
+            conn.unregister('incoming')
+        else:
+            frame.to_sql(name, conn, if_exists='replace', index=False)
+
+        key = '(region, date)' if 'region' in frame.columns else '(date)'
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_date ON {name} {key}')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (name VARCHAR PRIMARY KEY, version VARCHAR)')
+        conn.execute('DELETE FROM meta WHERE name = ?', [name])
+        conn.execute('INSERT INTO meta VALUES (?, ?)', [name, version or ''])
+        if self.engine == 'sqlite':
+            conn.commit()
+        self._columns.pop(name, None)
+
+    def version(self, name):
+        try:
+            rows = self._query('SELECT version FROM meta WHERE name = ?', [name])
+        except Exception:
+            return None
+        return rows['version'].iloc[0] if len(rows) else None
+
+    def sync(self, names=None):
+        """Nạp lại các bảng có phiên bản khác với file đã xử lý hiện tại"""
+        for name in names or PROCESSED_SCHEMAS:
+            version = data_version([name])
+            if self.version(name) != version:
+                self.ingest(name, load_processed(name), version)
+        return self
+
+    # ------------------------------------------------------------------
+    # Truy vấn
+    # ------------------------------------------------------------------
+
+    def columns(self, name):
+        if name not in self._columns:
+            self._columns[name] = list(self._query(f'SELECT * FROM {name} LIMIT 0').columns)
+        return self._columns[name]
+
+    def table_for(self, column, tables=('economy', 'covid')):
+        """Bảng chứa cột (ưu tiên economy); ValueError nếu không có, tránh chèn SQL tùy ý"""
+        for name in tables:
+            if column in self.columns(name):
+                return name
+        raise ValueError(f'Unknown metric: {column}')
+
+    def _check(self, name, columns):
+        unknown = [col for col in columns if col not in self.columns(name)]
+        if unknown:
+            raise ValueError(f'Unknown columns for {name}: {unknown}')
+
+    @staticmethod
+    def _where(alias='', start_date=None, end_date=None, region=None):
+        prefix = f'{alias}.' if alias else ''
+        clauses, params = [], []
+        if region is not None:
+            clauses.append(f'{prefix}region = ?')
+            params.append(region)
+        if start_date:
+            clauses.append(f'{prefix}date >= ?')
+            params.append(str(start_date)[:10])
+        if end_date:
+            clauses.append(f'{prefix}date <= ?')
+            params.append(str(end_date)[:10])
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _finish(self, df):
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def select(self, name, columns, start_date=None, end_date=None, region=None):
+        """Các cột (kèm date) trong khoảng ngày, sắp xếp theo date"""
+        columns = [col for col in columns if col != 'date']
+        self._check(name, columns)
+        where, params = self._where('', start_date, end_date, region)
+        cols = ', '.join(['date'] + columns)
+        return self._finish(self._query(f'SELECT {cols} FROM {name}{where} ORDER BY date', params))
+
+    def aggregate(self, name, metric, freq='month', agg='avg', start_date=None, end_date=None,
+                  region=None):
+        """Tổng hợp metric theo kỳ (day/week/month/quarter/year) bằng GROUP BY.
+
+        Giống select_level của pyramid: giữ trọn kỳ chứa start_date và mọi kỳ bắt đầu
+        trước hoặc đúng end_date. agg='last' là giá trị của ngày cuối mỗi kỳ.
+        """
+        if agg == 'mean':
+            agg = 'avg'
+        if agg not in AGGREGATES:
+            raise ValueError(f'Unsupported aggregate: {agg}')
+        if freq not in BUCKETS[self.engine]:
+            raise ValueError(f'Unsupported frequency: {freq}')
+        self._check(name, [metric])
+        bucket = BUCKETS[self.engine][freq]
+        param = DATE_PARAMS[self.engine]
+        clauses, params = [], []
+        if region is not None:
+            clauses.append('region = ?')
+            params.append(region)
+        if start_date:
+            clauses.append(f'date >= (SELECT {bucket} FROM (SELECT {param} AS date) s)')
+            params.append(str(start_date)[:10])
+        if end_date:
+            clauses.append(f'{bucket} <= {param}')
+            params.append(str(end_date)[:10])
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        if agg == 'last':
+            sql = (f'SELECT date, {metric} FROM (SELECT {bucket} AS date, {metric}, ROW_NUMBER() OVER '
+                   f'(PARTITION BY {bucket} ORDER BY {name}.date DESC) AS rn FROM {name}{where}) t '
+                   f'WHERE rn = 1 ORDER BY 1')
+        else:
+            sql = (f'SELECT {bucket} AS date, {agg}({metric}) AS {metric} FROM {name}{where} '
+                   f'GROUP BY 1 ORDER BY 1')
+        return self._finish(self._query(sql, params))
+
+    def _joined(self, x, y, start_date, end_date):
+        """FROM ... của hai cột x, y (có thể ở hai bảng khác nhau, nối theo date)"""
+        x_table, y_table = self.table_for(x), self.table_for(y)
+        if x_table == y_table:
+            where, params = self._where('a', start_date, end_date)
+            return f'{x_table} a', 'a', 'a', where, params
+        where, params = self._where('a', start_date, end_date)
+        return f'{x_table} a JOIN {y_table} b ON a.date = b.date', 'a', 'b', where, params
+
+    def pair(self, x, y, start_date=None, end_date=None):
+        """date, x, y của hai metric (inner join theo date)"""
+        source, xa, ya, where, params = self._joined(x, y, start_date, end_date)
+        sql = f'SELECT {xa}.date AS date, {xa}.{x} AS {x}, {ya}.{y} AS {y} FROM {source}{where} ORDER BY 1'
+        return self._finish(self._query(sql, params))
+
+    def correlation(self, x, y, start_date=None, end_date=None):
+        """Hệ số tương quan Pearson tính bằng các tổng trong SQL (hai lượt: trung bình rồi độ lệch)"""
+        source, xa, ya, where, params = self._joined(x, y, start_date, end_date)
+        xs, ys = f'CAST({xa}.{x} AS DOUBLE)', f'CAST({ya}.{y} AS DOUBLE)'
+        sql = (f'SELECT SUM((xs - mx) * (ys - my)) AS sxy, SUM((xs - mx) * (xs - mx)) AS sxx, '
+               f'SUM((ys - my) * (ys - my)) AS syy FROM '
+               f'(SELECT {xs} AS xs, {ys} AS ys FROM {source}{where}) t, '
+               f'(SELECT AVG({xs}) AS mx, AVG({ys}) AS my FROM {source}{where}) m')
+        sums = self._query(sql, params * 2).iloc[0]
+        denominator = np.sqrt(sums['sxx'] * sums['syy']) if sums['sxx'] and sums['syy'] else 0
+        return float(sums['sxy'] / denominator) if denominator else float('nan')
+
+def from_env():
+    """Backend theo biến môi trường QUERY_BACKEND (sqlite/duckdb); None nếu không bật"""
+    engine = os.environ.get('QUERY_BACKEND')
+    if not engine:
+        return None
+    return QueryBackend(engine, os.environ.get('QUERY_BACKEND_PATH')).sync()
+
+def benchmark(engine='sqlite', scale=200, repeat=20):
+    """So sánh pandas (toàn bộ frame trong RAM) với SQL trên file, dữ liệu nhân bản scale lần"""
+    economy = load_processed('economy')
+    covid = load_processed('covid')
+    frames = {}
+    for name, df in (('economy', economy), ('covid', covid)):
+        big = pd.concat([df] * scale, ignore_index=True)
+        big['date'] = pd.date_range('1900-01-01', periods=len(big), freq='D')
+        frames[name] = big
+
+    path = f'cache/benchmark.{engine}'
+    if os.path.exists(path):
+        os.remove(path)
+    backend = QueryBackend(engine, path)
+    start = time.perf_counter()
+    for name, df in frames.items():
+        backend.ingest(name, df)
+    print(f"[{engine}] nạp {len(frames['economy']):,} dòng/bảng: {(time.perf_counter() - start):.2f} s, "
+          f"file {os.path.getsize(path) / 1e6:.1f} MB")
+
+    window = ('1990-01-01', '1990-12-31')
+
+    def timed(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def pandas_filter():
+        df = frames['economy']
+        return df[(df['date'] >= window[0]) & (df['date'] <= window[1])][['date', 'gdp_growth']]
+
+    def pandas_aggregate():
+        df = frames['economy']
+        return df.set_index('date')['gdp_growth'].resample('MS').mean()
+
+    def pandas_corr():
+        merged = pd.merge(frames['economy'], frames['covid'], on='date', how='inner')
+        return merged['cases'].corr(merged['unemployment_rate'])
+
+    cases = [
+        ('lọc 1 năm', pandas_filter,
+         lambda: backend.select('economy', ['gdp_growth'], *window)),
+        ('tổng hợp theo tháng', pandas_aggregate,
+         lambda: backend.aggregate('economy', 'gdp_growth', 'month')),
+        ('tương quan cases/unemployment', pandas_corr,
+         lambda: backend.correlation('unemployment_rate', 'cases')),
+    ]
+    for label, pandas_fn, sql_fn in cases:
+        print(f"[{engine}] {label}: pandas {timed(pandas_fn):.1f} ms, SQL {timed(sql_fn):.1f} ms")
+    os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Kho truy vấn nhúng cho dữ liệu đã xử lý')
+    parser.add_argument('--engine', default='sqlite', choices=sorted(BUCKETS))
+    parser.add_argument('--benchmark', action='store_true', help='So sánh với pandas trên dữ liệu nhân bản')
+    parser.add_argument('--scale', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.engine, args.scale)
+    else:
+        backend = QueryBackend(args.engine).sync()
+        print(f"✅ {backend.path}: " + ', '.join(
+            f"{name} ({backend.version(name)})" for name in PROCESSED_SCHEMAS))
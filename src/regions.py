@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+REGION_COLUMN = 'region'
+# Dữ liệu hiện tại không có cột region: toàn bộ là một vùng quốc gia
+DEFAULT_REGION = 'national'
+
+class RegionNotFound(KeyError):
+    """Vùng không có trong dữ liệu"""
+
+class RegionIndex:
+    """Dữ liệu xếp thành các khối liền nhau theo vùng, kèm bảng offset vùng → (start, stop).
+
+    Lấy một vùng là cắt iloc theo offset (không lọc mask trên toàn bộ dòng), nên chi phí
+    tỉ lệ với kích thước vùng được chọn. Trong mỗi khối, thứ tự dòng (theo ngày) được giữ nguyên.
+    """
+
+    def __init__(self, df, column=REGION_COLUMN):
+        if column not in df.columns:
+            self.frame = df
+            self.offsets = {DEFAULT_REGION: (0, len(df))}
+            return
+
+        codes, regions = pd.factorize(df[column], sort=True)
+        if len(codes) and (codes < 0).any():
+            raise ValueError(f'Cột {column} có giá trị rỗng')
+        order = np.argsort(codes, kind='stable')
+        if (order == np.arange(len(order))).all():
+            self.frame = df
+        else:
+            self.frame = df.take(order).reset_index(drop=True)
+        bounds = np.searchsorted(codes[order], np.arange(len(regions) + 1))
+        self.offsets = {
+            str(region): (int(bounds[i]), int(bounds[i + 1]))
+            for i, region in enumerate(regions)
+        }
+
+    @property
+    def regions(self):
+        return list(self.offsets)
+
+    def covers_all(self, region):
+        """region rỗng, hoặc là vùng duy nhất (khi đó khối chính là toàn bộ dữ liệu)"""
+        return not region or (len(self.offsets) == 1 and region in self.offsets)
+
+    def get(self, region=None, start_date=None, end_date=None):
+        """Khối dữ liệu của một vùng (region rỗng → toàn bộ), cắt theo khoảng ngày nếu có"""
+        if not region:
+            if len(self.offsets) == 1 or not (start_date or end_date):
+                return slice_dates(self.frame, start_date, end_date)
+            # self.frame xếp theo vùng chứ không theo ngày: cắt từng khối rồi ghép
+            return pd.concat([self.get(name, start_date, end_date) for name in self.offsets])
+        try:
+            start, stop = self.offsets[region]
+        except KeyError:
+            raise RegionNotFound(region) from None
+        block = self.frame if start == 0 and stop == len(self.frame) else self.frame.iloc[start:stop]
+        return slice_dates(block, start_date, end_date)
+
+    def select(self, regions):
+        """{vùng: khối} theo thứ tự yêu cầu"""
+        return {region: self.get(region) for region in regions}
+
+    def describe(self):
+        return [
+            {'region': region, 'start': start, 'stop': stop, 'rows': stop - start}
+            for region, (start, stop) in self.offsets.items()
+        ]
+
+def slice_dates(frame, start_date=None, end_date=None):
+    """Các dòng trong [start_date, end_date] bằng searchsorted (khối đã sắp xếp theo date).
+
+    Khối không sắp xếp theo date (vd. merged nhiều vùng) thì lọc bằng mask.
+    """
+    if not start_date and not end_date:
+        return frame
+    dates = frame['date']
+    if not dates.is_monotonic_increasing:
+        mask = np.ones(len(frame), dtype=bool)
+        if start_date:
+            mask &= (dates >= pd.Timestamp(start_date)).to_numpy()
+        if end_date:
+            mask &= (dates <= pd.Timestamp(end_date)).to_numpy()
+        return frame[mask]
+    lo = int(dates.searchsorted(pd.Timestamp(start_date))) if start_date else 0
+    hi = int(dates.searchsorted(pd.Timestamp(end_date), side='right')) if end_date else len(frame)
+    return frame.iloc[lo:hi]
+
+def parse_regions(value):
+    """'a,b' → ['a', 'b'] (bỏ trùng, giữ thứ tự)"""
+    seen = []
+    for region in (value or '').split(','):
+        region = region.strip()
+        if region and region not in seen:
+            seen.append(region)
+    return seen
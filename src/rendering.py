@@ -0,0 +1,202 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tên chart trong URL → method của CovidEconomyVisualizer
+RENDERABLE_CHARTS = {
+    'covid_timeline': 'create_covid_cases_timeline',
+    'unemployment_timeline': 'create_unemployment_timeline',
+    'gdp_timeline': 'create_gdp_timeline',
+    'covid_vs_unemployment': 'create_covid_vs_unemployment_scatter',
+    'covid_vs_gdp': 'create_covid_vs_gdp_scatter',
+    'correlation_matrix': 'create_correlation_matrix',
+    'combined_timeline': 'create_combined_timeline',
+}
+
+IMAGE_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+DEFAULT_WIDTH = 1000
+DEFAULT_HEIGHT = 600
+MAX_SIZE = 4000
+
+def _decode_array(value):
+    """Giải mã typed array của Plotly ({'dtype', 'bdata'}) thành numpy array"""
+    if isinstance(value, dict) and 'bdata' in value:
+        arr = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+        if 'shape' in value:
+            arr = arr.reshape([int(n) for n in str(value['shape']).split(',')])
+        return arr
+    return np.asarray(value) if value is not None else None
+
+def _axis_values(values):
+    """Chuỗi ngày ISO → datetime để matplotlib vẽ trục thời gian"""
+    arr = _decode_array(values)
+    if arr is not None and arr.dtype.kind in 'OU':
+        try:
+            return pd.to_datetime(arr).to_numpy()
+        except (ValueError, TypeError):
+            return arr
+    return arr
+
+def _title_text(title):
+    if isinstance(title, dict):
+        title = title.get('text')
+    return (title or '').replace('<br>', '\n').replace('<sub>', '').replace('</sub>', '')
+
+def _kaleido_available():
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def render_with_kaleido(figure_json, fmt, width, height):
+    """Render bằng kaleido (giữ nguyên giao diện Plotly)"""
+    import plotly.io as pio
+    fig = pio.from_json(figure_json)
+    return fig.to_image(format=fmt, width=width, height=height)
+
+def render_with_matplotlib(figure_json, fmt, width, height):
+    """Render bằng matplotlib cho các loại trace mà visualizer sử dụng (scatter, heatmap)"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import io
+
+    spec = json.loads(figure_json)
+    layout = spec.get('layout', {})
+    dpi = 100
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+
+    # Mỗi trục x của Plotly là một subplot; trục y có 'overlaying' là trục phụ (twinx)
+    x_axes = sorted({t.get('xaxis', 'x') for t in spec.get('data', [])}) or ['x']
+    axes = {}
+    for i, xname in enumerate(x_axes):
+        ax = fig.add_subplot(len(x_axes), 1, i + 1)
+        axes[xname] = ax
+        xlayout = layout.get('xaxis' + xname[1:], {})
+        ax.set_xlabel(_title_text(xlayout.get('title')))
+
+    y_axes = {}
+    domains = {}
+    for trace in spec.get('data', []):
+        xname = trace.get('xaxis', 'x')
+        yname = trace.get('yaxis', 'y')
+        if yname not in y_axes:
+            ylayout = layout.get('yaxis' + yname[1:], {})
+            base = axes[xname]
+            ax = base.twinx() if ylayout.get('overlaying') else base
+            ax.set_ylabel(_title_text(ylayout.get('title')))
+            y_axes[yname] = ax
+            if not ylayout.get('overlaying') and ylayout.get('domain'):
+                domains[xname] = ylayout['domain']
+        ax = y_axes[yname]
+
+        color = (trace.get('line') or {}).get('color')
+        if trace.get('type') == 'heatmap':
+            z = _decode_array(trace.get('z'))
+            image = ax.imshow(z, cmap='RdBu', vmin=trace.get('zmin', -1), vmax=trace.get('zmax', 1))
+            labels_x = list(trace.get('x') or [])
+            labels_y = list(trace.get('y') or [])
+            ax.set_xticks(range(len(labels_x)), labels_x, rotation=45, ha='right')
+            ax.set_yticks(range(len(labels_y)), labels_y)
+            for (r, c), val in np.ndenumerate(z):
+                ax.text(c, r, f'{val:.2f}', ha='center', va='center', fontsize=8)
+            fig.colorbar(image, ax=ax)
+            continue
+
+        x = _axis_values(trace.get('x'))
+        y = _decode_array(trace.get('y'))
+        if x is None:
+            x = np.arange(len(y))
+        mode = trace.get('mode', 'lines')
+        if mode == 'markers':
+            ax.scatter(x, y, s=8, c=color, label=trace.get('name'))
+        else:
+            ax.plot(x, y, color=color, linewidth=1.5, label=trace.get('name'),
+                    marker='o' if 'markers' in mode else None, markersize=2)
+        if trace.get('fill') == 'tozeroy':
+            ax.fill_between(x, y, alpha=0.2, color=color)
+
+    # subplot_titles của make_subplots nằm trong annotations, đặt ở mép trên mỗi subplot
+    for annotation in layout.get('annotations', []):
+        for xname, domain in domains.items():
+            if abs(domain[1] - annotation.get('y', -1)) < 1e-6:
+                axes[xname].set_title(annotation.get('text', ''))
+
+    fig.suptitle(_title_text(layout.get('title')))
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+class ChartRenderer:
+    """Render biểu đồ của visualizer ra ảnh tĩnh, cache trên đĩa theo nội dung"""
+
+    def __init__(self, visualizer, cache_dir='cache/render', max_workers=2):
+        self.visualizer = visualizer
+        self.cache_dir = cache_dir
+        self.backend = 'kaleido' if _kaleido_available() else 'matplotlib'
+        self._backend_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='renderer')
+
+    def _fall_back(self, error):
+        """kaleido cần Chrome; nếu không chạy được thì chuyển hẳn sang matplotlib (một lần)"""
+        with self._backend_lock:
+            if self.backend != 'kaleido':
+                return
+            self.backend = 'matplotlib'
+        logger.warning('Kaleido render failed, falling back to matplotlib: %s', error)
+
+    def cache_key(self, chart, fmt, width, height, backend=None):
+        """Khóa cache: phiên bản dữ liệu + chart + kích thước + định dạng + backend"""
+        raw = f'{self.visualizer.data_version}|{chart}|{fmt}|{width}x{height}|{backend or self.backend}'
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def cache_path(self, key, fmt):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.{fmt}')
+
+    def render(self, chart, fmt='png', width=None, height=None):
+        """Trả về đường dẫn file ảnh đã render (lấy từ cache nếu có)"""
+        if chart not in RENDERABLE_CHARTS:
+            raise KeyError(chart)
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(f'Unsupported format: {fmt}')
+        width = max(100, min(int(width or DEFAULT_WIDTH), MAX_SIZE))
+        height = max(100, min(int(height or DEFAULT_HEIGHT), MAX_SIZE))
+
+        # Đọc backend một lần: thread khác có thể chuyển backend giữa chừng
+        backend = self.backend
+        path = self.cache_path(self.cache_key(chart, fmt, width, height, backend), fmt)
+        if os.path.exists(path):
+            return path
+
+        figure_json = getattr(self.visualizer, RENDERABLE_CHARTS[chart])()
+        if figure_json is None:
+            raise RuntimeError(f'Chart {chart} has no data')
+
+        if backend == 'kaleido':
+            try:
+                image = self._pool.submit(render_with_kaleido, figure_json, fmt, width, height).result()
+            except Exception as e:
+                self._fall_back(e)
+                return self.render(chart, fmt, width, height)
+        else:
+            image = self._pool.submit(render_with_matplotlib, figure_json, fmt, width, height).result()
+
+        # Ghi file tạm rồi rename để request song song không đọc phải file dở dang
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(image)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,197 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):  # chạy trực tiếp: python src/scenarios.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+START_DATE = '2020-01-01'
+END_DATE = '2023-12-31'
+
+# Các giai đoạn của collect_covid_data: (tên tham số, trung bình Poisson số ca mới/ngày)
+COVID_REGIMES = [
+    ('cases_2020', 50.0),
+    ('cases_2021_early', 200.0),
+    ('cases_delta', 8000.0),      # Đợt Delta 5-9/2021
+    ('cases_2021_late', 4000.0),
+    ('cases_omicron', 15000.0),   # Q1/2022
+    ('cases_2022', 2000.0),
+    ('cases_2023', 500.0),
+]
+# GDP theo giai đoạn của collect_economy_data: (tên tham số, trung bình, độ lệch chuẩn)
+GDP_REGIMES = [
+    ('gdp_2020_h1', -3.0, 1.0),
+    ('gdp_2020_h2', -1.0, 1.0),
+    ('gdp_2021', 3.0, 1.5),
+    ('gdp_2022_2023', 6.5, 1.0),
+]
+ECONOMY_DEFAULTS = {
+    'unemployment_base': 2.5,
+    'unemployment_shock': 2.5,
+}
+PARAM_COLUMNS = ([name for name, _ in COVID_REGIMES] + [name for name, _, _ in GDP_REGIMES]
+                 + list(ECONOMY_DEFAULTS))
+
+SUMMARY_COLUMNS = [
+    'peak_daily_cases', 'peak_date', 'total_cases', 'total_deaths',
+    'min_gdp', 'mean_gdp', 'max_unemployment', 'mean_unemployment',
+    'corr_cases_unemployment', 'corr_cases_gdp', 'corr_unemployment_gdp',
+]
+
+def default_params():
+    """Tham số gốc của bộ sinh dữ liệu (một dòng)"""
+    values = dict((name, mean) for name, mean in COVID_REGIMES)
+    values.update((name, mean) for name, mean, _ in GDP_REGIMES)
+    values.update(ECONOMY_DEFAULTS)
+    return pd.DataFrame([values], columns=PARAM_COLUMNS)
+
+def scenario_grid(n, spread=0.3, seed=0):
+    """n bộ tham số quanh giá trị gốc: số ca nhân hệ số lognormal, GDP cộng nhiễu chuẩn.
+
+    spread=0 cho n bản sao tham số gốc (chỉ khác seed).
+    """
+    rng = np.random.default_rng(seed)
+    base = default_params().iloc[0]
+    params = pd.DataFrame(index=pd.RangeIndex(n, name='scenario'), columns=PARAM_COLUMNS, dtype=np.float64)
+    for name, _ in COVID_REGIMES:
+        params[name] = base[name] * rng.lognormal(0.0, spread, n)
+    for name, _, _ in GDP_REGIMES:
+        params[name] = base[name] + rng.normal(0.0, 2 * spread, n)
+    params['unemployment_base'] = base['unemployment_base'] * rng.lognormal(0.0, spread / 3, n)
+    params['unemployment_shock'] = base['unemployment_shock'] * rng.lognormal(0.0, spread, n)
+    return params
+
+def _regime_index(dates):
+    """Chỉ số giai đoạn cho từng ngày (COVID, GDP, thất nghiệp), giống các nhánh if của bộ sinh"""
+    year, month = dates.year.to_numpy(), dates.month.to_numpy()
+    covid = np.select(
+        [year == 2020,
+         (year == 2021) & (month <= 4),
+         (year == 2021) & (month <= 9),
+         year == 2021,
+         (year == 2022) & (month <= 3),
+         year == 2022],
+        [0, 1, 2, 3, 4, 5], default=6)
+    gdp = np.select([(year == 2020) & (month <= 6), year == 2020, year == 2021], [0, 1, 2], default=3)
+    unemployment = np.select([year == 2020, year == 2021], [0, 1], default=2)
+    return covid, gdp, unemployment
+
+def simulate(params, rng, dates):
+    """Sinh một lô kịch bản dạng mảng 2-D (kịch bản × ngày) trong một lượt vector hóa.
+
+    Cùng phân phối với collect_covid_data/collect_economy_data (không cùng chuỗi số ngẫu nhiên).
+    Trả về dict: cases, deaths (lũy kế), daily_cases, unemployment_rate, gdp_growth.
+    """
+    covid_idx, gdp_idx, unemp_idx = _regime_index(dates)
+    n, days = len(params), len(dates)
+
+    lam = params[[name for name, _ in COVID_REGIMES]].to_numpy()[:, covid_idx]
+    daily_cases = rng.poisson(lam)
+    daily_deaths = np.floor(daily_cases * rng.uniform(0.01, 0.02, (n, days))).astype(np.int64)
+
+    gdp_mean = params[[name for name, _, _ in GDP_REGIMES]].to_numpy()[:, gdp_idx]
+    gdp_sd = np.array([sd for _, _, sd in GDP_REGIMES])[gdp_idx]
+    gdp = gdp_mean + rng.standard_normal((n, days)) * gdp_sd
+
+    base = params['unemployment_base'].to_numpy()[:, None]
+    shock = params['unemployment_shock'].to_numpy()[:, None]
+    i = np.arange(days)
+    trend = np.select([unemp_idx == 0, unemp_idx == 1], [i / 100, 1 - i / (300 * 2.5)], default=0.2)
+    noise_sd = np.where(unemp_idx == 2, 0.2, 0.3)
+    unemployment = np.clip(base + shock * trend + rng.standard_normal((n, days)) * noise_sd, 1.5, 8)
+
+    return {
+        'daily_cases': daily_cases,
+        'cases': np.cumsum(daily_cases, axis=1),
+        'deaths': np.cumsum(daily_deaths, axis=1),
+        'unemployment_rate': unemployment,
+        'gdp_growth': gdp,
+    }
+
+def rowwise_corr(a, b):
+    """Hệ số Pearson theo từng dòng của hai mảng 2-D cùng shape"""
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (a * b).sum(axis=1) / np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+
+def summarize(paths, dates, index=None):
+    """Thống kê tóm tắt mỗi kịch bản; đường dữ liệu đầy đủ bị bỏ sau bước này"""
+    cases = paths['cases'].astype(np.float64)
+    unemployment, gdp = paths['unemployment_rate'], paths['gdp_growth']
+    peak_idx = paths['daily_cases'].argmax(axis=1)
+    return pd.DataFrame({
+        'peak_daily_cases': paths['daily_cases'].max(axis=1),
+        'peak_date': dates.to_numpy()[peak_idx],
+        'total_cases': paths['cases'][:, -1],
+        'total_deaths': paths['deaths'][:, -1],
+        'min_gdp': gdp.min(axis=1),
+        'mean_gdp': gdp.mean(axis=1),
+        'max_unemployment': unemployment.max(axis=1),
+        'mean_unemployment': unemployment.mean(axis=1),
+        'corr_cases_unemployment': rowwise_corr(cases, unemployment),
+        'corr_cases_gdp': rowwise_corr(cases, gdp),
+        'corr_unemployment_gdp': rowwise_corr(unemployment, gdp),
+    }, index=index)
+
+def run_chunk(params, seed, chunk):
+    """Chạy một lô trong worker; RNG riêng theo (seed, số thứ tự lô) nên kết quả tái lập được"""
+    dates = pd.date_range(START_DATE, END_DATE, freq='D')
+    rng = np.random.default_rng([seed, chunk])
+    return summarize(simulate(params, rng, dates), dates, index=params.index)
+
+def iter_summaries(params, seed=0, chunk_size=256, max_workers=None):
+    """Chạy song song theo lô, trả về DataFrame tóm tắt của từng lô ngay khi xong (thứ tự bất kỳ).
+
+    Bộ nhớ mỗi worker chỉ giữ chunk_size × số ngày mảng, không phụ thuộc tổng số kịch bản.
+    """
+    chunks = [params.iloc[start:start + chunk_size] for start in range(0, len(params), chunk_size)]
+    if max_workers == 1:
+        for chunk, part in enumerate(chunks):
+            yield run_chunk(part, seed, chunk)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_chunk, part, seed, chunk) for chunk, part in enumerate(chunks)]
+        for future in as_completed(futures):
+            yield future.result()
+
+def run_sweep(params, seed=0, chunk_size=256, max_workers=None, output=None):
+    """Tham số + tóm tắt của toàn bộ kịch bản; ghi CSV nếu có output"""
+    summaries = pd.concat(list(iter_summaries(params, seed, chunk_size, max_workers))).sort_index()
+    result = params.join(summaries)
+    if output:
+        out_dir = os.path.dirname(output)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        result.to_csv(output)
+    return result
+
+def sensitivity(result, targets=('peak_daily_cases', 'min_gdp', 'corr_cases_unemployment')):
+    """Tương quan hạng giữa từng tham số và các thống kê đích"""
+    return result[PARAM_COLUMNS + list(targets)].corr(method='spearman').loc[PARAM_COLUMNS, list(targets)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Quét kịch bản Monte-Carlo trên bộ sinh dữ liệu')
+    parser.add_argument('--scenarios', type=int, default=2000)
+    parser.add_argument('--spread', type=float, default=0.3, help='Độ lệch của tham số quanh giá trị gốc')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='cache/scenarios.csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    params = scenario_grid(args.scenarios, spread=args.spread, seed=args.seed)
+    result = run_sweep(params, seed=args.seed, chunk_size=args.chunk_size,
+                       max_workers=args.workers, output=args.output)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(result):,} kịch bản trong {elapsed:.2f} s → {args.output}")
+    print(result[SUMMARY_COLUMNS].drop(columns='peak_date').describe(percentiles=[0.05, 0.5, 0.95]).round(3).T)
+    print("\nĐộ nhạy (Spearman):")
+    print(sensitivity(result).round(2))
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import plotly
+
+from src.data_schema import data_version
+
+SNAPSHOT_PATH = 'cache/snapshot.pkl'
+
+# Tăng khi cấu trúc snapshot thay đổi để snapshot cũ tự bị bỏ qua
+SNAPSHOT_FORMAT = 1
+
+# Mã nguồn quyết định nội dung snapshot (frame đã ép kiểu, merged, thống kê, pyramid, figure JSON).
+# Sửa một file trong đây là snapshot cũ bị bỏ qua, không cần nhớ tăng SNAPSHOT_FORMAT.
+SOURCE_FILES = [
+    'src/snapshot.py',
+    'src/visualization.py',
+    'src/fast_figures.py',
+    'src/data_schema.py',
+    'src/join.py',
+    'src/pyramid.py',
+    'src/anomaly.py',
+    'src/regions.py',
+]
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def source_version(paths=SOURCE_FILES):
+    """Hash nội dung SOURCE_FILES và phiên bản Plotly (quyết định figure JSON)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        with open(os.path.join(ROOT_DIR, path), 'rb') as f:
+            digest.update(f.read())
+    digest.update(plotly.__version__.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def build_snapshot(visualizer=None, path=SNAPSHOT_PATH):
+    """Ghi snapshot khởi động nhanh: DataFrame đã ép kiểu, merged, thống kê, pyramid và figure JSON.
+
+    Snapshot gắn với data_version của các file đã xử lý và source_version của mã nguồn;
+    worker chỉ dùng khi cả hai khớp.
+    """
+    if visualizer is None:
+        from src.visualization import CovidEconomyVisualizer
+        visualizer = CovidEconomyVisualizer()
+        if not visualizer.load_data():
+            raise RuntimeError('Không load được dữ liệu đã xử lý')
+
+    from src.visualization import create_all_visualizations
+    figures = create_all_visualizations(visualizer)
+    figures.pop('statistics')
+
+    payload = {
+        'format': SNAPSHOT_FORMAT,
+        'source_version': source_version(),
+        'data_version': visualizer.data_version,
+        'covid_data': visualizer.covid_data,
+        'economy_data': visualizer.economy_data,
+        'merged_data': visualizer.merged_data,
+        'statistics': visualizer.get_statistics(),
+        # mức 'day' chính là DataFrame gốc, không lưu lặp lại
+        'pyramids': {
+            kind: {level: frame for level, frame in visualizer.get_pyramid(kind).items() if level != 'day'}
+            for kind in ('covid', 'economy')
+        },
+        'figures': {name: figure.encode('utf-8') for name, figure in visualizer._figures.items()},
+    }
+
+    out_dir = os.path.dirname(path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+def read_snapshot(path=SNAPSHOT_PATH, expected_version=None):
+    """Đọc snapshot; None nếu thiếu, hỏng, khác định dạng, cũ hơn dữ liệu hoặc mã nguồn hiện tại"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"Snapshot không đọc được ({e}), dùng CSV")
+        return None
+
+    if payload.get('format') != SNAPSHOT_FORMAT:
+        return None
+    if payload.get('source_version') != source_version():
+        return None
+    if expected_version is None:
+        try:
+            expected_version = data_version()
+        except FileNotFoundError:
+            return None
+    if payload.get('data_version') != expected_version:
+        return None
+    return payload
+
+if __name__ == "__main__":
+    from src.visualization import CovidEconomyVisualizer
+
+    start = time.perf_counter()
+    viz = CovidEconomyVisualizer()
+    viz.load_data()
+    viz.get_statistics()
+    path = build_snapshot(viz)
+    print(f"✅ Snapshot: {path} ({os.path.getsize(path):,} bytes), "
+          f"build {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    cold = CovidEconomyVisualizer()
+    cold.load_data()
+    cold.get_statistics()
+    for kind in ('covid', 'economy'):
+        cold.get_pyramid(kind)
+    t_csv = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm = CovidEconomyVisualizer()
+    warm.load_snapshot(path)
+    warm.get_statistics()
+    t_snapshot = time.perf_counter() - start
+    print(f"Khởi động từ CSV: {t_csv * 1000:.0f} ms (chưa tính figure), "
+          f"từ snapshot: {t_snapshot * 1000:.0f} ms")
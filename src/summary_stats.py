@@ -0,0 +1,144 @@
+import numpy as np
+
+# Số bin mịn của sketch; histogram/quantile/KDE đều suy ra từ đây nên chi phí không phụ thuộc số dòng
+SKETCH_BINS = 2048
+
+class QuantileSketch:
+    """Histogram bin mịn trên khoảng cố định, gộp được giữa các partition.
+
+    Hai sketch cùng lo/hi/bins có thể merge bằng cách cộng counts, nên từng partition
+    (năm, vùng, ...) tính riêng rồi gộp lại mà không cần giữ dữ liệu thô.
+    """
+
+    def __init__(self, lo, hi, bins=SKETCH_BINS):
+        if not hi > lo:
+            hi = lo + 1.0
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.bins = int(bins)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_values(cls, values, lo=None, hi=None, bins=SKETCH_BINS):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        lo = values.min() if lo is None and len(values) else (lo if lo is not None else 0.0)
+        hi = values.max() if hi is None and len(values) else (hi if hi is not None else 1.0)
+        sketch = cls(lo, hi, bins)
+        sketch.add(values)
+        return sketch
+
+    @property
+    def edges(self):
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    @property
+    def centers(self):
+        edges = self.edges
+        return (edges[:-1] + edges[1:]) / 2
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return self
+        idx = ((values - self.lo) / (self.hi - self.lo) * self.bins).astype(np.int64)
+        np.clip(idx, 0, self.bins - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=self.bins)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        if (self.lo, self.hi, self.bins) != (other.lo, other.hi, other.bins):
+            raise ValueError('Chỉ merge được các sketch cùng lo/hi/bins')
+        merged = QuantileSketch(self.lo, self.hi, self.bins)
+        merged.counts = self.counts + other.counts
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        return merged
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def quantile(self, q):
+        """Quantile xấp xỉ (nội suy tuyến tính trong bin), sai số tối đa một bin mịn"""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        cum = np.concatenate([[0], np.cumsum(self.counts)])
+        targets = q * self.count
+        values = np.interp(targets, cum, self.edges)
+        return np.clip(values, self.min, self.max)
+
+    def histogram(self, nbins=20):
+        """Gộp bin mịn thành nbins bin đều trên [min, max]"""
+        edges = np.linspace(self.min, self.max, nbins + 1)
+        cum = np.concatenate([[0], np.cumsum(self.counts)])
+        cum_at_edges = np.round(np.interp(edges, self.edges, cum)).astype(np.int64)
+        return edges, np.diff(cum_at_edges)
+
+    def kde(self, points=200, bandwidth=None):
+        """KDE Gaussian tính trên lưới bin mịn (convolution), không cần dữ liệu thô"""
+        width = (self.hi - self.lo) / self.bins
+        if bandwidth is None:
+            # Silverman, giống cách Plotly chọn bandwidth cho violin
+            q25, q75 = self.quantile([0.25, 0.75])
+            std = self.std()
+            spread = min(std, (q75 - q25) / 1.349) if q75 > q25 else std
+            bandwidth = 1.059 * (spread or width) * self.count ** (-1 / 5)
+        half = int(np.ceil(4 * bandwidth / width))
+        offsets = np.arange(-half, half + 1) * width
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+        density = np.convolve(self.counts.astype(np.float64), kernel, mode='full')
+        grid = self.lo + (np.arange(len(density)) - half + 0.5) * width
+        density /= self.count * bandwidth * np.sqrt(2 * np.pi)
+
+        out_grid = np.linspace(self.min - 2 * bandwidth, self.max + 2 * bandwidth, points)
+        return out_grid, np.interp(out_grid, grid, density, left=0, right=0)
+
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        centers = self.centers
+        mean = np.average(centers, weights=self.counts)
+        return float(np.sqrt(np.average((centers - mean) ** 2, weights=self.counts)))
+
+def box_summary(sketch):
+    """Tứ phân vị, râu (1.5 IQR, kẹp trong dữ liệu) và các bin ngoại lai"""
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    lower = max(q1 - 1.5 * iqr, sketch.min)
+    upper = min(q3 + 1.5 * iqr, sketch.max)
+    centers = sketch.centers
+    outside = (sketch.counts > 0) & ((centers < lower) | (centers > upper))
+    return {
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'mean': float(sketch.mean),
+        'lowerfence': float(lower),
+        'upperfence': float(upper),
+        'outliers': centers[outside].tolist(),
+    }
+
+def partitioned_sketch(df, column, partition_by='year', bins=SKETCH_BINS):
+    """Sketch từng partition rồi merge (dùng chung lo/hi của toàn cột)"""
+    values = df[column].to_numpy(dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    lo, hi = (finite.min(), finite.max()) if len(finite) else (0.0, 1.0)
+    keys = df['date'].dt.year if partition_by == 'year' else df[partition_by]
+
+    sketch = QuantileSketch(lo, hi, bins)
+    for _, index in df.groupby(keys).indices.items():
+        sketch = sketch.merge(QuantileSketch(lo, hi, bins).add(values[index]))
+    return sketch
@@ -3,363 +3,578 @@ import plotly
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import functools
+import hashlib
 import json
+from src.data_schema import apply_schema, load_processed, data_version
+from src.join import aligned_join
+from src.pyramid import build_pyramid, load_pyramid
+from src.summary_stats import partitioned_sketch
+from src.snapshot import SNAPSHOT_PATH, read_snapshot
+from src.regions import RegionIndex, slice_dates
+from src import anomaly
+from src import fast_figures
+from src.fast_figures import figure_template
+
+def _cached_figure(method):
+    """Figure JSON tính một lần cho mỗi lần load dữ liệu (hoặc lấy sẵn từ snapshot)"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        if name not in self._figures:
+            self._figures[name] = method(self)
+        return self._figures[name]
+    return wrapper
+
+# Các phương thức tạo figure (memo theo lần load dữ liệu, có trong snapshot)
+FIGURE_METHODS = [
+    'create_covid_cases_timeline',
+    'create_unemployment_timeline',
+    'create_gdp_timeline',
+    'create_covid_vs_unemployment_scatter',
+    'create_covid_vs_gdp_scatter',
+    'create_correlation_matrix',
+    'create_combined_timeline',
+]
 
 class CovidEconomyVisualizer:
     """Class để tạo các biểu đồ phân tích COVID-19 và kinh tế"""
     
+    # Điền mảng vào figure template dựng sẵn thay vì dựng go.Figure mỗi lần
+    use_fast_figures = True
+    
     def __init__(self):
         self.covid_data = None
         self.economy_data = None
         self.merged_data = None
+        self.data_version = None
+        self._statistics = None
+        self._pyramids = {}
+        self._sketches = {}
+        self._figures = {}
+        self._regions = {}
+        self._region_statistics = {}
+        self._region_pyramids = {}
+        self._anomalies = {}
+        self._detectors = {}
     
     def load_data(self):
         """Load dữ liệu đã xử lý"""
         try:
-            self.covid_data = pd.read_csv('data/processed/covid_data_processed.csv')
-            self.economy_data = pd.read_csv('data/processed/economy_data_processed.csv')
-            
-            if 'date' in self.covid_data.columns:
-                self.covid_data['date'] = pd.to_datetime(self.covid_data['date'])
-            if 'date' in self.economy_data.columns:
-                self.economy_data['date'] = pd.to_datetime(self.economy_data['date'])
+            self.covid_data = load_processed('covid')
+            self.economy_data = load_processed('economy')
+            self.data_version = data_version()
+            self._statistics = None
+            self._pyramids = {}
+            self._sketches = {}
+            self._figures = {}
+            self._regions = {}
+            self._region_statistics = {}
+            self._region_pyramids = {}
+            self._anomalies = {}
+            self._detectors = {}
             
             if 'date' in self.covid_data.columns and 'date' in self.economy_data.columns:
-                self.merged_data = pd.merge(
-                    self.covid_data, 
-                    self.economy_data, 
-                    on='date', 
-                    how='inner'
-                )
+                # Hai chuỗi đã sắp xếp theo ngày: join theo offset thay vì hash
+                self.merged_data = aligned_join(self.covid_data, self.economy_data, on='date')
             
             return True
         except Exception as e:
             print(f"Error loading data: {e}")
             return False
     
+    def load_snapshot(self, path=SNAPSHOT_PATH):
+        """Khởi động từ snapshot (src/snapshot.py); False nếu thiếu hoặc cũ để gọi load_data"""
+        payload = read_snapshot(path)
+        if payload is None:
+            return False
+        self.covid_data = payload['covid_data']
+        self.economy_data = payload['economy_data']
+        self.merged_data = payload['merged_data']
+        self.data_version = payload['data_version']
+        self._statistics = payload['statistics']
+        self._pyramids = {
+            kind: {'day': self.covid_data if kind == 'covid' else self.economy_data, **levels}
+            for kind, levels in payload['pyramids'].items()
+        }
+        self._sketches = {}
+        self._figures = {name: figure.decode('utf-8') for name, figure in payload['figures'].items()}
+        self._regions = {}
+        self._region_statistics = {}
+        self._region_pyramids = {}
+        self._anomalies = {}
+        self._detectors = {}
+        return True
+    
+    def append(self, kind, rows):
+        """Nối các dòng đã xử lý (sau ngày cuối hiện có) vào 'covid' hoặc 'economy'.
+
+        Phiên bản dữ liệu mới được suy ra từ phiên bản cũ và nội dung các dòng nối thêm;
+        cache thống kê/figure/sketch bị xóa, pyramid của kind được tạo lại trong bộ nhớ.
+        """
+        rows = apply_schema(rows.copy(), kind)
+        base = self.covid_data if kind == 'covid' else self.economy_data
+        if len(base) and rows['date'].min() <= base['date'].iloc[-1]:
+            raise ValueError('Chỉ nối được các ngày sau ngày cuối cùng hiện có')
+        combined = pd.concat([base, rows], ignore_index=True)
+        if kind == 'covid':
+            self.covid_data = combined
+        else:
+            self.economy_data = combined
+        self.merged_data = aligned_join(self.covid_data, self.economy_data, on='date')
+        
+        digest = hashlib.sha256(str(self.data_version).encode('utf-8'))
+        digest.update(kind.encode('utf-8'))
+        digest.update(rows.to_json(date_format='iso').encode('utf-8'))
+        self.data_version = digest.hexdigest()[:16]
+        
+        self._statistics = None
+        self._sketches = {}
+        self._figures = {}
+        self._regions.pop(kind, None)
+        self._region_statistics = {}
+        self._region_pyramids = {}
+        # bản pyramid trên đĩa chưa có các dòng mới
+        self._pyramids[kind] = build_pyramid(combined)
+        if kind in self._anomalies:
+            # Cập nhật từng điểm mới, không tính lại lịch sử
+            if kind not in self._detectors:
+                self._detectors[kind] = anomaly.detectors_from_history(
+                    base, anomaly.frame_metrics(self._anomalies[kind]))
+            new_rows = anomaly.extend(self._detectors[kind], rows)
+            self._anomalies[kind] = pd.concat([self._anomalies[kind], new_rows], ignore_index=True)
+        return combined
+    
+    def get_pyramid(self, kind, region=None):
+        """Pyramid tổng hợp (tuần/tháng/quý) cho 'covid' hoặc 'economy'.
+
+        Ưu tiên bản do bước xử lý ghi ra đĩa; nếu thiếu hoặc cũ thì tạo trong bộ nhớ.
+        Pyramid của từng vùng được tạo từ khối dữ liệu của vùng và cache riêng.
+        """
+        if not self.get_region_index(kind).covers_all(region):
+            if (kind, region) not in self._region_pyramids:
+                self._region_pyramids[(kind, region)] = build_pyramid(self.get_region(kind, region))
+            return self._region_pyramids[(kind, region)]
+        if kind not in self._pyramids:
+            base = self.covid_data if kind == 'covid' else self.economy_data
+            pyramid = load_pyramid(kind, base, data_version([kind]))
+            self._pyramids[kind] = pyramid if pyramid is not None else build_pyramid(base)
+        return self._pyramids[kind]
+    
+    def get_anomalies(self, kind):
+        """Dải z-score, điểm bất thường và đổi mức (src/anomaly.py) của 'covid' hoặc 'economy'.
+
+        Ưu tiên bản do stage anomaly ghi ra đĩa; nếu thiếu hoặc cũ thì tính trong bộ nhớ.
+        """
+        if kind not in self._anomalies:
+            base = self.covid_data if kind == 'covid' else self.economy_data
+            frame = anomaly.load_anomalies(kind, data_version([kind]))
+            if frame is None or len(frame) != len(base):
+                frame = anomaly.detect(base, kind)
+            self._anomalies[kind] = frame
+        return self._anomalies[kind]
+    
+    def get_region_index(self, kind):
+        """Chỉ mục vùng (khối liền nhau + offset) của 'covid' hoặc 'economy'"""
+        if kind not in self._regions:
+            self._regions[kind] = RegionIndex(self.covid_data if kind == 'covid' else self.economy_data)
+        return self._regions[kind]
+    
+    def get_region(self, kind, region=None, start_date=None, end_date=None):
+        """Dữ liệu của một vùng (RegionNotFound nếu không có) trong khoảng ngày; region rỗng → toàn bộ"""
+        return self.get_region_index(kind).get(region, start_date, end_date)
+    
+    def get_sketch(self, metric):
+        """Quantile sketch (gộp từ các partition theo năm) của một cột kinh tế"""
+        if metric not in self._sketches:
+            self._sketches[metric] = partitioned_sketch(self.economy_data, metric)
+        return self._sketches[metric]
+    
+    def _render(self, key, build, traces, arrays, layout=None):
+        """JSON của figure qua template dựng sẵn (không validate/deepcopy mảng dữ liệu)"""
+        template = figure_template(key, build, traces, layout)
+        return fast_figures.to_json(template.figure(arrays, fast=self.use_fast_figures))
+    
+    @_cached_figure
     def create_covid_cases_timeline(self):
         """Tạo biểu đồ timeline số ca COVID"""
         if self.covid_data is None:
             return None
         
-        fig = go.Figure()
-        
-        if 'date' in self.covid_data.columns and 'cases' in self.covid_data.columns:
-            fig.add_trace(go.Scatter(
-                x=self.covid_data['date'],
-                y=self.covid_data['cases'],
-                mode='lines+markers',
-                name='Số ca COVID-19',
-                line=dict(color='red', width=2),
-                marker=dict(size=6)
-            ))
+        has_trace = 'date' in self.covid_data.columns and 'cases' in self.covid_data.columns
         
-        fig.update_layout(
-            title='Diễn biến số ca COVID-19 theo thời gian',
-            xaxis_title='Thời gian',
-            yaxis_title='Số ca',
-            hovermode='x unified',
-            template='plotly_white'
-        )
+        def build(data):
+            fig = go.Figure()
+            
+            if has_trace:
+                fig.add_trace(go.Scatter(
+                    x=data['date'],
+                    y=data['cases'],
+                    mode='lines+markers',
+                    name='Số ca COVID-19',
+                    line=dict(color='red', width=2),
+                    marker=dict(size=6)
+                ))
+            
+            fig.update_layout(
+                title='Diễn biến số ca COVID-19 theo thời gian',
+                xaxis_title='Thời gian',
+                yaxis_title='Số ca',
+                hovermode='x unified',
+                template='plotly_white'
+            )
+            return fig
         
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        traces = [{'x': 'date', 'y': 'cases'}] if has_trace else []
+        return self._render(('covid_cases_timeline', has_trace), build, traces, self.covid_data)
     
+    @_cached_figure
     def create_unemployment_timeline(self):
         """Tạo biểu đồ timeline tỷ lệ thất nghiệp"""
         if self.economy_data is None:
             return None
         
-        fig = go.Figure()
+        has_trace = 'date' in self.economy_data.columns and 'unemployment_rate' in self.economy_data.columns
         
-        if 'date' in self.economy_data.columns and 'unemployment_rate' in self.economy_data.columns:
-            fig.add_trace(go.Scatter(
-                x=self.economy_data['date'],
-                y=self.economy_data['unemployment_rate'],
-                mode='lines+markers',
-                name='Tỷ lệ thất nghiệp',
-                line=dict(color='blue', width=2),
-                marker=dict(size=6)
-            ))
-        
-        fig.update_layout(
-            title='Diễn biến tỷ lệ thất nghiệp theo thời gian',
-            xaxis_title='Thời gian',
-            yaxis_title='Tỷ lệ thất nghiệp (%)',
-            hovermode='x unified',
-            template='plotly_white'
-        )
+        def build(data):
+            fig = go.Figure()
+            
+            if has_trace:
+                fig.add_trace(go.Scatter(
+                    x=data['date'],
+                    y=data['unemployment_rate'],
+                    mode='lines+markers',
+                    name='Tỷ lệ thất nghiệp',
+                    line=dict(color='blue', width=2),
+                    marker=dict(size=6)
+                ))
+            
+            fig.update_layout(
+                title='Diễn biến tỷ lệ thất nghiệp theo thời gian',
+                xaxis_title='Thời gian',
+                yaxis_title='Tỷ lệ thất nghiệp (%)',
+                hovermode='x unified',
+                template='plotly_white'
+            )
+            return fig
         
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        traces = [{'x': 'date', 'y': 'unemployment_rate'}] if has_trace else []
+        return self._render(('unemployment_timeline', has_trace), build, traces, self.economy_data)
     
+    @_cached_figure
     def create_gdp_timeline(self):
         """Tạo biểu đồ timeline tăng trưởng GDP"""
         if self.economy_data is None:
             return None
         
-        fig = go.Figure()
-        
-        if 'date' in self.economy_data.columns and 'gdp_growth' in self.economy_data.columns:
-            fig.add_trace(go.Scatter(
-                x=self.economy_data['date'],
-                y=self.economy_data['gdp_growth'],
-                mode='lines+markers',
-                name='Tăng trưởng GDP',
-                line=dict(color='green', width=2),
-                marker=dict(size=6),
-                fill='tozeroy'
-            ))
+        has_trace = 'date' in self.economy_data.columns and 'gdp_growth' in self.economy_data.columns
         
-        fig.update_layout(
-            title='Diễn biến tăng trưởng GDP theo thời gian',
-            xaxis_title='Thời gian',
-            yaxis_title='Tăng trưởng GDP (%)',
-            hovermode='x unified',
-            template='plotly_white'
-        )
+        def build(data):
+            fig = go.Figure()
+            
+            if has_trace:
+                fig.add_trace(go.Scatter(
+                    x=data['date'],
+                    y=data['gdp_growth'],
+                    mode='lines+markers',
+                    name='Tăng trưởng GDP',
+                    line=dict(color='green', width=2),
+                    marker=dict(size=6),
+                    fill='tozeroy'
+                ))
+            
+            fig.update_layout(
+                title='Diễn biến tăng trưởng GDP theo thời gian',
+                xaxis_title='Thời gian',
+                yaxis_title='Tăng trưởng GDP (%)',
+                hovermode='x unified',
+                template='plotly_white'
+            )
+            return fig
         
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        traces = [{'x': 'date', 'y': 'gdp_growth'}] if has_trace else []
+        return self._render(('gdp_timeline', has_trace), build, traces, self.economy_data)
     
+    def _cases_scatter(self, key, metric, title, axis_title, hover_label, colorscale):
+        """Scatter số ca COVID với một chỉ số kinh tế, tô màu theo thời gian"""
+        has_trace = 'cases' in self.merged_data.columns and metric in self.merged_data.columns
+        has_text = 'date' in self.merged_data.columns
+        arrays = {}
+        correlation = None
+        if has_trace:
+            correlation = self.merged_data['cases'].corr(self.merged_data[metric])
+            arrays = {
+                'cases': self.merged_data['cases'],
+                metric: self.merged_data[metric],
+                'index': self.merged_data.index,
+            }
+            if has_text:
+                arrays['text'] = self.merged_data['date'].astype(str)
+            # Hệ số tương quan đổi theo dữ liệu nên gắn vào layout, không nằm trong key của template
+            arrays['title'] = f'{title}<br><sub>Correlation: {correlation:.3f}</sub>'
+        
+        def build(data):
+            fig = go.Figure()
+            
+            if has_trace:
+                fig.add_trace(go.Scatter(
+                    x=data['cases'],
+                    y=data[metric],
+                    mode='markers',
+                    marker=dict(
+                        size=10,
+                        color=data['index'],
+                        colorscale=colorscale,
+                        showscale=True,
+                        colorbar=dict(title="Thời gian")
+                    ),
+                    text=data['text'] if has_text else None,
+                    hovertemplate=f'<b>Số ca COVID:</b> %{{x}}<br><b>{hover_label}:</b> %{{y}}%<br><b>Ngày:</b> %{{text}}<extra></extra>'
+                ))
+                
+                fig.update_layout(
+                    title=data['title'],
+                    xaxis_title='COVID Cases',
+                    yaxis_title=axis_title,
+                    template='plotly_white'
+                )
+            return fig
+        
+        traces = []
+        if has_trace:
+            traces = [{'x': 'cases', 'y': metric, 'marker.color': 'index'}]
+            if has_text:
+                traces[0]['text'] = 'text'
+        layout = {'title.text': 'title'} if has_trace else None
+        return self._render((key, has_trace, has_text), build, traces, arrays, layout)
+    
+    @_cached_figure
     def create_covid_vs_unemployment_scatter(self):
         """Tạo scatter plot COVID cases vs Unemployment Rate"""
         if self.merged_data is None:
             return None
         
-        fig = go.Figure()
-        
-        if 'cases' in self.merged_data.columns and 'unemployment_rate' in self.merged_data.columns:
-            correlation = self.merged_data['cases'].corr(self.merged_data['unemployment_rate'])
-            
-            fig.add_trace(go.Scatter(
-                x=self.merged_data['cases'],
-                y=self.merged_data['unemployment_rate'],
-                mode='markers',
-                marker=dict(
-                    size=10,
-                    color=self.merged_data.index,
-                    colorscale='Viridis',
-                    showscale=True,
-                    colorbar=dict(title="Thời gian")
-                ),
-                text=self.merged_data['date'].astype(str) if 'date' in self.merged_data.columns else None,
-                hovertemplate='<b>Số ca COVID:</b> %{x}<br><b>Tỷ lệ thất nghiệp:</b> %{y}%<br><b>Ngày:</b> %{text}<extra></extra>'
-            ))
-            
-            fig.update_layout(
-                title=f'COVID Cases vs Unemployment Rate<br><sub>Correlation: {correlation:.3f}</sub>',
-                xaxis_title='COVID Cases',
-                yaxis_title='Unemployment Rate (%)',
-                template='plotly_white'
-            )
-        
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return self._cases_scatter('covid_vs_unemployment', 'unemployment_rate',
+                                   'COVID Cases vs Unemployment Rate', 'Unemployment Rate (%)',
+                                   'Tỷ lệ thất nghiệp', 'Viridis')
     
+    @_cached_figure
     def create_covid_vs_gdp_scatter(self):
         """Tạo scatter plot COVID cases vs GDP Growth"""
         if self.merged_data is None:
             return None
         
-        fig = go.Figure()
+        return self._cases_scatter('covid_vs_gdp', 'gdp_growth',
+                                   'COVID Cases vs GDP Growth', 'GDP Growth (%)',
+                                   'Tăng trưởng GDP', 'Plasma')
+    
+    @_cached_figure
+    def create_correlation_matrix(self):
+        """Tạo ma trận tương quan"""
+        if self.merged_data is None:
+            return None
         
-        if 'cases' in self.merged_data.columns and 'gdp_growth' in self.merged_data.columns:
-            correlation = self.merged_data['cases'].corr(self.merged_data['gdp_growth'])
-            
-            fig.add_trace(go.Scatter(
-                x=self.merged_data['cases'],
-                y=self.merged_data['gdp_growth'],
-                mode='markers',
-                marker=dict(
-                    size=10,
-                    color=self.merged_data.index,
-                    colorscale='Plasma',
-                    showscale=True,
-                    colorbar=dict(title="Thời gian")
+        corr_matrix = self.get_correlation()
+        
+        label_mapping = {
+            'cases': 'Số ca COVID',
+            'deaths': 'Tử vong',
+            'recovered': 'Hồi phục',
+            'unemployment_rate': 'Tỷ lệ thất nghiệp',
+            'gdp_growth': 'Tăng trưởng GDP',
+            'stock_index': 'Chỉ số chứng khoán',
+            'retail_sales': 'Doanh thu bán lẻ'
+        }
+        
+        readable_labels = [label_mapping.get(col, col) for col in corr_matrix.columns]
+        
+        def build(data):
+            fig = go.Figure(data=go.Heatmap(
+                z=data['z'],
+                x=readable_labels,
+                y=readable_labels,
+                colorscale='RdBu',
+                zmid=0,
+                zmin=-1,
+                zmax=1,
+                text=data['text'],
+                texttemplate='%{text}',
+                textfont={"size": 14, "color": "black"},
+                colorbar=dict(
+                    title=dict(
+                        text="Hệ số<br>tương quan",
+                        side="right"
+                    ),
+                    tickmode="linear",
+                    tick0=-1,
+                    dtick=0.5
                 ),
-                text=self.merged_data['date'].astype(str) if 'date' in self.merged_data.columns else None,
-                hovertemplate='<b>Số ca COVID:</b> %{x}<br><b>Tăng trưởng GDP:</b> %{y}%<br><b>Ngày:</b> %{text}<extra></extra>'
+                hovertemplate='<b>%{y}</b> vs <b>%{x}</b><br>Correlation: %{z:.3f}<extra></extra>'
             ))
             
             fig.update_layout(
-                title=f'COVID Cases vs GDP Growth<br><sub>Correlation: {correlation:.3f}</sub>',
-                xaxis_title='COVID Cases',
-                yaxis_title='GDP Growth (%)',
-                template='plotly_white'
+                title={
+                    'text': 'Ma trận Tương quan - Chỉ số Kinh tế & COVID-19',
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18}
+                },
+                template='plotly_white',
+                width=800,
+                height=700,
+                xaxis={
+                    'tickangle': -45,
+                    'tickfont': {'size': 12}
+                },
+                yaxis={
+                    'tickfont': {'size': 12}
+                },
+                margin=dict(l=150, r=150, t=100, b=150)
             )
+            return fig
         
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        arrays = {'z': corr_matrix.values, 'text': corr_matrix.values.round(2)}
+        return self._render(('correlation_matrix', tuple(readable_labels)), build,
+                            [{'z': 'z', 'text': 'text'}], arrays)
     
-    def create_correlation_matrix(self):
-      """Tạo ma trận tương quan"""
-      if self.merged_data is None:
-          return None
-      
-      selected_cols = []
-      
-      priority_cols = ['cases', 'deaths', 'unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales']
-      
-      for col in priority_cols:
-          if col in self.merged_data.columns:
-              selected_cols.append(col)
-      
-      if not selected_cols:
-          selected_cols = self.merged_data.select_dtypes(include=['float64', 'int64']).columns.tolist()
-      
-      corr_matrix = self.merged_data[selected_cols].corr()
-      
-      label_mapping = {
-          'cases': 'Số ca COVID',
-          'deaths': 'Tử vong',
-          'recovered': 'Hồi phục',
-          'unemployment_rate': 'Tỷ lệ thất nghiệp',
-          'gdp_growth': 'Tăng trưởng GDP',
-          'stock_index': 'Chỉ số chứng khoán',
-          'retail_sales': 'Doanh thu bán lẻ'
-      }
-      
-      readable_labels = [label_mapping.get(col, col) for col in corr_matrix.columns]
-      
-      fig = go.Figure(data=go.Heatmap(
-          z=corr_matrix.values,
-          x=readable_labels,
-          y=readable_labels,
-          colorscale='RdBu',
-          zmid=0,
-          zmin=-1,
-          zmax=1,
-          text=corr_matrix.values.round(2),
-          texttemplate='%{text}',
-          textfont={"size": 14, "color": "black"},
-          colorbar=dict(
-              title=dict(
-                  text="Hệ số<br>tương quan",
-                  side="right"
-              ),
-              tickmode="linear",
-              tick0=-1,
-              dtick=0.5
-          ),
-          hovertemplate='<b>%{y}</b> vs <b>%{x}</b><br>Correlation: %{z:.3f}<extra></extra>'
-      ))
-      
-      fig.update_layout(
-          title={
-              'text': 'Ma trận Tương quan - Chỉ số Kinh tế & COVID-19',
-              'x': 0.5,
-              'xanchor': 'center',
-              'font': {'size': 18}
-          },
-          template='plotly_white',
-          width=800,
-          height=700,
-          xaxis={
-              'tickangle': -45,
-              'tickfont': {'size': 12}
-          },
-          yaxis={
-              'tickfont': {'size': 12}
-          },
-          margin=dict(l=150, r=150, t=100, b=150)
-      )
-      
-      return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    @_cached_figure
     def create_combined_timeline(self):
         """Tạo biểu đồ kết hợp COVID và kinh tế"""
         if self.merged_data is None:
             return None
         
-        fig = make_subplots(
-            rows=2, cols=1,
-            subplot_titles=('COVID Cases vs Unemployment Rate', 'COVID Cases vs GDP Growth'),
-            specs=[[{"secondary_y": True}], [{"secondary_y": True}]],
-            vertical_spacing=0.15
-        )
-        
-        if 'date' in self.merged_data.columns:
-            if 'cases' in self.merged_data.columns:
-                fig.add_trace(
-                    go.Scatter(x=self.merged_data['date'], y=self.merged_data['cases'],
-                              name="COVID Cases", line=dict(color='red')),
-                    row=1, col=1, secondary_y=False
-                )
+        columns = self.merged_data.columns
+        # (cột, tên, màu, hàng, trục phụ, hiện legend) theo đúng thứ tự trace
+        series = []
+        if 'date' in columns:
+            if 'cases' in columns:
+                series.append(('cases', "COVID Cases", 'red', 1, False, True))
+            if 'unemployment_rate' in columns:
+                series.append(('unemployment_rate', "Unemployment Rate", 'blue', 1, True, True))
+            if 'cases' in columns:
+                series.append(('cases', "COVID Cases", 'red', 2, False, False))
+            if 'gdp_growth' in columns:
+                series.append(('gdp_growth', "GDP Growth", 'green', 2, True, True))
+        
+        def build(data):
+            fig = make_subplots(
+                rows=2, cols=1,
+                subplot_titles=('COVID Cases vs Unemployment Rate', 'COVID Cases vs GDP Growth'),
+                specs=[[{"secondary_y": True}], [{"secondary_y": True}]],
+                vertical_spacing=0.15
+            )
             
-            if 'unemployment_rate' in self.merged_data.columns:
+            for column, name, color, row, secondary_y, showlegend in series:
+                extra = {} if showlegend else {'showlegend': False}
                 fig.add_trace(
-                    go.Scatter(x=self.merged_data['date'], y=self.merged_data['unemployment_rate'],
-                              name="Unemployment Rate", line=dict(color='blue')),
-                    row=1, col=1, secondary_y=True
+                    go.Scatter(x=data['date'], y=data[column],
+                              name=name, line=dict(color=color), **extra),
+                    row=row, col=1, secondary_y=secondary_y
                 )
             
-            if 'cases' in self.merged_data.columns:
-                fig.add_trace(
-                    go.Scatter(x=self.merged_data['date'], y=self.merged_data['cases'],
-                              name="COVID Cases", line=dict(color='red'), showlegend=False),
-                    row=2, col=1, secondary_y=False
-                )
+            fig.update_xaxes(title_text="Thời gian", row=1, col=1)
+            fig.update_xaxes(title_text="Thời gian", row=2, col=1)
             
-            if 'gdp_growth' in self.merged_data.columns:
-                fig.add_trace(
-                    go.Scatter(x=self.merged_data['date'], y=self.merged_data['gdp_growth'],
-                              name="GDP Growth", line=dict(color='green')),
-                    row=2, col=1, secondary_y=True
-                )
+            fig.update_yaxes(title_text="COVID Cases", row=1, col=1, secondary_y=False)
+            fig.update_yaxes(title_text="Unemployment Rate (%)", row=1, col=1, secondary_y=True)
+            
+            fig.update_yaxes(title_text="COVID Cases", row=2, col=1, secondary_y=False)
+            fig.update_yaxes(title_text="GDP Growth (%)", row=2, col=1, secondary_y=True)
+            
+            fig.update_layout(
+                title_text="Phân tích Tác động COVID-19 lên Kinh tế",
+                height=800,
+                template='plotly_white',
+                hovermode='x unified'
+            )
+            return fig
         
-        fig.update_xaxes(title_text="Thời gian", row=1, col=1)
-        fig.update_xaxes(title_text="Thời gian", row=2, col=1)
+        traces = [{'x': 'date', 'y': column} for column, *_ in series]
+        return self._render(('combined_timeline', tuple(series)), build, traces, self.merged_data)
+    
+    def get_correlation(self):
+        """Ma trận tương quan giữa các chỉ số chính (dùng cho heatmap và live update)"""
+        selected_cols = []
         
-        fig.update_yaxes(title_text="COVID Cases", row=1, col=1, secondary_y=False)
-        fig.update_yaxes(title_text="Unemployment Rate (%)", row=1, col=1, secondary_y=True)
+        priority_cols = ['cases', 'deaths', 'unemployment_rate', 'gdp_growth', 'stock_index', 'retail_sales']
         
-        fig.update_yaxes(title_text="COVID Cases", row=2, col=1, secondary_y=False)
-        fig.update_yaxes(title_text="GDP Growth (%)", row=2, col=1, secondary_y=True)
+        for col in priority_cols:
+            if col in self.merged_data.columns:
+                selected_cols.append(col)
         
-        fig.update_layout(
-            title_text="Phân tích Tác động COVID-19 lên Kinh tế",
-            height=800,
-            template='plotly_white',
-            hovermode='x unified'
-        )
+        if not selected_cols:
+            selected_cols = self.merged_data.select_dtypes(include=['float64', 'int64']).columns.tolist()
         
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return self.merged_data[selected_cols].corr()
     
-    def get_statistics(self):
-        """Lấy thống kê tổng quan"""
+    def get_statistics(self, region=None, start_date=None, end_date=None):
+        """Lấy thống kê tổng quan (tính một lần cho mỗi lần load dữ liệu, riêng cho từng vùng).
+
+        Có start_date/end_date thì tính trên khoảng ngày đó (không cache).
+        """
         if self.merged_data is None:
             return {}
         
+        national = (self.get_region_index('covid').covers_all(region)
+                    and self.get_region_index('economy').covers_all(region))
+        if start_date or end_date:
+            if national:
+                merged = slice_dates(self.merged_data, start_date, end_date)
+            else:
+                merged = aligned_join(self.get_region('covid', region, start_date, end_date),
+                                      self.get_region('economy', region, start_date, end_date), on='date')
+            return self._compute_statistics(merged)
+        
+        if national:
+            if self._statistics is None:
+                self._statistics = self._compute_statistics(self.merged_data)
+            return dict(self._statistics)
+        
+        if region not in self._region_statistics:
+            merged = aligned_join(self.get_region('covid', region), self.get_region('economy', region), on='date')
+            self._region_statistics[region] = self._compute_statistics(merged)
+        return dict(self._region_statistics[region])
+    
+    def _compute_statistics(self, merged):
         stats = {}
-        
-        if 'cases' in self.merged_data.columns:
-            stats['total_cases'] = int(self.merged_data['cases'].sum())
-            stats['avg_cases'] = float(self.merged_data['cases'].mean())
-            stats['max_cases'] = int(self.merged_data['cases'].max())
-        
-        if 'unemployment_rate' in self.merged_data.columns:
-            stats['avg_unemployment'] = float(self.merged_data['unemployment_rate'].mean())
-            stats['max_unemployment'] = float(self.merged_data['unemployment_rate'].max())
-            stats['min_unemployment'] = float(self.merged_data['unemployment_rate'].min())
-        
-        if 'gdp_growth' in self.merged_data.columns:
-            stats['avg_gdp_growth'] = float(self.merged_data['gdp_growth'].mean())
-            stats['max_gdp_growth'] = float(self.merged_data['gdp_growth'].max())
-            stats['min_gdp_growth'] = float(self.merged_data['gdp_growth'].min())
-        
-        if 'cases' in self.merged_data.columns and 'unemployment_rate' in self.merged_data.columns:
+        if merged.empty:
+            # khoảng ngày không có dữ liệu
+            return stats
+        
+        if 'cases' in merged.columns:
+            stats['total_cases'] = int(merged['cases'].sum())
+            stats['avg_cases'] = float(merged['cases'].mean())
+            stats['max_cases'] = int(merged['cases'].max())
+        
+        if 'unemployment_rate' in merged.columns:
+            stats['avg_unemployment'] = float(merged['unemployment_rate'].mean())
+            stats['max_unemployment'] = float(merged['unemployment_rate'].max())
+            stats['min_unemployment'] = float(merged['unemployment_rate'].min())
+        
+        if 'gdp_growth' in merged.columns:
+            stats['avg_gdp_growth'] = float(merged['gdp_growth'].mean())
+            stats['max_gdp_growth'] = float(merged['gdp_growth'].max())
+            stats['min_gdp_growth'] = float(merged['gdp_growth'].min())
+        
+        if 'cases' in merged.columns and 'unemployment_rate' in merged.columns:
             stats['corr_cases_unemployment'] = float(
-                self.merged_data['cases'].corr(self.merged_data['unemployment_rate'])
+                merged['cases'].corr(merged['unemployment_rate'])
             )
         
-        if 'cases' in self.merged_data.columns and 'gdp_growth' in self.merged_data.columns:
+        if 'cases' in merged.columns and 'gdp_growth' in merged.columns:
             stats['corr_cases_gdp'] = float(
-                self.merged_data['cases'].corr(self.merged_data['gdp_growth'])
+                merged['cases'].corr(merged['gdp_growth'])
             )
         
         return stats
 
-def create_all_visualizations():
-    """Tạo tất cả các biểu đồ"""
-    visualizer = CovidEconomyVisualizer()
-    
-    if not visualizer.load_data():
-        return None
+def create_all_visualizations(visualizer=None):
+    """Tạo tất cả các biểu đồ (dùng visualizer đã load nếu được truyền vào)"""
+    if visualizer is None:
+        visualizer = CovidEconomyVisualizer()
+        if not visualizer.load_data():
+            return None
     
     return {
         'covid_timeline': visualizer.create_covid_cases_timeline(),
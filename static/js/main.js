@@ -47,46 +47,231 @@ function initDashboard() {
             document.getElementById(`${btn.dataset.tab}-tab`).classList.add('active');
             
             loadChartsForTab(btn.dataset.tab);
+            startLiveUpdates();
         });
     });
 
     loadChartsForTab('economy');
+    startLiveUpdates();
 }
 
 function loadChartsForTab(tab) {
+    const specs = chartSpecsForTab(tab);
+    if (specs.length === 0) return;
+
+    loadChartsBatch(specs).catch(err => {
+        // Fallback: gọi từng API riêng lẻ
+        console.error('Batch request failed, loading charts one by one:', err);
+        if (tab === 'economy') {
+            loadEconomyTimeseries();
+            loadEconomyDistribution();
+            loadEconomyHeatmap();
+            loadEconomySunburst();
+            loadEconomyComparison();
+        } else if (tab === 'covid') {
+            loadCovidTimeseries();
+            loadCovidTreemap();
+        } else if (tab === 'impact') {
+            loadEconomyScatter();
+            loadImpactAnalysis();
+        }
+    });
+}
+
+function valueOf(id) {
+    const el = document.getElementById(id);
+    return el ? el.value : undefined;
+}
+
+function chartSpecsForTab(tab) {
+    const specs = [];
+    const add = (id, chart, params = {}) => {
+        if (document.getElementById(id)) specs.push({ id, chart, params });
+    };
+
     if (tab === 'economy') {
-        loadEconomyTimeseries();
-        loadEconomyDistribution();
-        loadEconomyHeatmap();
-        loadEconomySunburst();
-        loadEconomyComparison();
+        const showAnomalies = document.getElementById('economy-show-anomalies');
+        add('economy-timeseries', 'economy_timeseries', {
+            metric: valueOf('economy-metric') || 'unemployment_rate',
+            anomalies: showAnomalies ? String(showAnomalies.checked) : 'false'
+        });
+        add('economy-distribution', 'economy_distribution', {
+            metric: valueOf('distribution-metric') || 'unemployment_rate',
+            type: valueOf('distribution-type') || 'histogram'
+        });
+        add('economy-heatmap', 'economy_heatmap');
+        add('economy-sunburst', 'economy_sunburst');
+        add('economy-comparison', 'economy_comparison');
     } else if (tab === 'covid') {
-        loadCovidTimeseries();
-        loadCovidTreemap();
+        const showMA = document.getElementById('covid-show-ma');
+        add('covid-timeseries', 'covid_timeseries', {
+            metric: valueOf('covid-metric') || 'cases',
+            show_ma: showMA ? String(showMA.checked) : 'true'
+        });
+        add('covid-treemap', 'covid_treemap');
     } else if (tab === 'impact') {
-        loadEconomyScatter();
-        loadImpactAnalysis();
+        add('economy-scatter', 'economy_scatter', {
+            x: valueOf('scatter-x') || 'unemployment_rate',
+            y: valueOf('scatter-y') || 'cases'
+        });
+        add('impact-analysis', 'impact_analysis');
+    }
+    return specs;
+}
+
+// Một request cho nhiều chart; vẽ từng chart ngay khi dòng NDJSON của nó về tới
+async function loadChartsBatch(specs) {
+    const res = await fetch('/api/batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ charts: specs })
+    });
+    if (!res.ok || !res.body) throw new Error(`Batch request failed: ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const handleLine = line => {
+        if (!line.trim()) return;
+        const result = JSON.parse(line);
+        if (result.error) {
+            console.error(`Error loading ${result.id}:`, result.error);
+            return;
+        }
+        Plotly.newPlot(result.id, result.figure.data, result.figure.layout, {responsive: true});
+        if (result.id === 'economy-timeseries') addForecastOverlay();
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
     }
+    handleLine(buffer);
 }
 
 
 
+// Live update qua SSE: server chỉ gửi điểm mới của các series đang hiển thị
+let liveSource = null;
+
+function liveSeriesForCharts() {
+    // chart id → danh sách series theo thứ tự trace
+    const charts = {};
+    const covidMetric = valueOf('covid-metric') || 'cases';
+    const showMA = document.getElementById('covid-show-ma');
+    charts['economy-timeseries'] = [`economy:${valueOf('economy-metric') || 'unemployment_rate'}`];
+    charts['covid-timeseries'] = [`covid:${covidMetric}`];
+    if (!showMA || showMA.checked) charts['covid-timeseries'].push(`covid:${covidMetric}_ma7`);
+    return charts;
+}
+
+function startLiveUpdates() {
+    if (!window.EventSource) return;
+    if (liveSource) liveSource.close();
+
+    const charts = liveSeriesForCharts();
+    const series = new Set(['correlation']);
+    Object.values(charts).forEach(list => list.forEach(s => series.add(s)));
+
+    liveSource = new EventSource(`/api/stream?series=${encodeURIComponent([...series].join(','))}`);
+    liveSource.addEventListener('update', e => applyLiveUpdate(JSON.parse(e.data), charts));
+    liveSource.addEventListener('resync', () => {
+        // Bỏ lỡ delta: tải lại toàn bộ chart của tab đang mở
+        const active = document.querySelector('.tab-btn.active');
+        loadChartsForTab(active ? active.dataset.tab : 'economy');
+    });
+}
+
+function applyLiveUpdate(update, charts) {
+    Object.entries(charts).forEach(([id, list]) => {
+        const gd = document.getElementById(id);
+        if (!gd || !gd.data) return;
+        const xs = [], ys = [], traces = [];
+        list.forEach((key, i) => {
+            const points = update.series && update.series[key];
+            if (!points || i >= gd.data.length) return;
+            xs.push(points.x);
+            ys.push(points.y);
+            traces.push(i);
+        });
+        if (traces.length) Plotly.extendTraces(gd, { x: xs, y: ys }, traces);
+    });
+
+    const heatmap = document.getElementById('economy-heatmap');
+    if (update.correlation && heatmap && heatmap.data && heatmap.data[0].type === 'heatmap') {
+        const trace = heatmap.data[0];
+        const z = Array.from(trace.z, row => Array.from(row));
+        const text = trace.text ? Array.from(trace.text, row => Array.from(row)) : null;
+        update.correlation.forEach(([i, j, value]) => {
+            if (!z[i]) return;
+            z[i][j] = value;
+            if (text) text[i][j] = value === null ? null : Math.round(value * 100) / 100;
+        });
+        Plotly.restyle(heatmap, text ? { z: [z], text: [text] } : { z: [z] }, [0]);
+    }
+}
+
 function loadEconomyTimeseries() {
     const metricSelect = document.getElementById('economy-metric');
     if (!metricSelect) return;
     
     const metric = metricSelect.value;
+    const showAnomalies = document.getElementById('economy-show-anomalies');
+    const anomalies = showAnomalies ? showAnomalies.checked : false;
     
-    fetch(`/api/economy/timeseries?metric=${metric}`)
+    fetch(`/api/economy/timeseries?metric=${metric}&anomalies=${anomalies}`)
         .then(res => res.json())
         .then(data => {
             Plotly.newPlot('economy-timeseries', data.data, data.layout, {responsive: true});
+            addForecastOverlay();
         })
         .catch(err => console.error('Error loading economy timeseries:', err));
 }
 
+// Dự báo (fit nền phía server): model đang fit (202) thì vẽ tạm baseline rồi hỏi lại
+function addForecastOverlay(attempt = 0) {
+    const toggle = document.getElementById('economy-show-forecast');
+    const gd = document.getElementById('economy-timeseries');
+    if (!toggle || !toggle.checked || !gd || !gd.data) return;
+
+    const metric = valueOf('economy-metric') || 'unemployment_rate';
+    fetch(`/api/forecast?kind=economy&metric=${metric}&model=ets`)
+        .then(res => res.json().then(body => ({ status: res.status, body })))
+        .then(({ status, body }) => {
+            const forecast = status === 202 ? body.fallback : body;
+            if (!forecast || !forecast.dates) return;  // chỉ số không có dự báo
+
+            const old = gd.data.map((trace, i) => trace.meta === 'forecast' ? i : -1).filter(i => i >= 0);
+            if (old.length) Plotly.deleteTraces(gd, old);
+            Plotly.addTraces(gd, [
+                { x: forecast.dates, y: forecast.upper, mode: 'lines', line: { width: 0 },
+                  hoverinfo: 'skip', showlegend: false, meta: 'forecast' },
+                { x: forecast.dates, y: forecast.lower, mode: 'lines', line: { width: 0 },
+                  fill: 'tonexty', fillcolor: 'rgba(243, 156, 18, 0.2)', name: 'Khoảng dự báo 95%', meta: 'forecast' },
+                { x: forecast.dates, y: forecast.mean, mode: 'lines',
+                  line: { color: '#f39c12', width: 2, dash: 'dot' }, name: `Dự báo (${forecast.model})`, meta: 'forecast' }
+            ]);
+            if (status === 202 && attempt < 10) setTimeout(() => addForecastOverlay(attempt + 1), 2000);
+        })
+        .catch(err => console.error('Error loading forecast:', err));
+}
+
 if (document.getElementById('economy-metric')) {
     document.getElementById('economy-metric').addEventListener('change', loadEconomyTimeseries);
+    document.getElementById('economy-metric').addEventListener('change', startLiveUpdates);
+}
+
+if (document.getElementById('economy-show-anomalies')) {
+    document.getElementById('economy-show-anomalies').addEventListener('change', loadEconomyTimeseries);
+}
+
+if (document.getElementById('economy-show-forecast')) {
+    document.getElementById('economy-show-forecast').addEventListener('change', loadEconomyTimeseries);
 }
 
 function loadEconomyDistribution() {
@@ -158,9 +343,11 @@ function loadCovidTimeseries() {
 
 if (document.getElementById('covid-metric')) {
     document.getElementById('covid-metric').addEventListener('change', loadCovidTimeseries);
+    document.getElementById('covid-metric').addEventListener('change', startLiveUpdates);
 }
 if (document.getElementById('covid-show-ma')) {
     document.getElementById('covid-show-ma').addEventListener('change', loadCovidTimeseries);
+    document.getElementById('covid-show-ma').addEventListener('change', startLiveUpdates);
 }
 
 function loadCovidTreemap() {
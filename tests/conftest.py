@@ -0,0 +1,49 @@
+import base64
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Các module đọc/ghi theo đường dẫn tương đối (data/, cache/) tính từ thư mục gốc
+os.chdir(ROOT)
+
+def decode_arrays(value):
+    """Đổi mảng nhị phân của Plotly ({'bdata', 'dtype', 'shape'}) về list số để so sánh"""
+    if isinstance(value, dict) and 'bdata' in value and 'dtype' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+        if 'shape' in value:
+            array = array.reshape([int(n) for n in str(value['shape']).split(',')])
+        return array.astype(float).tolist()
+    if isinstance(value, dict):
+        return {key: decode_arrays(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_arrays(item) for item in value]
+    return value
+
+def json_differences(a, b, rtol=1e-4, atol=1e-4, path=''):
+    """Các vị trí khác nhau giữa hai JSON (số so sánh theo tolerance)"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        if set(a) != set(b):
+            return [f'{path}: keys {sorted(set(a) ^ set(b))}']
+        return [diff for key in a for diff in json_differences(a[key], b[key], rtol, atol, f'{path}.{key}')]
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return [f'{path}: len {len(a)} != {len(b)}']
+        return [diff for i, (x, y) in enumerate(zip(a, b))
+                for diff in json_differences(x, y, rtol, atol, f'{path}[{i}]')]
+    numbers = (int, float)
+    if isinstance(a, numbers) and isinstance(b, numbers) and not isinstance(a, bool):
+        return [] if np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True) else [f'{path}: {a} != {b}']
+    return [] if a == b else [f'{path}: {str(a)[:60]!r} != {str(b)[:60]!r}']
+
+@pytest.fixture(scope='session')
+def webapp():
+    import app
+    return app
+
+@pytest.fixture
+def client(webapp):
+    return webapp.app.test_client()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import anomaly
+from src.data_schema import load_processed
+from src.visualization import CovidEconomyVisualizer
+
+FLAGS = ('anomaly', 'changepoint')
+
+def _assert_same_flags(batch, online, metrics):
+    for metric in metrics:
+        for suffix in FLAGS:
+            column = f'{metric}_{suffix}'
+            np.testing.assert_array_equal(batch[column].to_numpy(), online[column].to_numpy(), err_msg=column)
+
+def _synthetic():
+    """Chuỗi biên: phẳng (std = 0), nhảy bậc, gai đơn lẻ, dao động nhỏ"""
+    rng = np.random.default_rng(0)
+    n = 200
+    step = np.where(np.arange(n) < 100, 5.0, 8.0)
+    flat = np.full(n, 8.0)
+    flat[150] = 9.0
+    spike = rng.normal(0, 1, n)
+    spike[[60, 61, 140]] += [12, -12, 25]
+    tiny = 1e6 + rng.normal(0, 1e-9, n)
+    return pd.DataFrame({'date': pd.date_range('2020-01-01', periods=n),
+                         'step': step, 'flat': flat, 'spike': spike, 'tiny': tiny})
+
+@pytest.mark.parametrize('kind', list(anomaly.METRICS))
+def test_online_matches_batch(kind):
+    df = load_processed(kind)
+    metrics = anomaly.anomaly_metrics(df, kind)
+    assert metrics
+    batch = anomaly.detect(df, kind, metrics)
+    online = anomaly.extend({metric: anomaly.OnlineDetector() for metric in metrics}, df)
+    _assert_same_flags(batch, online, metrics)
+
+@pytest.mark.parametrize('params', [{}, {'window': 10, 'short': 3, 'threshold': 2.0, 'changepoint_z': 4.0}])
+def test_online_matches_batch_on_edge_series(params):
+    df = _synthetic()
+    metrics = ['step', 'flat', 'spike', 'tiny']
+    batch = anomaly.detect(df, 'economy', metrics, **params)
+    online = anomaly.extend({metric: anomaly.OnlineDetector(**params) for metric in metrics}, df)
+    _assert_same_flags(batch, online, metrics)
+    assert batch['step_changepoint'].any()
+    assert batch['spike_anomaly'].any()
+
+def test_detectors_from_history_continue_batch():
+    df = _synthetic()
+    metrics = ['step', 'spike']
+    batch = anomaly.detect(df, 'economy', metrics)
+    split = 120
+    detectors = anomaly.detectors_from_history(df.iloc[:split], metrics)
+    online = anomaly.extend(detectors, df.iloc[split:])
+    _assert_same_flags(batch.iloc[split:], online, metrics)
+
+@pytest.mark.parametrize('kind', list(anomaly.METRICS))
+def test_visualizer_append_extends_anomalies_incrementally(kind, monkeypatch):
+    viz = CovidEconomyVisualizer()
+    assert viz.load_data()
+    full = viz.covid_data if kind == 'covid' else viz.economy_data
+    split = len(full) - 15
+    head, tail = full.iloc[:split].reset_index(drop=True), full.iloc[split:].reset_index(drop=True)
+    if kind == 'covid':
+        viz.covid_data = head
+    else:
+        viz.economy_data = head
+    before = viz.get_anomalies(kind)
+    assert len(before) == split
+
+    def no_recompute(*args, **kwargs):
+        raise AssertionError('append không được tính lại toàn bộ lịch sử')
+
+    monkeypatch.setattr(anomaly, 'detect', no_recompute)
+    viz.append(kind, tail.iloc[:5])
+    viz.append(kind, tail.iloc[5:])
+    monkeypatch.undo()
+
+    after = viz.get_anomalies(kind)
+    assert len(after) == len(full)
+    pd.testing.assert_frame_equal(after.iloc[:split], before)
+    metrics = anomaly.frame_metrics(before)
+    _assert_same_flags(anomaly.detect(full, kind, metrics), after, metrics)
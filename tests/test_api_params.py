@@ -0,0 +1,135 @@
+import pytest
+
+@pytest.mark.parametrize('url', [
+    '/api/economy/timeseries?agg=sum',
+    '/api/economy/timeseries?agg=sum&max_points=20',
+    '/api/covid/timeseries?agg=sum',
+    '/api/covid/timeseries?agg=avg&max_points=20',
+])
+def test_unknown_aggregate_is_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'agg' in response.get_json()['error']
+
+@pytest.mark.parametrize('agg', ['mean', 'min', 'max', 'last'])
+def test_known_aggregates(client, agg):
+    assert client.get(f'/api/economy/timeseries?agg={agg}&max_points=20').status_code == 200
+    assert client.get(f'/api/covid/timeseries?agg={agg}&max_points=20').status_code == 200
+
+def test_covid_timeseries_date_window(client):
+    figure = client.get('/api/covid/timeseries?start_date=2021-01-01&end_date=2021-01-31').get_json()
+    assert len(figure['data'][0]['x']) == 31
+
+@pytest.mark.parametrize('query', [
+    'bins=0', 'bins=-3', 'bins=201', 'bins=1000000', 'bins=abc',
+    'metric=economic_status', 'metric=date', 'metric=missing', 'type=pie',
+])
+def test_invalid_distribution_summary_is_rejected(client, query):
+    response = client.get(f'/api/economy/distribution?mode=summary&{query}')
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('query', ['bins=1', 'bins=200', 'type=box', 'type=violin&metric=gdp_growth'])
+def test_distribution_summary(client, query):
+    assert client.get(f'/api/economy/distribution?mode=summary&{query}').status_code == 200
+
+@pytest.fixture(params=['pandas', 'sqlite'])
+def backend(request, monkeypatch, webapp):
+    """Chạy test với pyramid (không có kho truy vấn) và với kho sqlite trong bộ nhớ"""
+    from src.chart_cache import ChartCache
+    from src.query_backend import QueryBackend
+    store = QueryBackend('sqlite', ':memory:').sync() if request.param == 'sqlite' else None
+    monkeypatch.setattr(webapp, 'query_backend', store)
+    monkeypatch.setattr(webapp, 'chart_cache', ChartCache())
+    return request.param
+
+@pytest.mark.parametrize('query', ['freq=year', 'freq=hour', 'agg=sum&freq=month', 'agg=avg&freq=week',
+                                   'metric=missing&freq=month'])
+def test_invalid_frequency_is_rejected(client, backend, query):
+    response = client.get(f'/api/economy/timeseries?{query}')
+    assert response.status_code == 400
+
+def test_frequency_results_do_not_depend_on_backend(monkeypatch, webapp, client):
+    from src.chart_cache import ChartCache
+    from src.pyramid import AGGREGATES, FREQUENCIES
+    from src.query_backend import QueryBackend
+    from conftest import decode_arrays, json_differences
+
+    urls = [
+        f'/api/economy/timeseries?metric=gdp_growth&freq={freq}&agg={agg}{window}'
+        for freq in FREQUENCIES for agg in AGGREGATES
+        for window in ('', '&start_date=2021-01-15&end_date=2021-08-20')
+    ]
+
+    def responses(store):
+        monkeypatch.setattr(webapp, 'query_backend', store)
+        monkeypatch.setattr(webapp, 'chart_cache', ChartCache())
+        result = {}
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, url
+            result[url] = decode_arrays(response.get_json())
+        return result
+
+    expected = responses(None)
+    actual = responses(QueryBackend('sqlite', ':memory:').sync())
+    for url in urls:
+        differences = json_differences(actual[url], expected[url], rtol=1e-5)
+        assert not differences, f'{url}: {differences[:5]}'
+
+@pytest.mark.parametrize('query', ['x=missing', 'y=missing', 'x=date', 'y=economic_status',
+                                   'x=gdp_growth&y=missing'])
+def test_invalid_scatter_metric_is_rejected(client, backend, query):
+    response = client.get(f'/api/economy/scatter?{query}')
+    assert response.status_code == 400
+    assert 'metric' in response.get_json()['error']
+
+@pytest.mark.parametrize('query', ['x=stock_index&y=deaths', 'x=retail_sales&y=gdp_growth'])
+def test_scatter(client, backend, query):
+    assert client.get(f'/api/economy/scatter?{query}').status_code == 200
+
+def test_scatter_backend_error_is_a_bad_request(client, backend, webapp, monkeypatch):
+    """Kho truy vấn từ chối cột (table_for) → 400 thay vì 500"""
+    if webapp.query_backend is None:
+        pytest.skip('chỉ áp dụng khi có kho truy vấn')
+
+    def unknown(*args):
+        raise ValueError('Unknown metric: stock_index')
+
+    monkeypatch.setattr(webapp.query_backend, 'pair', unknown)
+    response = client.get('/api/economy/scatter?x=stock_index&y=deaths')
+    assert response.status_code == 400
+    assert 'stock_index' in response.get_json()['error']
+
+@pytest.mark.parametrize('url', [
+    '/api/economy/timeseries?max_points=abc',
+    '/api/economy/timeseries?max_points=-5',
+    '/api/economy/timeseries?max_points=0',
+    '/api/economy/timeseries?max_points=1.5',
+    '/api/economy/timeseries?max_points=100000000',
+    '/api/covid/timeseries?max_points=abc',
+    '/api/covid/timeseries?max_points=-5',
+    '/api/covid/timeseries?max_points=0',
+])
+def test_invalid_max_points_is_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'max_points' in response.get_json()['error']
+
+@pytest.mark.parametrize('url', [
+    '/api/covid/timeseries?metric=missing',
+    '/api/covid/timeseries?metric=missing&max_points=20',
+    '/api/covid/timeseries?metric=date&start_date=2021-01-01',
+    '/api/economy/timeseries?metric=economic_status&max_points=20',
+    '/api/economy/timeseries?metric=year',
+])
+def test_invalid_zoom_metric_is_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'metric' in response.get_json()['error']
+
+@pytest.mark.parametrize('max_points, points', [(1, 4), (20, 12), (100_000, 365)])
+def test_covid_zoom_levels(client, max_points, points):
+    """Năm 2021: mức quý (thô nhất, trả về cả khi vượt max_points), tháng, ngày"""
+    figure = client.get(f'/api/covid/timeseries?metric=deaths&max_points={max_points}'
+                        '&start_date=2021-01-01&end_date=2021-12-31').get_json()
+    assert len(figure['data'][0]['x']) == points
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from conftest import decode_arrays, json_differences
+from src.chart_cache import ChartCache
+
+# chart trong batch → route riêng
+ROUTES = {
+    'economy_timeseries': '/api/economy/timeseries',
+    'economy_distribution': '/api/economy/distribution',
+    'economy_scatter': '/api/economy/scatter',
+    'economy_heatmap': '/api/economy/heatmap',
+    'economy_comparison': '/api/economy/comparison',
+    'economy_sunburst': '/api/economy/sunburst',
+    'covid_timeseries': '/api/covid/timeseries',
+    'covid_treemap': '/api/covid/treemap',
+    'impact_analysis': '/api/impact/analysis',
+    'region_comparison': '/api/regions/compare',
+}
+PARAMS = {
+    'economy_timeseries': {'metric': 'gdp_growth', 'max_points': '40'},
+    'economy_distribution': {'mode': 'summary', 'bins': '15'},
+    'economy_scatter': {'x': 'stock_index', 'y': 'deaths'},
+    'covid_timeseries': {'start_date': '2021-03-01', 'end_date': '2021-05-31'},
+}
+
+@pytest.fixture
+def fresh_cache(webapp, monkeypatch):
+    def reset():
+        monkeypatch.setattr(webapp, 'chart_cache', ChartCache())
+    reset()
+    return reset
+
+def _batch(client, charts):
+    response = client.post('/api/batch', json={'charts': charts})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    return {item['id']: item for item in map(json.loads, lines)}
+
+def test_routes_cover_all_builders(webapp):
+    assert set(ROUTES) == set(webapp.CHART_BUILDERS)
+
+def test_batch_matches_individual_routes(client, fresh_cache):
+    charts = [{'id': name, 'chart': name, 'params': PARAMS.get(name, {})} for name in ROUTES]
+    results = _batch(client, charts)
+    assert set(results) == set(ROUTES)
+
+    fresh_cache()
+    for name, url in ROUTES.items():
+        assert 'error' not in results[name], results[name]
+        response = client.get(url, query_string=PARAMS.get(name, {}))
+        assert response.status_code == 200
+        differences = json_differences(decode_arrays(results[name]['figure']),
+                                       decode_arrays(response.get_json()), rtol=0, atol=0)
+        assert not differences, f'{name}: {differences[:5]}'
+
+def test_batch_isolates_chart_errors(client, fresh_cache):
+    charts = [
+        {'id': 'ok', 'chart': 'economy_heatmap'},
+        {'id': 'typo', 'chart': 'economy_heatmapp'},
+        {'id': 'bad-param', 'chart': 'economy_timeseries', 'params': {'agg': 'sum'}},
+        {'chart': 'covid_treemap'},
+    ]
+    results = _batch(client, charts)
+    assert set(results) == {'ok', 'typo', 'bad-param', 'covid_treemap'}
+    assert 'figure' in results['ok'] and 'error' not in results['ok']
+    assert 'figure' in results['covid_treemap']
+    assert results['typo'] == {'id': 'typo', 'chart': 'economy_heatmapp',
+                               'error': 'Unknown chart: economy_heatmapp'}
+    assert 'agg' in results['bad-param']['error'] and 'figure' not in results['bad-param']
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'charts': []},
+    {'charts': 'economy_heatmap'},
+    {'charts': ['economy_heatmap']},
+    {'charts': [{'id': 'x'}]},
+    {'charts': [{'chart': 'economy_heatmap'}] * 33},
+])
+def test_batch_rejects_malformed_requests(client, body):
+    response = client.post('/api/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from src.chart_cache import ChartCache, SingleFlight
+
+N_THREADS = 16
+
+def _run_concurrently(n, target):
+    """Chạy target(i) trên n thread xuất phát cùng lúc (barrier); trả về kết quả/exception theo i"""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = ('ok', target(i))
+        except Exception as e:
+            results[i] = ('error', e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+def test_concurrent_identical_requests_compute_once():
+    cache = ChartCache()
+    calls = []
+    key = ChartCache.make_key('v1', 'economy_timeseries', {'metric': 'gdp_growth'})
+
+    def build():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return {'figure': object()}
+
+    results = _run_concurrently(N_THREADS, lambda i: cache.get_or_compute(key, build))
+
+    assert len(calls) == 1
+    assert all(status == 'ok' for status, _ in results)
+    first = results[0][1]
+    assert all(value is first for _, value in results)
+    assert cache.stats()['computations'] == 1
+    # lần sau lấy từ cache, không tính lại
+    assert cache.get_or_compute(key, build) is first
+    assert len(calls) == 1
+
+def test_waiters_receive_builder_exception():
+    cache = ChartCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError('build failed')
+
+    results = _run_concurrently(N_THREADS, lambda i: cache.get_or_compute('key', build))
+
+    assert len(calls) == 1
+    errors = [value for status, value in results]
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert len({id(error) for error in errors}) == 1
+    # exception không được cache: lần gọi sau tính lại
+    assert cache.get_or_compute('key', lambda: 42) == 42
+
+def test_waiters_time_out():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader_started = threading.Event()
+
+    def slow():
+        leader_started.set()
+        release.wait(5)
+        return 'done'
+
+    leader = threading.Thread(target=lambda: flight.do('key', slow))
+    leader.start()
+    assert leader_started.wait(5)
+
+    results = _run_concurrently(4, lambda i: flight.do('key', slow, timeout=0.05))
+    release.set()
+    leader.join(5)
+
+    assert all(status == 'error' and isinstance(value, TimeoutError) for status, value in results)
+    # sau khi lượt đang chạy kết thúc, khóa được giải phóng
+    assert flight.do('key', lambda: 'again') == 'again'
+
+def test_chart_cache_timeout_is_applied():
+    cache = ChartCache(timeout=0.05)
+    release = threading.Event()
+    leader_started = threading.Event()
+
+    def slow():
+        leader_started.set()
+        release.wait(5)
+        return 'done'
+
+    leader = threading.Thread(target=lambda: cache.get_or_compute('key', slow))
+    leader.start()
+    assert leader_started.wait(5)
+    with pytest.raises(TimeoutError):
+        cache.get_or_compute('key', slow)
+    release.set()
+    leader.join(5)
+    assert cache.get_or_compute('key', slow) == 'done'
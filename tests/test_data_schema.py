@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from src import visualization
+from src.chart_cache import ChartCache
+from src.data_schema import PROCESSED_SCHEMAS, load_processed
+from src.visualization import CovidEconomyVisualizer
+from conftest import decode_arrays, json_differences
+
+API_URLS = [
+    '/api/stats',
+    '/api/economy/timeseries',
+    '/api/economy/timeseries?metric=gdp_growth&start_date=2021-01-01',
+    '/api/economy/distribution',
+    '/api/economy/distribution?type=box',
+    '/api/economy/distribution?type=violin',
+    '/api/economy/scatter',
+    '/api/economy/scatter?x=gdp_growth&y=cases',
+    '/api/economy/scatter?x=stock_index&y=deaths',
+    '/api/economy/heatmap',
+    '/api/economy/comparison',
+    '/api/economy/sunburst',
+    '/api/covid/timeseries',
+    '/api/covid/treemap',
+    '/api/impact/analysis',
+    '/api/visualizations/all',
+]
+
+def _read_raw(name, path=None):
+    """Như load_processed nhưng giữ dtype mặc định của pandas (trước khi có schema)"""
+    return pd.read_csv(path or PROCESSED_SCHEMAS[name]['path'], parse_dates=['date'])
+
+def _responses(client):
+    responses = {}
+    for url in API_URLS:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        responses[url] = decode_arrays(response.get_json())
+    return responses
+
+def _use_visualizer(monkeypatch, webapp, viz):
+    monkeypatch.setattr(webapp, 'visualizer', viz)
+    monkeypatch.setattr(webapp, 'economy_df', viz.economy_data)
+    monkeypatch.setattr(webapp, 'covid_df', viz.covid_data)
+    monkeypatch.setattr(webapp, 'query_backend', None)
+    monkeypatch.setattr(webapp, 'chart_cache', ChartCache())
+
+def test_schema_dtypes():
+    for name, schema in PROCESSED_SCHEMAS.items():
+        df = load_processed(name)
+        for column, dtype in schema['dtypes'].items():
+            if column in df.columns:
+                assert df[column].dtype == pd.api.types.pandas_dtype(dtype), (name, column)
+
+def test_api_outputs_match_without_schema(monkeypatch, webapp, client):
+    """Dtype gọn (float32, category, int16) không làm output API lệch quá rtol 1e-4"""
+    optimized = CovidEconomyVisualizer()
+    assert optimized.load_data()
+    _use_visualizer(monkeypatch, webapp, optimized)
+    expected = _responses(client)
+
+    monkeypatch.setattr(visualization, 'load_processed', _read_raw)
+    raw = CovidEconomyVisualizer()
+    assert raw.load_data()
+    assert raw.economy_data['unemployment_rate'].dtype == 'float64'
+    _use_visualizer(monkeypatch, webapp, raw)
+    actual = _responses(client)
+
+    for url in API_URLS:
+        differences = json_differences(actual[url], expected[url], rtol=1e-4)
+        assert not differences, f'{url}: {differences[:5]}'
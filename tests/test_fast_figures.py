@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from conftest import decode_arrays, json_differences
+from src import fast_figures
+from src.visualization import CovidEconomyVisualizer, FIGURE_METHODS
+
+@pytest.fixture(scope='module')
+def visualizer():
+    viz = CovidEconomyVisualizer()
+    assert viz.load_data()
+    return viz
+
+def _render(visualizer, name, fast):
+    visualizer.use_fast_figures = fast
+    try:
+        return getattr(CovidEconomyVisualizer, name).__wrapped__(visualizer)
+    finally:
+        visualizer.use_fast_figures = True
+
+@pytest.mark.parametrize('name', FIGURE_METHODS)
+def test_template_matches_plotly(visualizer, name):
+    assert _render(visualizer, name, fast=True) == _render(visualizer, name, fast=False)
+
+@pytest.mark.parametrize('name', FIGURE_METHODS)
+def test_plain_list_fallback(visualizer, name, monkeypatch):
+    """Plotly 5 không có convert_to_base64: mảng ra dạng list, giá trị phải giống bản go.Figure"""
+    monkeypatch.setattr(fast_figures, 'convert_to_base64', None)
+    fast = json.loads(_render(visualizer, name, fast=True))
+    slow = decode_arrays(json.loads(_render(visualizer, name, fast=False)))
+    assert 'bdata' not in json.dumps(fast)
+    assert json_differences(fast, slow, rtol=0, atol=0) == []
+
+def test_scatter_template_key_independent_of_data(visualizer, monkeypatch):
+    monkeypatch.setattr(fast_figures, '_templates', {})
+    first = json.loads(_render(visualizer, 'create_covid_vs_gdp_scatter', fast=True))
+
+    other = CovidEconomyVisualizer()
+    other.load_data()
+    other.merged_data = visualizer.merged_data.iloc[::2].reset_index(drop=True)
+    second = json.loads(_render(other, 'create_covid_vs_gdp_scatter', fast=True))
+
+    assert len(fast_figures._templates) == 1
+    assert first['layout']['title']['text'] != second['layout']['title']['text']
+    assert _render(other, 'create_covid_vs_gdp_scatter', fast=True) == \
+        _render(other, 'create_covid_vs_gdp_scatter', fast=False)
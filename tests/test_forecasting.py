@@ -0,0 +1,93 @@
+import os
+import threading
+
+import pytest
+
+from src import forecasting
+from src.data_schema import load_processed
+from src.forecasting import BASELINE, FORECAST_TARGETS, HORIZON, ForecastService
+
+@pytest.fixture(scope='module')
+def frames():
+    return {kind: load_processed(kind) for kind in ('economy', 'covid')}
+
+@pytest.fixture
+def baseline_only(monkeypatch):
+    """Chỉ model baseline (fit trong thread gọi refresh, không tạo process pool)"""
+    monkeypatch.setattr(forecasting, 'available_models', lambda: [BASELINE])
+
+def test_refresh_publishes_version_with_baselines(tmp_path, frames, baseline_only, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    fit_forecast = forecasting.fit_forecast
+
+    def slow_fit(*args):
+        started.set()
+        assert release.wait(10)
+        return fit_forecast(*args)
+
+    monkeypatch.setattr(forecasting, 'fit_forecast', slow_fit)
+    service = ForecastService(cache_dir=str(tmp_path))
+    worker = threading.Thread(target=service.refresh, args=('v1', frames))
+    worker.start()
+    try:
+        assert started.wait(10)
+        # baseline đang tính: phiên bản mới chưa được công bố
+        assert service.timings()['version'] is None
+        assert service.get('economy', 'unemployment_rate', BASELINE) == ('missing', None)
+    finally:
+        release.set()
+        worker.join(10)
+
+    assert service.timings()['version'] == 'v1'
+    for kind, metric in FORECAST_TARGETS:
+        status, result = service.get(kind, metric, BASELINE)
+        assert status == 'ready' and len(result['mean']) == HORIZON
+        assert os.path.exists(service._path('v1', kind, metric, BASELINE))
+
+    # đổi phiên bản: request đồng thời vẫn nhận kết quả cũ đến khi baseline mới sẵn sàng
+    started.clear()
+    release.clear()
+    worker = threading.Thread(target=service.refresh, args=('v2', frames))
+    worker.start()
+    try:
+        assert started.wait(10)
+        assert service.timings()['version'] == 'v1'
+        assert service.get('economy', 'unemployment_rate', BASELINE)[0] == 'ready'
+    finally:
+        release.set()
+        worker.join(10)
+    assert service.timings()['version'] == 'v2'
+    assert service.get('economy', 'unemployment_rate', BASELINE)[0] == 'ready'
+
+def test_refresh_reuses_saved_forecasts(tmp_path, frames, baseline_only, monkeypatch):
+    ForecastService(cache_dir=str(tmp_path)).refresh('v1', frames)
+
+    def fail(*args):
+        raise AssertionError('không được fit lại khi đã có kết quả lưu')
+
+    monkeypatch.setattr(forecasting, 'fit_forecast', fail)
+    service = ForecastService(cache_dir=str(tmp_path))
+    service.refresh('v1', frames)
+    assert service.get('covid', 'daily_cases', BASELINE)[0] == 'ready'
+
+@pytest.fixture
+def forecast_client(webapp, client, tmp_path, baseline_only, monkeypatch):
+    monkeypatch.setattr(webapp, 'available_models', lambda: [BASELINE])
+    monkeypatch.setattr(webapp, 'forecast_service', ForecastService(cache_dir=str(tmp_path)))
+    return client
+
+@pytest.mark.parametrize('horizon', ['0', '-1', str(HORIZON + 1), 'abc', '1.5'])
+def test_forecast_rejects_invalid_horizon(forecast_client, horizon):
+    response = forecast_client.get(f'/api/forecast?horizon={horizon}')
+    assert response.status_code == 400
+    assert 'horizon' in response.get_json()['error']
+
+@pytest.mark.parametrize('horizon, expected', [(None, HORIZON), (1, 1), (30, 30), (HORIZON, HORIZON)])
+def test_forecast_truncates_to_horizon(forecast_client, horizon, expected):
+    url = '/api/forecast' if horizon is None else f'/api/forecast?horizon={horizon}'
+    response = forecast_client.get(url)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'ready'
+    for key in ('dates', 'mean', 'lower', 'upper'):
+        assert len(body[key]) == expected
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.join import aligned_join, asof_join
+
+def _daily(start, periods, **columns):
+    frame = pd.DataFrame({'date': pd.date_range(start, periods=periods, freq='D')})
+    for name, values in columns.items():
+        frame[name] = values
+    return frame
+
+def test_aligned_join_matches_merge():
+    left = _daily('2020-01-01', 10, a=np.arange(10.0))
+    right = _daily('2020-01-05', 10, a=np.arange(10.0) * 2, b=np.arange(10))
+    expected = pd.merge(left, right, on='date', how='inner')
+    pd.testing.assert_frame_equal(aligned_join(left, right), expected)
+    # có khoảng trống và khóa không sắp xếp
+    pd.testing.assert_frame_equal(aligned_join(left.iloc[::2], right),
+                                  pd.merge(left.iloc[::2], right, on='date', how='inner'))
+    shuffled = right.sample(frac=1, random_state=0)
+    pd.testing.assert_frame_equal(aligned_join(left, shuffled),
+                                  pd.merge(left, shuffled, on='date', how='inner'))
+
+@pytest.mark.parametrize('direction', ['backward', 'forward'])
+def test_asof_join_matches_merge_asof(direction):
+    daily = _daily('2020-01-01', 120, cases=np.arange(120))
+    monthly = pd.DataFrame({'date': pd.date_range('2020-01-15', periods=4, freq='MS'),
+                            'rate': [1.0, 2.0, 3.0, 4.0]})
+    expected = pd.merge_asof(daily, monthly, on='date', direction=direction)
+    pd.testing.assert_frame_equal(asof_join(daily, monthly, direction=direction), expected)
+
+    tolerance = pd.Timedelta(days=10)
+    expected = pd.merge_asof(daily, monthly, on='date', direction=direction, tolerance=tolerance)
+    pd.testing.assert_frame_equal(asof_join(daily, monthly, direction=direction, tolerance=tolerance),
+                                  expected)
+
+def test_asof_join_allows_duplicate_keys():
+    left = pd.DataFrame({'date': pd.to_datetime(['2020-01-02', '2020-01-02', '2020-01-05'])})
+    right = pd.DataFrame({'date': pd.to_datetime(['2020-01-01', '2020-01-04', '2020-01-04']),
+                          'v': [1.0, 2.0, 3.0]})
+    pd.testing.assert_frame_equal(asof_join(left, right), pd.merge_asof(left, right, on='date'))
+
+@pytest.mark.parametrize('side', ['left', 'right'])
+def test_asof_join_rejects_unsorted_keys(side):
+    daily = _daily('2020-01-01', 30, cases=np.arange(30))
+    monthly = pd.DataFrame({'date': pd.to_datetime(['2020-01-01', '2020-02-01']), 'rate': [1.0, 2.0]})
+    if side == 'left':
+        daily = daily.iloc[::-1]
+    else:
+        monthly = monthly.iloc[::-1]
+    with pytest.raises(ValueError, match=f'{side} keys must be sorted'):
+        pd.merge_asof(daily, monthly, on='date')
+    with pytest.raises(ValueError, match=f'{side} keys must be sorted'):
+        asof_join(daily, monthly)
+
+def test_asof_join_rejects_missing_keys():
+    daily = _daily('2020-01-01', 5, cases=np.arange(5))
+    daily.loc[2, 'date'] = pd.NaT
+    monthly = pd.DataFrame({'date': pd.to_datetime(['2020-01-01']), 'rate': [1.0]})
+    with pytest.raises(ValueError):
+        asof_join(daily, monthly)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import kernels
+from src.data_processing import RAW_PATHS, add_covid_features, add_economy_features
+
+BUILDERS = {
+    'covid': add_covid_features,
+    'economy': add_economy_features,
+}
+BACKENDS = ['numpy', pytest.param('numba', marks=pytest.mark.skipif(
+    not kernels.NUMBA_AVAILABLE, reason='numba chưa được cài đặt'))]
+
+def _edge_cases(kind):
+    """Chuỗi ngắn có số 0 (0/0, x/0 trong tỷ lệ và pct_change) và đoạn đứng yên"""
+    dates = pd.date_range('2020-01-01', periods=40, freq='D').strftime('%Y-%m-%d')
+    if kind == 'covid':
+        cases = np.concatenate([np.zeros(5), np.arange(1, 36) ** 2]).astype(np.int64)
+        deaths = np.concatenate([np.zeros(8), np.arange(1, 33)]).astype(np.int64)
+        recovered = np.concatenate([np.zeros(3), np.full(10, 2), np.arange(27) * 3 + 2]).astype(np.int64)
+        return pd.DataFrame({'date': dates, 'cases': cases, 'deaths': deaths, 'recovered': recovered})
+    x = np.linspace(0, 4 * np.pi, 40)
+    return pd.DataFrame({
+        'date': dates,
+        'unemployment_rate': np.round(3 + 2 * np.sin(x), 2),
+        'gdp_growth': np.round(2 * np.cos(x), 2),
+        'stock_index': np.concatenate([[0.0, 0.0], 1000 + 300 * np.sin(x[2:])]),
+        'retail_sales': np.full(40, 500.0),
+    })
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('kind', ['covid', 'economy'])
+def test_kernel_matches_pandas(kind, backend):
+    raw = pd.read_csv(RAW_PATHS[kind])
+    expected = BUILDERS[kind](raw.copy(), use_kernels=False)
+    actual = BUILDERS[kind](raw.copy(), use_kernels=True, backend=backend)
+    pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-9)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('kind', ['covid', 'economy'])
+def test_kernel_matches_pandas_edge_cases(kind, backend):
+    raw = _edge_cases(kind)
+    expected = BUILDERS[kind](raw.copy(), use_kernels=False)
+    actual = BUILDERS[kind](raw.copy(), use_kernels=True, backend=backend)
+    pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-9)
+
+def test_input_with_nan_uses_pandas():
+    raw = pd.read_csv(RAW_PATHS['economy'])
+    raw.loc[10, 'gdp_growth'] = np.nan
+    assert not kernels.supports(raw, ['gdp_growth'])
+    expected = add_economy_features(raw.copy(), use_kernels=False)
+    pd.testing.assert_frame_equal(expected, add_economy_features(raw.copy()))
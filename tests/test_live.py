@@ -0,0 +1,156 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import forecasting
+from src.chart_cache import ChartCache
+from src.forecasting import BASELINE, ForecastService
+from src.live import LiveBroker, build_update, filter_update, format_sse
+from src.visualization import CovidEconomyVisualizer
+
+def _rows():
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-01', '2024-01-02']),
+        'cases': np.array([10, 12], dtype=np.int64),
+        'rate': [2.5, np.float32(2.75)],
+        'status': ['low', 'high'],
+    })
+
+def _parse_sse(chunk):
+    event, data = chunk.split('\n')[:2]
+    return event[len('event: '):], json.loads(data[len('data: '):])
+
+def test_build_update_series_and_correlation():
+    before = pd.DataFrame([[1.0, 0.5, np.nan], [0.5, 1.0, 0.2], [np.nan, 0.2, 1.0]])
+    after = pd.DataFrame([[1.0, 0.6, np.nan], [0.6, 1.0, 0.2], [np.nan, 0.2, 1.0]])
+    update = build_update('v2', 'covid', _rows(), before, after)
+
+    assert update['version'] == 'v2'
+    assert update['series'] == {
+        'covid:cases': {'x': ['2024-01-01', '2024-01-02'], 'y': [10.0, 12.0]},
+        'covid:rate': {'x': ['2024-01-01', '2024-01-02'], 'y': [2.5, 2.75]},
+    }
+    # chỉ các ô đổi giá trị; NaN → NaN không tính là đổi
+    assert update['correlation'] == [[0, 1, 0.6], [1, 0, 0.6]]
+
+    full = build_update('v2', 'covid', _rows(), None, after)
+    assert len(full['correlation']) == 9
+    assert [0, 2, None] in full['correlation']
+    assert 'correlation' not in build_update('v2', 'covid', _rows())
+
+def test_filter_update():
+    update = build_update('v2', 'covid', _rows(), None, pd.DataFrame([[1.0]]))
+    assert filter_update(update, {'covid:cases'}) == {
+        'version': 'v2', 'series': {'covid:cases': update['series']['covid:cases']}}
+    assert filter_update(update, {'correlation'}) == {'version': 'v2', 'correlation': [[0, 0, 1.0]]}
+    assert filter_update(update, {'economy:gdp_growth'}) is None
+    assert filter_update({'version': 'v3', 'series': {}, 'correlation': []}, {'correlation'}) is None
+
+def test_format_sse_framing():
+    chunk = format_sse('update', {'version': 'v1', 'series': {'a': {'x': [1], 'y': [0.5]}}})
+    assert chunk == 'event: update\ndata: {"version":"v1","series":{"a":{"x":[1],"y":[0.5]}}}\n\n'
+    assert _parse_sse(format_sse('hello', {'text': 'dòng\nmới'})) == ('hello', {'text': 'dòng\nmới'})
+
+def test_broker_subscribe_publish_unsubscribe():
+    broker = LiveBroker()
+    cases = broker.subscribe(['covid:cases'])
+    everything = broker.subscribe(['covid:cases', 'covid:rate', 'correlation'])
+    other = broker.subscribe(['economy:gdp_growth'])
+    assert len(broker) == 3
+
+    update = build_update('v2', 'covid', _rows(), None, pd.DataFrame([[1.0]]))
+    broker.publish(update)
+    assert cases.get(timeout=1) == ('update', filter_update(update, {'covid:cases'}))
+    assert everything.get(timeout=1) == ('update', update)
+    assert other.get(timeout=0.01) is None
+
+    broker.unsubscribe(cases)
+    broker.unsubscribe(cases)
+    assert len(broker) == 2
+    broker.publish(update)
+    assert cases.get(timeout=0.01) is None
+    assert everything.get(timeout=1)[0] == 'update'
+
+def test_slow_subscriber_gets_resync():
+    broker = LiveBroker()
+    slow = broker.subscribe(['covid:cases'])
+    for i in range(slow.queue.maxsize + 1):
+        broker.publish(build_update(f'v{i}', 'covid', _rows()))
+    # hàng đợi đầy: các delta cũ bị bỏ, client tải lại toàn bộ
+    assert slow.get(timeout=1) == ('resync', {'version': f'v{slow.queue.maxsize}'})
+    assert slow.get(timeout=0.01) is None
+
+@pytest.fixture
+def live_app(webapp, tmp_path, monkeypatch):
+    viz = CovidEconomyVisualizer()
+    assert viz.load_data()
+    monkeypatch.setattr(webapp, 'visualizer', viz)
+    monkeypatch.setattr(webapp, 'economy_df', viz.economy_data)
+    monkeypatch.setattr(webapp, 'covid_df', viz.covid_data)
+    monkeypatch.setattr(webapp, 'query_backend', None)
+    monkeypatch.setattr(webapp, 'chart_cache', ChartCache())
+    monkeypatch.setattr(webapp, 'live_broker', LiveBroker())
+    monkeypatch.setattr(forecasting, 'available_models', lambda: [BASELINE])
+    monkeypatch.setattr(webapp, 'forecast_service', ForecastService(cache_dir=str(tmp_path)))
+    return webapp
+
+ECONOMY_ROW = {'date': '2024-01-01', 'unemployment_rate': 3.1, 'gdp_growth': 6.2,
+               'stock_index': 1310.0, 'retail_sales': 55000.0}
+
+def test_ingest_publishes_delta(live_app, client):
+    subscription = live_app.live_broker.subscribe(['economy:unemployment_rate', 'correlation'])
+    unrelated = live_app.live_broker.subscribe(['covid:cases'])
+
+    response = client.post('/api/ingest/economy', json={'rows': [ECONOMY_ROW]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['rows'] == 1 and body['subscribers'] == 2
+    assert body['version'] == live_app.visualizer.data_version
+
+    event, data = subscription.get(timeout=1)
+    assert event == 'update'
+    assert data['version'] == body['version']
+    # cột kinh tế lưu float32 (data_schema) nên so sánh gần đúng
+    assert data['series'] == {'economy:unemployment_rate': {'x': ['2024-01-01'], 'y': [pytest.approx(3.1)]}}
+    # tương quan tính trên merged (ngày có cả hai bộ dữ liệu): chưa có dòng COVID nên không đổi
+    assert 'correlation' not in data
+    assert unrelated.get(timeout=0.01) is None
+    assert live_app.economy_df['date'].iloc[-1] == pd.Timestamp('2024-01-01')
+
+    covid = live_app.covid_df.iloc[-1]
+    row = {'date': '2024-01-01', 'cases': int(covid['cases']) + 100,
+           'deaths': int(covid['deaths']) + 1, 'recovered': int(covid['recovered']) + 90}
+    assert client.post('/api/ingest/covid', json={'rows': [row]}).status_code == 200
+    event, data = subscription.get(timeout=1)
+    assert 'series' not in data and data['correlation']
+    assert unrelated.get(timeout=1)[1]['series']['covid:cases']['y'] == [row['cases']]
+
+@pytest.mark.parametrize('kind, body, status', [
+    ('economy', {'rows': []}, 400),
+    ('economy', {}, 400),
+    ('economy', {'rows': [{'date': '2024-01-01'}]}, 400),
+    ('economy', {'rows': [{**ECONOMY_ROW, 'date': '2023-06-01'}]}, 400),
+    ('weather', {'rows': [ECONOMY_ROW]}, 404),
+])
+def test_ingest_rejects_bad_rows(live_app, client, kind, body, status):
+    subscription = live_app.live_broker.subscribe(['economy:unemployment_rate'])
+    response = client.post(f'/api/ingest/{kind}', json=body)
+    assert response.status_code == status
+    assert subscription.get(timeout=0.01) is None
+
+def test_stream_sends_hello_then_updates(live_app, client):
+    response = client.get('/api/stream?series=economy:gdp_growth')
+    assert response.mimetype == 'text/event-stream'
+    chunks = response.response
+    assert _parse_sse(next(chunks).decode()) == ('hello', {'version': live_app.visualizer.data_version})
+    assert len(live_app.live_broker) == 1
+
+    client.post('/api/ingest/economy', json={'rows': [ECONOMY_ROW]})
+    event, data = _parse_sse(next(chunks).decode())
+    assert event == 'update'
+    assert data['series'] == {'economy:gdp_growth': {'x': ['2024-01-01'], 'y': [pytest.approx(6.2)]}}
+
+    response.close()
+    assert len(live_app.live_broker) == 0
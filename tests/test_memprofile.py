@@ -0,0 +1,70 @@
+import tracemalloc
+
+import pytest
+
+from src.memprofile import MemoryProfiler, deep_sizeof
+
+@pytest.mark.parametrize('value', [None, '', '0', 'false'])
+def test_profiler_disabled_by_default(monkeypatch, value):
+    if value is None:
+        monkeypatch.delenv('MEMPROFILE', raising=False)
+    else:
+        monkeypatch.setenv('MEMPROFILE', value)
+    assert MemoryProfiler.from_env() is None
+
+def test_app_does_not_profile_without_env(webapp, client):
+    assert webapp.memory_profiler is None
+    assert not tracemalloc.is_tracing()
+    assert client.get('/api/stats').status_code == 200
+    response = client.get('/api/admin/memory')
+    assert response.status_code == 404
+    assert 'MEMPROFILE' in response.get_json()['error']
+    assert client.post('/api/admin/memory').status_code == 404
+
+@pytest.fixture
+def enable_profiler(webapp, monkeypatch):
+    """Bật profiler như MEMPROFILE=1 (sau khi route đã chạy một lần để snapshot nhỏ)"""
+    def enable():
+        monkeypatch.setenv('MEMPROFILE', '1')
+        profiler = MemoryProfiler.from_env()
+        assert isinstance(profiler, MemoryProfiler) and tracemalloc.is_tracing()
+        monkeypatch.setattr(webapp, 'memory_profiler', profiler)
+        return profiler
+    yield enable
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def test_admin_memory_reports_routes(client, enable_profiler, tmp_path, monkeypatch):
+    urls = ['/api/regions', '/api/economy/timeseries?max_points=30']
+    for url in urls:
+        assert client.get(url).status_code == 200
+    enable_profiler()
+    for url in urls + urls[:1]:
+        assert client.get(url).status_code == 200
+
+    body = client.get('/api/admin/memory').get_json()
+    routes = body['routes']
+    assert routes['/api/regions']['requests'] == 2
+    assert routes['/api/economy/timeseries']['requests'] == 1
+    for stats in routes.values():
+        assert stats['max_peak'] >= stats['avg_peak'] >= 0
+        assert stats['avg_ms'] >= 0
+        assert isinstance(stats['growth'], list)
+    assert body['traced']['peak'] >= body['traced']['current'] > 0
+    assert body['footprints'] and body['chart_cache'] is not None
+
+    body = client.get('/api/admin/memory?reset=true').get_json()
+    assert body['routes'] == {}
+    # request reset cũng được tính sau khi xóa
+    assert list(client.get('/api/admin/memory').get_json()['routes']) == ['/api/admin/memory']
+
+    monkeypatch.chdir(tmp_path)
+    path = client.post('/api/admin/memory').get_json()['snapshot']
+    assert (tmp_path / path).exists()
+
+def test_deep_sizeof_counts_shared_objects_once():
+    import numpy as np
+    array = np.zeros(1000)
+    assert deep_sizeof(array) == array.nbytes
+    assert deep_sizeof([array, array]) < 2 * array.nbytes
+    assert deep_sizeof({'a': array}) >= array.nbytes
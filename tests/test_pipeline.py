@@ -0,0 +1,60 @@
+import os
+
+from src import pipeline, snapshot
+from src.pipeline import Pipeline, Stage
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def copy_upper(source, target):
+    with open(source, 'r', encoding='utf-8') as f:
+        _write(target, f.read().upper())
+
+def test_default_stage_inputs_exist():
+    """Mọi đầu vào khai báo đều có trong cây mã nguồn (chạy mặc định không bị thiếu đầu vào)"""
+    for stage in pipeline.default_stages():
+        for path in stage.inputs:
+            assert os.path.exists(path), f'{stage.name}: {path}'
+        stage.key()
+
+def test_snapshot_stage_tracks_snapshot_sources():
+    stages = {stage.name: stage for stage in pipeline.default_stages()}
+    assert set(snapshot.SOURCE_FILES) <= set(stages['snapshot'].inputs)
+
+def test_stage_params_are_passed_to_stage_function():
+    stages = {stage.name: stage for stage in pipeline.default_stages()}
+    assert stages['process_economy'].params == {'kind': 'economy'}
+    anomaly_stage = stages['anomaly_covid']
+    assert set(anomaly_stage.params) == {'kind', 'metrics', 'window', 'short', 'threshold', 'changepoint_z'}
+
+def test_pipeline_skips_unchanged_stages(tmp_path):
+    source, target = str(tmp_path / 'in.txt'), str(tmp_path / 'out.txt')
+    _write(source, 'a')
+    stages = [Stage('upper', copy_upper, inputs=[source], outputs=[target],
+                    params={'source': source, 'target': target})]
+    state = str(tmp_path / 'state.json')
+
+    assert Pipeline(stages, state)._select(None) == ['upper']
+    assert Pipeline(stages, state).run(max_workers=1)['upper'][0] == 'ran'
+    assert Pipeline(stages, state).run(max_workers=1)['upper'][0] == 'skipped'
+
+    _write(source, 'b')
+    assert Pipeline(stages, state).run(max_workers=1)['upper'][0] == 'ran'
+    with open(target, encoding='utf-8') as f:
+        assert f.read() == 'B'
+
+    # đầu ra bị sửa tay → chạy lại
+    _write(target, 'x')
+    assert Pipeline(stages, state).run(max_workers=1)['upper'][0] == 'ran'
+
+def test_missing_input_fails_and_blocks_dependents(tmp_path):
+    missing, target = str(tmp_path / 'missing.txt'), str(tmp_path / 'out.txt')
+    stages = [
+        Stage('first', copy_upper, inputs=[missing], outputs=[target],
+              params={'source': missing, 'target': target}),
+        Stage('second', copy_upper, inputs=[], outputs=[], deps=['first'],
+              params={'source': target, 'target': str(tmp_path / 'out2.txt')}),
+    ]
+    results = Pipeline(stages, str(tmp_path / 'state.json')).run(max_workers=1)
+    assert results == {'first': ('failed', 0.0), 'second': ('blocked', 0.0)}
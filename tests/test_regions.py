@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import decode_arrays
+from src.chart_cache import ChartCache
+from src.join import aligned_join
+from src.regions import RegionIndex, RegionNotFound
+from src.visualization import CovidEconomyVisualizer
+
+REGIONS = ['a', 'b']
+DATES = pd.date_range('2021-01-01', periods=5)
+
+def _regional(**columns):
+    """Hai vùng a, b cùng khoảng ngày, xếp theo vùng rồi theo ngày"""
+    frame = pd.DataFrame({
+        'date': np.tile(DATES, len(REGIONS)),
+        'region': np.repeat(REGIONS, len(DATES)),
+    })
+    for name, values in columns.items():
+        frame[name] = values
+    return frame
+
+def _mask(frame, start_date, end_date):
+    return frame[(frame['date'] >= start_date) & (frame['date'] <= end_date)]
+
+@pytest.fixture
+def regional_visualizer():
+    viz = CovidEconomyVisualizer()
+    viz.covid_data = _regional(cases=np.arange(10) * 10, deaths=np.arange(10))
+    viz.economy_data = _regional(unemployment_rate=np.linspace(3, 6, 10), gdp_growth=np.linspace(-2, 2, 10))
+    viz.merged_data = aligned_join(viz.covid_data, viz.economy_data, on='date')
+    viz.data_version = 'regional-test'
+    return viz
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_get_all_regions_in_window(shuffle):
+    frame = _regional(v=np.arange(10))
+    index = RegionIndex(frame.sample(frac=1, random_state=0) if shuffle else frame)
+    window = index.get(None, '2021-01-02', '2021-01-03')
+    assert sorted(window['v']) == [1, 2, 6, 7]
+    assert sorted(index.get('a', '2021-01-02', '2021-01-03')['v']) == [1, 2]
+    assert sorted(index.get('b', end_date='2021-01-02')['v']) == [5, 6]
+    assert len(index.get(None)) == 10
+    with pytest.raises(RegionNotFound):
+        index.get('c', '2021-01-02')
+
+def test_windowed_statistics_all_regions(regional_visualizer):
+    viz = regional_visualizer
+    expected = viz._compute_statistics(_mask(viz.merged_data, '2021-01-02', '2021-01-03'))
+    assert viz.get_statistics(None, '2021-01-02', '2021-01-03') == expected
+    assert expected['total_cases'] > 0
+
+    block = aligned_join(_mask(viz.covid_data[viz.covid_data['region'] == 'b'], '2021-01-02', '2021-01-03'),
+                         _mask(viz.economy_data[viz.economy_data['region'] == 'b'], '2021-01-02', '2021-01-03'),
+                         on='date')
+    assert viz.get_statistics('b', '2021-01-02', '2021-01-03') == viz._compute_statistics(block)
+
+@pytest.fixture
+def regional_client(webapp, client, regional_visualizer, monkeypatch):
+    monkeypatch.setattr(webapp, 'visualizer', regional_visualizer)
+    monkeypatch.setattr(webapp, 'chart_cache', ChartCache())
+    return client
+
+def test_region_comparison(regional_client, regional_visualizer):
+    response = regional_client.get('/api/regions/compare?kind=covid&metric=deaths&regions=b,a')
+    assert response.status_code == 200
+    traces = response.get_json()['data']
+    assert [trace['name'] for trace in traces] == ['b', 'a']
+    covid = regional_visualizer.covid_data
+    for trace in traces:
+        expected = covid.loc[covid['region'] == trace['name'], 'deaths'].tolist()
+        assert decode_arrays(trace['y']) == expected
+
+@pytest.mark.parametrize('query, status', [
+    ('kind=economy&metric=nope', 400),
+    ('kind=economy&metric=region', 400),
+    ('kind=covid&metric=unemployment_rate', 400),
+    ('kind=other', 404),
+    ('kind=economy&regions=a,c', 404),
+])
+def test_region_comparison_rejects_bad_params(regional_client, query, status):
+    response = regional_client.get(f'/api/regions/compare?{query}')
+    assert response.status_code == status
+    assert 'error' in response.get_json()
+
+@pytest.fixture(scope='module')
+def visualizer():
+    viz = CovidEconomyVisualizer()
+    assert viz.load_data()
+    return viz
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2020-03-01', '2020-06-30'),
+    (None, '2020-12-31'),
+    ('2021-06-01', None),
+    ('2030-01-01', None),
+])
+def test_windowed_region_and_statistics_match_mask(visualizer, start_date, end_date):
+    def mask(frame):
+        keep = pd.Series(True, index=frame.index)
+        if start_date:
+            keep &= frame['date'] >= start_date
+        if end_date:
+            keep &= frame['date'] <= end_date
+        return frame[keep]
+
+    for kind, frame in (('covid', visualizer.covid_data), ('economy', visualizer.economy_data)):
+        expected = mask(frame)
+        for region in (None, 'national'):
+            pd.testing.assert_frame_equal(visualizer.get_region(kind, region, start_date, end_date), expected)
+
+    expected = visualizer._compute_statistics(mask(visualizer.merged_data))
+    assert bool(expected) == (start_date != '2030-01-01')
+    assert visualizer.get_statistics(None, start_date, end_date) == expected
+    assert visualizer.get_statistics('national', start_date, end_date) == expected
+    # khoảng ngày không làm thay đổi thống kê toàn bộ đã cache
+    assert visualizer.get_statistics() == visualizer._compute_statistics(visualizer.merged_data)
@@ -0,0 +1,91 @@
+import logging
+import os
+import threading
+
+import pytest
+
+from src import rendering
+from src.rendering import ChartRenderer
+
+@pytest.fixture
+def failing_kaleido(monkeypatch):
+    """kaleido luôn lỗi (vd. không có Chrome): renderer phải chuyển sang matplotlib"""
+    calls = []
+
+    def fail(*args):
+        calls.append(args)
+        raise RuntimeError('Chrome not found')
+
+    monkeypatch.setattr(rendering, 'render_with_kaleido', fail)
+    return calls
+
+@pytest.fixture
+def renderer(webapp, tmp_path, monkeypatch, failing_kaleido):
+    renderer = ChartRenderer(webapp.visualizer, cache_dir=str(tmp_path))
+    renderer.backend = 'kaleido'
+    monkeypatch.setattr(webapp, 'renderer', renderer)
+    return renderer
+
+def _cached_files(renderer):
+    return [name for _, _, files in os.walk(renderer.cache_dir) for name in files]
+
+@pytest.mark.parametrize('fmt, content_type, magic', [
+    ('png', 'image/png', b'\x89PNG'),
+    ('svg', 'image/svg+xml', b'<svg'),
+])
+def test_render_falls_back_to_matplotlib(client, renderer, failing_kaleido, monkeypatch,
+                                         fmt, content_type, magic):
+    response = client.get(f'/api/render/covid_timeline.{fmt}?width=400&height=300')
+    assert response.status_code == 200
+    assert response.mimetype == content_type
+    image = response.data
+    response.close()
+    assert magic in image[:200]
+    assert renderer.backend == 'matplotlib'
+    assert len(failing_kaleido) == 1
+    assert len(_cached_files(renderer)) == 1
+
+    # Lần sau lấy từ cache trên đĩa, không render lại
+    def no_render(*args):
+        raise AssertionError('phải lấy ảnh từ cache')
+
+    monkeypatch.setattr(rendering, 'render_with_matplotlib', no_render)
+    response = client.get(f'/api/render/covid_timeline.{fmt}?width=400&height=300')
+    assert response.status_code == 200
+    assert response.data == image
+    response.close()
+    assert len(_cached_files(renderer)) == 1
+
+def test_backend_switch_happens_once(renderer, failing_kaleido, caplog):
+    threads = 4
+    barrier = threading.Barrier(threads)
+    paths, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            paths.append(renderer.render('gdp_timeline', 'png', 300, 200))
+        except Exception as e:
+            errors.append(e)
+
+    with caplog.at_level(logging.WARNING, logger=rendering.__name__):
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join(30)
+
+    assert not errors
+    assert renderer.backend == 'matplotlib'
+    assert len(set(paths)) == 1 and os.path.exists(paths[0])
+    assert len([r for r in caplog.records if 'falling back' in r.getMessage()]) == 1
+
+@pytest.mark.parametrize('url, status', [
+    ('/api/render/missing.png', 404),
+    ('/api/render/covid_timeline.gif', 400),
+    ('/api/render/covid_timeline.png?width=abc', 400),
+])
+def test_render_rejects_bad_requests(client, renderer, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert 'error' in response.get_json()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import scenarios
+from src.data_collection import collect_covid_data, collect_economy_data
+from src.scenarios import (COVID_REGIMES, GDP_REGIMES, PARAM_COLUMNS, SUMMARY_COLUMNS, default_params,
+                           run_sweep, scenario_grid, simulate, summarize)
+
+DATES = pd.date_range(scenarios.START_DATE, scenarios.END_DATE, freq='D')
+
+@pytest.fixture(scope='module')
+def params():
+    return scenario_grid(20, seed=3)
+
+def test_sweep_is_reproducible_across_workers(params):
+    serial = run_sweep(params, seed=7, chunk_size=6, max_workers=1)
+    pooled = run_sweep(params, seed=7, chunk_size=6, max_workers=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+    pd.testing.assert_frame_equal(serial, run_sweep(params, seed=7, chunk_size=6, max_workers=1))
+    assert list(serial.index) == list(params.index)
+    assert list(serial.columns) == PARAM_COLUMNS + SUMMARY_COLUMNS
+
+    other = run_sweep(params, seed=8, chunk_size=6, max_workers=1)
+    assert not np.allclose(serial['mean_gdp'], other['mean_gdp'])
+
+def test_sweep_writes_csv(params, tmp_path):
+    output = tmp_path / 'out' / 'scenarios.csv'
+    result = run_sweep(params.iloc[:4], seed=1, max_workers=1, output=str(output))
+    saved = pd.read_csv(output, index_col='scenario', parse_dates=['peak_date'])
+    pd.testing.assert_frame_equal(saved, result, check_dtype=False, check_exact=False)
+
+def test_summarize_columns(params):
+    paths = simulate(params.iloc[:3], np.random.default_rng(0), DATES)
+    summary = summarize(paths, DATES, index=params.index[:3])
+    assert list(summary.columns) == SUMMARY_COLUMNS
+    assert len(summary) == 3
+    np.testing.assert_array_equal(summary['total_cases'], paths['daily_cases'].sum(axis=1))
+
+def test_zero_spread_matches_collectors():
+    """spread=0 là bộ tham số gốc: trung bình theo giai đoạn khớp collect_covid_data/collect_economy_data"""
+    params = scenario_grid(200, spread=0)
+    np.testing.assert_array_equal(params.to_numpy(), np.repeat(default_params().to_numpy(), 200, axis=0))
+
+    paths = simulate(params, np.random.default_rng(0), DATES)
+    covid_idx, gdp_idx, _ = scenarios._regime_index(DATES)
+
+    covid = collect_covid_data()
+    daily = np.diff(covid['cases'].to_numpy(), prepend=0)
+    for k, (name, mean) in enumerate(COVID_REGIMES):
+        regime = covid_idx == k
+        assert paths['daily_cases'][:, regime].mean() == pytest.approx(mean, rel=0.01), name
+        assert daily[regime].mean() == pytest.approx(mean, rel=0.05), name
+
+    economy = collect_economy_data()
+    for k, (name, mean, sd) in enumerate(GDP_REGIMES):
+        regime = gdp_idx == k
+        assert paths['gdp_growth'][:, regime].mean() == pytest.approx(mean, abs=0.05), name
+        assert economy['gdp_growth'].to_numpy()[regime].mean() == pytest.approx(mean, abs=0.3), name
+
+    for year in (2020, 2021, 2022, 2023):
+        in_year = DATES.year == year
+        simulated = paths['unemployment_rate'][:, in_year].mean()
+        collected = economy['unemployment_rate'].to_numpy()[in_year].mean()
+        assert simulated == pytest.approx(collected, abs=0.1), year
@@ -0,0 +1,40 @@
+from src import snapshot
+from src.visualization import CovidEconomyVisualizer
+
+def test_snapshot_roundtrip(tmp_path):
+    path = str(tmp_path / 'snapshot.pkl')
+    viz = CovidEconomyVisualizer()
+    assert viz.load_data()
+    snapshot.build_snapshot(viz, path)
+
+    payload = snapshot.read_snapshot(path)
+    assert payload is not None
+    assert payload['source_version'] == snapshot.source_version()
+
+    warm = CovidEconomyVisualizer()
+    assert warm.load_snapshot(path)
+    assert warm.data_version == viz.data_version
+    assert warm.get_statistics() == viz.get_statistics()
+    assert warm.create_covid_cases_timeline() == viz.create_covid_cases_timeline()
+
+def test_snapshot_is_stale_after_code_change(tmp_path, monkeypatch):
+    path = str(tmp_path / 'snapshot.pkl')
+    snapshot.build_snapshot(path=path)
+    assert snapshot.read_snapshot(path) is not None
+
+    monkeypatch.setattr(snapshot, 'source_version', lambda paths=None: 'changed')
+    assert snapshot.read_snapshot(path) is None
+    assert not CovidEconomyVisualizer().load_snapshot(path)
+
+def test_source_version_tracks_file_contents(tmp_path):
+    module = tmp_path / 'module.py'
+    module.write_text('A = 1\n')
+    before = snapshot.source_version([str(module)])
+    assert snapshot.source_version([str(module)]) == before
+    module.write_text('A = 2\n')
+    assert snapshot.source_version([str(module)]) != before
+
+def test_snapshot_is_stale_after_data_change(tmp_path):
+    path = str(tmp_path / 'snapshot.pkl')
+    snapshot.build_snapshot(path=path)
+    assert snapshot.read_snapshot(path, expected_version='other') is None